@@ -0,0 +1,187 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from generate_db import BASE_DIR, DB_PATH
+from generate_models import is_virtual_or_shadow, list_virtual_tables
+
+# Sauvegarde à chaud de la base (API backup de SQLite) + réplique lecture seule pour le reporting
+#   - copie par pas de --pages pages, pause de --sleep-ms entre deux pas (time.sleep dans le callback progress :
+#     le paramètre sleep de Connection.backup n'attend que sur SQLITE_BUSY/LOCKED) ; chaque pas ne tient
+#     qu'un snapshot de lecture (WAL : les écritures du serveur continuent pendant la copie)
+#   - une écriture d'une autre connexion fait repartir la copie de zéro : après MAX_RESTARTS reprises,
+#     copie en un seul pas (un seul snapshot de lecture, toujours sans bloquer les écritures)
+#   - la copie est écrite dans un fichier temporaire, vérifiée (quick_check + comptages) puis renommée :
+#     jamais de sauvegarde ni de réplique à moitié écrite
+# Réplique : database.replica.db à côté de la base (journal DELETE, ouverte en lecture seule par model.report())
+
+BACKUP_DIR = BASE_DIR / "serveur" / "backups"
+PAGES_PER_STEP = 1024
+SLEEP_MS = 10
+MAX_RESTARTS = 3
+KEEP = 7
+
+
+def replica_path(db_path):
+    """Réplique à côté de la base (même convention que connection.js)"""
+    return Path(db_path).with_name(Path(db_path).stem + ".replica.db")
+
+
+class Restarted(Exception):
+    """Copie relancée trop souvent par des écritures concurrentes"""
+
+
+def copy_database(src_path, dest_path, pages=PAGES_PER_STEP, sleep_ms=SLEEP_MS):
+    """Copie src_path → dest_path par pas ; renvoie les statistiques de la copie"""
+    stats = {'steps': 0, 'restarts': 0, 'pages': 0, 'paused_s': 0.0}
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True, timeout=30)
+    dest = sqlite3.connect(str(dest_path))
+    try:
+        previous = None
+
+        def progress(status, remaining, total):
+            nonlocal previous
+            stats['steps'] += 1
+            stats['pages'] = total
+            # remaining qui remonte = la source a été modifiée par une autre connexion → copie relancée
+            if previous is not None and remaining > previous:
+                stats['restarts'] += 1
+                if stats['restarts'] > MAX_RESTARTS:
+                    raise Restarted()
+            previous = remaining
+            # Pause avant le pas suivant : laisse passer les écritures et les lectures du serveur
+            if remaining and sleep_ms > 0:
+                t = time.perf_counter()
+                time.sleep(sleep_ms / 1000)
+                stats['paused_s'] += time.perf_counter() - t
+
+        try:
+            src.backup(dest, pages=pages, progress=progress)
+        except Restarted:
+            print(f"   ⚠️ {MAX_RESTARTS} reprise(s) (écritures concurrentes) → copie en un seul pas")
+            src.backup(dest, pages=-1)
+            stats['steps'] += 1
+        stats['page_size'] = dest.execute("PRAGMA page_size").fetchone()[0]
+        stats['pages'] = dest.execute("PRAGMA page_count").fetchone()[0]
+        # Copie autonome : pas de -wal/-shm à côté, ouvrable en lecture seule partout
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+        src.close()
+    return stats
+
+
+def table_counts(conn):
+    """{table: lignes} hors tables sqlite_* et tables virtuelles (FTS5, R*Tree) et leurs tables internes"""
+    virtual = list_virtual_tables(conn.cursor())
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        if not is_virtual_or_shadow(row[0], virtual)]
+    return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+
+def verify(path, source_path=None):
+    """quick_check + comptages de la copie ; compteurs table_stats (triggers) comparés au COUNT(*)
+    → renvoie la liste des problèmes (vide = copie saine)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA quick_check") if row[0] != 'ok']
+        counts = table_counts(conn)
+        try:
+            stats = dict(conn.execute("SELECT table_name, row_count FROM table_stats WHERE bucket = '*'"))
+        except sqlite3.OperationalError:
+            stats = {}
+    finally:
+        conn.close()
+    for table, count in stats.items():
+        if table in counts and counts[table] != count:
+            problems.append(f"{table}: {count:,} ligne(s) dans table_stats, {counts[table]:,} comptée(s)")
+
+    source = {}
+    if source_path:
+        conn = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True, timeout=30)
+        try:
+            source = table_counts(conn)
+        finally:
+            conn.close()
+    print(f"   🔎 quick_check {'ok' if not problems else 'ÉCHEC'}, {len(counts)} table(s)")
+    for table, count in counts.items():
+        # Écart avec la source = écritures arrivées après le snapshot copié (pas une erreur)
+        drift = f"  (source: {source[table]:,})" if table in source and source[table] != count else ''
+        print(f"      {table:<28} {count:>12,}{drift}")
+    return problems
+
+
+def publish(tmp, dest):
+    """Remplace dest par tmp (rename atomique : les lecteurs ouverts gardent l'ancienne copie)"""
+    for suffix in ('-wal', '-shm', '-journal'):
+        Path(f"{dest}{suffix}").unlink(missing_ok=True)
+    os.replace(tmp, dest)
+
+
+def prune(backup_dir, stem, keep):
+    """Ne garde que les keep sauvegardes les plus récentes"""
+    backups = sorted(backup_dir.glob(f"{stem}-*.db"))
+    for old in backups[:-keep] if keep > 0 else []:
+        old.unlink()
+        print(f"   🗑️  {old.name}")
+
+
+def backup(db_path=DB_PATH, dest=None, pages=PAGES_PER_STEP, sleep_ms=SLEEP_MS, check=True, keep=KEEP):
+    """Sauvegarde (ou réplique si dest est un fichier) de db_path ; renvoie le chemin écrit"""
+    db_path = Path(db_path)
+    # Dossier : existant, ou chemin sans extension (.db → fichier)
+    if dest is None or Path(dest).is_dir() or not Path(dest).suffix:
+        backup_dir = Path(dest or BACKUP_DIR)
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        dest = backup_dir / f"{db_path.stem}-{datetime.now():%Y%m%d-%H%M%S}.db"
+    else:
+        backup_dir = None
+    dest = Path(dest)
+    tmp = dest.with_name(dest.name + '.tmp')
+    for suffix in ('', '-journal'):
+        Path(f"{tmp}{suffix}").unlink(missing_ok=True)
+
+    print(f"💾 Sauvegarde {db_path} → {dest} ({pages} page(s)/pas, pause {sleep_ms} ms)")
+    t0 = time.perf_counter()
+    try:
+        stats = copy_database(db_path, tmp, pages, sleep_ms)
+        elapsed = time.perf_counter() - t0
+        size = stats['pages'] * stats['page_size']
+        # Débit de copie hors pauses ; la durée totale inclut les pauses entre les pas
+        copying = max(elapsed - stats['paused_s'], 1e-9)
+        print(f"   ✅ {size / 1e6:,.1f} Mo en {elapsed:.2f}s dont {stats['paused_s']:.2f}s de pause "
+              f"({size / 1e6 / copying:,.1f} Mo/s, {stats['pages'] / copying:,.0f} pages/s hors pauses, "
+              f"{stats['steps']} pas, {stats['restarts']} reprise(s))")
+        if check:
+            problems = verify(tmp, db_path)
+            if problems:
+                for problem in problems:
+                    print(f"   ❌ {problem}")
+                raise RuntimeError(f"Copie invalide, {dest} non remplacé")
+        publish(tmp, dest)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+    if backup_dir and keep:
+        prune(backup_dir, db_path.stem, keep)
+    print(f"✅ {dest} prêt en {time.perf_counter() - t0:.2f}s")
+    return dest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sauvegarde à chaud (API backup SQLite) et réplique lecture seule")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Base à sauvegarder")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--out', type=Path, help=f"Fichier ou dossier de sauvegarde (défaut {BACKUP_DIR})")
+    target.add_argument('--replica', type=Path, nargs='?', const=True,
+                        help="Mettre à jour la réplique lecture seule (défaut {base}.replica.db)")
+    parser.add_argument('--pages', type=int, default=PAGES_PER_STEP, help="Pages copiées par pas (-1 = tout d'un coup)")
+    parser.add_argument('--sleep-ms', type=int, default=SLEEP_MS, help="Pause entre deux pas")
+    parser.add_argument('--keep', type=int, default=KEEP, help="Sauvegardes conservées dans le dossier (0 = toutes)")
+    parser.add_argument('--no-verify', action='store_true', help="Sans quick_check ni comptages")
+    args = parser.parse_args()
+    replica = replica_path(args.db) if args.replica is True else args.replica
+    backup(args.db, replica or args.out, args.pages, args.sleep_ms, not args.no_verify, args.keep)
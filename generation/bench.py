@@ -0,0 +1,289 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from generate_db import SCHEMA_VERSION, create_database
+from generate_models import detect_fts, indexed_columns, keyset_column
+from query_shapes import base_tables, model_shapes, shape
+
+# Banc de latence des requêtes émises par les models générés et GenericController (query_shapes.py)
+#   - bases synthétiques à plusieurs échelles (construites une fois, réutilisées tant que la spec ne change pas)
+#   - chaque forme rejouée à chaud (cache de pages OS + SQLite rempli) et à froid (pages OS évincées)
+#   - p50/p95/p99 + lignes/s en JSON ; --baseline fait échouer (exit 1) une régression > --threshold
+
+# Échelle → lignes des grosses tables (Avis, Favori, Historique) ; tables parentes plafonnées
+SCALES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+DEFAULT_SCALES = '1k,100k'  # 10m : construction longue, à demander explicitement
+DATA_DIR = Path(tempfile.gettempdir()) / "nird_bench"
+
+REPEAT = 30        # échantillons à chaud
+COLD_REPEAT = 5    # échantillons à froid (réouverture + éviction à chaque fois)
+BUDGET_S = 2.0     # temps max par (forme, état) : les formes lentes font moins d'échantillons
+THRESHOLD = 0.25   # régression tolérée (+25 %)
+# Écart absolu en dessous duquel on ne parle pas de régression, par état : à froid, la gigue d'I/O
+# (~1 ms) dépasse les écarts réels des petites requêtes
+NOISE_MS = {'warm': 0.05, 'cold': 2.0}
+GATED_STATES = ('warm',)  # états comparés par défaut (--states warm,cold pour inclure le froid)
+MIN_SAMPLES = 5    # échantillons minimum, des deux côtés, pour comparer une forme
+
+METHODS = ('count', 'findAll', 'findById', 'recent', 'topByField', 'search', 'getPaginated')
+
+
+def scale_sizes(rows):
+    """Spec --scale d'une échelle : rows lignes dans les tables de faits"""
+    logiciels = max(rows // 10, 50)
+    return {
+        'users': min(rows, 1_000_000),
+        'categories': min(max(rows // 1000, 10), 500),
+        'tags': min(max(rows // 1000, 20), 2000),
+        'logiciels': min(logiciels, 100_000),
+        'logiciel_tags': min(logiciels, 100_000) * 3,
+        'logiciel_categories': min(logiciels, 100_000),
+        'avis': rows,
+        'favoris': rows,
+        'historique': rows,
+        'pilotes': min(rows, 1_000_000),
+        'demarches': min(rows, 100_000),
+    }
+
+
+def build_db(scale, data_dir, seed=42, workers=1, rebuild=False):
+    """Base de l'échelle demandée, réutilisée si déjà construite avec la même spec (nom = hash de la spec)"""
+    sizes = scale_sizes(SCALES[scale])
+    spec = json.dumps({'sizes': sizes, 'seed': seed, 'schema': SCHEMA_VERSION}, sort_keys=True)
+    path = Path(data_dir) / f"bench_{scale}_{hashlib.sha256(spec.encode()).hexdigest()[:10]}.db"
+    if path.exists() and not rebuild:
+        print(f"♻️  {scale}: base existante {path.name}")
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    print(f"🏗️  {scale}: construction {path.name} ({', '.join(f'{k}={v:,}' for k, v in sizes.items())})...")
+    t0 = time.perf_counter()
+    # Logs détaillés de generate_db masqués : seul le résultat intéresse le banc
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(path, scale=sizes, seed=seed, workers=workers)
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"   ✅ {time.perf_counter() - t0:.1f}s, {path.stat().st_size / 1e6:,.1f} Mo")
+    return path
+
+
+def bench_shapes(conn):
+    """Formes rejouées : model_shapes de chaque table (offset profond = 90 % de la table)
+    + getPaginated() de GenericController sur chaque colonne triable (SORTABLE_COLUMNS du model)"""
+    fts = detect_fts(conn.cursor())
+    counted = {row[0][:-len('_stats_ai')] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE '%\\_stats\\_ai' ESCAPE '\\'")}
+    shapes = []
+    for table in base_tables(conn):
+        rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        table_shapes = model_shapes(conn, table, fts.get(table), rows * 9 // 10, table in counted)
+        columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        pk_col = next((col[1] for col in columns if col[5]), 'rowid')
+        labels = {s['label'] for s in table_shapes}
+        sortable, _ = indexed_columns(conn.cursor(), table, keyset_column(columns, pk_col))
+        for col in dict.fromkeys(['rowid'] + sortable):
+            label = f"{table}.getPaginated(sort={col})"
+            if label not in labels:
+                table_shapes.append(shape(label, table,
+                                          f"SELECT * FROM {table} WHERE 1=1 ORDER BY {col} DESC LIMIT ? OFFSET ?",
+                                          (20, 0), order=(f'{col} DESC',)))
+        shapes.extend(s for s in table_shapes if s['label'].split('.', 1)[1].startswith(METHODS))
+    return shapes
+
+
+def connect(db_path):
+    """Connexion lecture seule, comme les readers du pool Node.js"""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+
+
+def evict(db_path):
+    """Retire les pages de la base du cache OS (posix_fadvise DONTNEED ; pages propres uniquement)"""
+    for suffix in ('', '-wal'):
+        try:
+            fd = os.open(f"{db_path}{suffix}", os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def run_once(conn, sql, params):
+    t0 = time.perf_counter()
+    rows = len(conn.execute(sql, params).fetchall())
+    return (time.perf_counter() - t0) * 1000, rows
+
+
+def percentile(samples, q):
+    """Percentile au rang le plus proche (échantillons triés)"""
+    return samples[min(len(samples) - 1, max(0, round(q / 100 * len(samples) + 0.5) - 1))]
+
+
+def summarize(scale, s, state, samples, rows):
+    samples = sorted(samples)
+    total_s = sum(samples) / 1000
+    return {
+        'scale': scale, 'label': s['label'], 'table': s['table'], 'state': state, 'sql': s['sql'],
+        'n': len(samples), 'rows': rows,
+        'p50_ms': round(percentile(samples, 50), 4),
+        'p95_ms': round(percentile(samples, 95), 4),
+        'p99_ms': round(percentile(samples, 99), 4),
+        'rows_per_s': round(rows * len(samples) / total_s) if total_s else None,
+    }
+
+
+def bench_warm(conn, s, repeat, budget):
+    run_once(conn, s['sql'], s['params'])  # chauffe : pages en cache, plan préparé
+    samples, rows, started = [], 0, time.perf_counter()
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() - started < budget):
+        ms, rows = run_once(conn, s['sql'], s['params'])
+        samples.append(ms)
+    return samples, rows
+
+
+def bench_cold(db_path, s, repeat, budget):
+    samples, rows, started = [], 0, time.perf_counter()
+    while len(samples) < repeat and (len(samples) < 2 or time.perf_counter() - started < budget):
+        evict(db_path)
+        conn = connect(db_path)  # nouvelle connexion : cache de pages SQLite vide
+        try:
+            ms, rows = run_once(conn, s['sql'], s['params'])
+        finally:
+            conn.close()
+        samples.append(ms)
+    return samples, rows
+
+
+def bench_scale(scale, db_path, repeat=REPEAT, cold_repeat=COLD_REPEAT, budget=BUDGET_S, only=None, cold=True):
+    conn = connect(db_path)
+    try:
+        shapes = [s for s in bench_shapes(conn) if not only or only in s['label']]
+        print(f"⏱️  {scale}: {len(shapes)} forme(s) de requête")
+        results = []
+        for s in shapes:
+            results.append(summarize(scale, s, 'warm', *bench_warm(conn, s, repeat, budget)))
+        if cold:
+            os.sync()  # pages sales non évinçables par fadvise
+            for s in shapes:
+                results.append(summarize(scale, s, 'cold', *bench_cold(db_path, s, cold_repeat, budget)))
+    finally:
+        conn.close()
+    for r in results:
+        print(f"   {r['state']:<4} {r['label']:<45} p50 {r['p50_ms']:>9.3f}  p95 {r['p95_ms']:>9.3f}  "
+              f"p99 {r['p99_ms']:>9.3f} ms  {r['rows']:>4} ligne(s)")
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD, noise_ms=NOISE_MS, metric='p50_ms',
+            states=GATED_STATES, min_samples=MIN_SAMPLES):
+    """Régressions (scale, label, state) de results par rapport à baseline (même forme, même état),
+    pour les états demandés et les formes assez échantillonnées des deux côtés"""
+    previous = {(r['scale'], r['label'], r['state']): r for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r['scale'], r['label'], r['state']))
+        if not old or r['state'] not in states or min(r['n'], old.get('n', 0)) < min_samples:
+            continue
+        before, after = old[metric], r[metric]
+        if after > before * (1 + threshold) and after - before > noise_ms[r['state']]:
+            regressions.append({'scale': r['scale'], 'label': r['label'], 'state': r['state'],
+                                'metric': metric, 'baseline_ms': before, 'current_ms': after,
+                                'ratio': round(after / before, 2) if before else None})
+    return regressions
+
+
+def run(scales, data_dir=DATA_DIR, repeat=REPEAT, cold_repeat=COLD_REPEAT, budget=BUDGET_S, only=None,
+        workers=1, rebuild=False):
+    cold = hasattr(os, 'posix_fadvise')
+    if not cold:
+        print("⚠️  posix_fadvise indisponible sur cette plateforme : mesures à froid ignorées")
+    results = []
+    for scale in scales:
+        db_path = build_db(scale, data_dir, workers=workers, rebuild=rebuild)
+        results.extend(bench_scale(scale, db_path, repeat, cold_repeat, budget, only, cold))
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'sqlite': sqlite3.sqlite_version, 'python': platform.python_version(),
+            'platform': platform.platform(), 'scales': {s: SCALES[s] for s in scales},
+            'repeat': repeat, 'cold_repeat': cold_repeat,
+        },
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de latence des requêtes des models générés (à chaud / à froid)")
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help=f"Échelles séparées par des virgules parmi {', '.join(SCALES)} (défaut {DEFAULT_SCALES})")
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help="Dossier des bases de test")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire les bases même si elles existent")
+    parser.add_argument('--workers', type=int, default=1, help="Processus pour générer le jeu synthétique")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Échantillons à chaud par requête")
+    parser.add_argument('--cold-repeat', type=int, default=COLD_REPEAT, help="Échantillons à froid par requête")
+    parser.add_argument('--budget', type=float, default=BUDGET_S, help="Secondes max par requête et par état")
+    parser.add_argument('--only', help="Ne rejouer que les formes dont le libellé contient ce texte")
+    parser.add_argument('--json', type=Path, help="Écrire les résultats JSON dans ce fichier (sinon stdout)")
+    parser.add_argument('--baseline', type=Path, help="Résultats de référence à comparer")
+    parser.add_argument('--save-baseline', type=Path, help="Enregistrer ces résultats comme référence")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"Régression tolérée, en fraction (défaut {THRESHOLD})")
+    parser.add_argument('--metric', choices=('p50_ms', 'p95_ms', 'p99_ms'), default='p50_ms',
+                        help="Percentile comparé à la référence")
+    parser.add_argument('--states', default=','.join(GATED_STATES),
+                        help=f"États comparés à la référence, parmi {', '.join(NOISE_MS)} (défaut {','.join(GATED_STATES)})")
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES,
+                        help=f"Échantillons minimum pour comparer une forme (défaut {MIN_SAMPLES})")
+    args = parser.parse_args()
+
+    scales = [s.strip().lower() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"Échelle inconnue: {', '.join(unknown)} (attendu: {', '.join(SCALES)})")
+
+    states = tuple(s.strip() for s in args.states.split(',') if s.strip())
+    if set(states) - set(NOISE_MS):
+        parser.error(f"État inconnu: {args.states} (attendu: {', '.join(NOISE_MS)})")
+
+    # Sans --json, stdout ne porte que le JSON (bench.py | jq ...) : la progression part sur stderr
+    exit_code = 0
+    with contextlib.redirect_stdout(sys.stderr) if not args.json else contextlib.nullcontext():
+        report = run(scales, args.data_dir, args.repeat, args.cold_repeat, args.budget, args.only,
+                     args.workers, args.rebuild)
+        if args.baseline:
+            report['regressions'] = compare(report['results'],
+                                            json.loads(args.baseline.read_text(encoding='utf-8')),
+                                            args.threshold, metric=args.metric, states=states,
+                                            min_samples=args.min_samples)
+            for r in report['regressions']:
+                print(f"🔴 Régression {r['scale']} {r['state']} {r['label']}: "
+                      f"{r['baseline_ms']:.3f} → {r['current_ms']:.3f} ms ({args.metric})", file=sys.stderr)
+            if report['regressions']:
+                exit_code = 1
+            else:
+                print(f"✅ Aucune régression > {args.threshold:.0%} ({', '.join(states)}) "
+                      f"par rapport à {args.baseline}")
+
+        data = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.json:
+            args.json.write_text(data, encoding='utf-8')
+            print(f"💾 Résultats → {args.json}")
+        if args.save_baseline:
+            args.save_baseline.write_text(data, encoding='utf-8')
+            print(f"💾 Référence → {args.save_baseline}")
+    if not args.json:
+        print(data)
+    sys.exit(exit_code)
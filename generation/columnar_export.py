@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+from generate_db import BASE_DIR, DB_PATH
+
+# Export colonnaire des grosses tables pour les statistiques d'administration (lues par columnar_query.py)
+#   {out}/{Table}/{colonne}.{bloc:06d}.npy : 1 fichier .npy par colonne et par bloc, ouvert en mmap
+#   {out}/dims/{Table}/{colonne}.npy : dimensions indexées par id (Logiciel, Utilisateur), texte encodé
+#   par dictionnaire (codes int32, -1 = NULL/absent ; dictionnaires append-only dans le manifest)
+#   {out}/manifest.json : blocs, high-water mark par table, dictionnaires (écrit en dernier, rename atomique)
+# Incrémental : seuls les id au-delà du dernier exporté sont lus (par plages de la clé, transactions courtes,
+# connexion lecture seule) → 1 nouveau bloc ; les petits blocs de fin sont fusionnés.
+# Suppressions ignorées : une ligne exportée le reste (ex: Historique compacté par historique_rollup.py).
+
+OUT_DIR = BASE_DIR / "serveur" / "columnar"
+FORMAT = 1                 # à incrémenter si la disposition change (→ export complet)
+BLOCK_ROWS = 4_000_000     # lignes par bloc (unité de parallélisme des requêtes)
+READ_IDS = 500_000         # plage d'id lue par transaction
+FETCH_ROWS = 100_000
+NULL = -1                  # entier NULL (note absente, horodatage illisible)
+
+# Horodatages epoch (jeu synthétique) ou texte 'YYYY-MM-DD HH:MM:SS' (serveur) → secondes epoch
+EPOCH_SQL = ("CASE WHEN typeof({col}) IN ('integer', 'real') THEN CAST({col} AS INTEGER) "
+             "ELSE COALESCE(CAST(strftime('%s', {col}) AS INTEGER), -1) END")
+
+# Faits : table → (clé AUTOINCREMENT, {colonne: (expression SQL, dtype)})
+FACTS = {
+    'Avis': ('review_id', {
+        'user_id': ('user_id', 'int32'),
+        'software_id': ('software_id', 'int32'),
+        'note': (f'COALESCE(note, {NULL})', 'int8'),
+        'created_at': (EPOCH_SQL.format(col='created_at'), 'int64'),
+    }),
+    'Historique': ('history_id', {
+        'user_id': ('user_id', 'int32'),
+        'software_id': ('software_id', 'int32'),
+        'viewed_at': (EPOCH_SQL.format(col='viewed_at'), 'int64'),
+    }),
+    'Favori': ('favorite_id', {
+        'user_id': ('user_id', 'int32'),
+        'software_id': ('software_id', 'int32'),
+        'added_at': (EPOCH_SQL.format(col='added_at'), 'int64'),
+    }),
+}
+
+# Dimensions : table → (clé = colonne de jointure des faits, colonnes texte encodées par dictionnaire)
+DIMENSIONS = {
+    'Logiciel': ('software_id', ('license_type', 'platform')),
+    'Utilisateur': ('user_id', ('role',)),
+}
+
+
+def read_manifest(out):
+    path = out / 'manifest.json'
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text(encoding='utf-8'))
+    return manifest if manifest.get('format') == FORMAT else None
+
+
+def write_atomic(path, data):
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data, indent=1, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def block_path(out, table, column, seq):
+    return out / table / f"{column}.{seq:06d}.npy"
+
+
+def export_block(conn, out, table, seq, low, high, rows):
+    """Lignes low < id <= high → 1 bloc de `rows` lignes, écrit colonne par colonne via open_memmap"""
+    key, columns = FACTS[table]
+    arrays = {name: np.lib.format.open_memmap(block_path(out, table, name, seq), mode='w+',
+                                              dtype=dtype, shape=(rows,))
+              for name, (_, dtype) in columns.items()}
+    select = ', '.join(expr for expr, _ in columns.values())
+    filled = 0
+    # Plages de clé : chaque lecture est une transaction courte (pas de snapshot tenu pendant tout l'export)
+    for start in range(low, high, READ_IDS):
+        cursor = conn.execute(f"SELECT {select} FROM {table} WHERE {key} > ? AND {key} <= ? ORDER BY {key}",
+                              (start, min(start + READ_IDS, high)))
+        while True:
+            batch = cursor.fetchmany(FETCH_ROWS)
+            if not batch:
+                break
+            batch = batch[:rows - filled]  # garde-fou : jamais plus de lignes que le bloc alloué
+            values = np.fromiter(chain.from_iterable(batch), dtype=np.int64,
+                                 count=len(batch) * len(columns)).reshape(-1, len(columns))
+            for i, array in enumerate(arrays.values()):
+                array[filled:filled + len(batch)] = values[:, i]
+            filled += len(batch)
+    for array in arrays.values():
+        array.flush()
+    if filled < rows:
+        # Lignes supprimées entre le COUNT et la lecture : bloc réécrit à la bonne longueur
+        for name in list(arrays):
+            data = np.array(arrays.pop(name)[:filled])
+            np.save(block_path(out, table, name, seq), data)
+    return filled
+
+
+def merge_tail(out, table, blocks):
+    """Fusionne les petits blocs de fin (exports incrémentaux successifs) tant qu'ils tiennent dans BLOCK_ROWS"""
+    tail = []
+    for block in reversed(blocks):
+        if block['rows'] >= BLOCK_ROWS or sum(b['rows'] for b in tail) + block['rows'] > BLOCK_ROWS:
+            break
+        tail.insert(0, block)
+    if len(tail) < 2:
+        return blocks, []
+    seq = blocks[-1]['seq'] + 1
+    for name, (_, dtype) in FACTS[table][1].items():
+        merged = np.lib.format.open_memmap(block_path(out, table, name, seq), mode='w+', dtype=dtype,
+                                           shape=(sum(b['rows'] for b in tail),))
+        offset = 0
+        for block in tail:
+            part = np.load(block_path(out, table, name, block['seq']), mmap_mode='r')
+            merged[offset:offset + len(part)] = part
+            offset += len(part)
+        merged.flush()
+    merged_block = {'seq': seq, 'rows': sum(b['rows'] for b in tail),
+                    'first_id': tail[0]['first_id'], 'last_id': tail[-1]['last_id']}
+    return blocks[:-len(tail)] + [merged_block], tail
+
+
+def export_table(conn, out, table, state):
+    """Nouveaux blocs au-delà de state['high_water'] ; renvoie (state mis à jour, blocs obsolètes)"""
+    key, _ = FACTS[table]
+    (out / table).mkdir(parents=True, exist_ok=True)
+    low = state['high_water']
+    top = conn.execute(f"SELECT MAX({key}) FROM {table}").fetchone()[0] or 0
+    blocks = list(state['blocks'])
+    seq = blocks[-1]['seq'] + 1 if blocks else 1
+    while low < top:
+        # Bloc = plage d'id de BLOCK_ROWS lignes au plus (COUNT sur la clé : parcours de l'index PK)
+        high = conn.execute(f"SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT 1 OFFSET ?",
+                            (low, BLOCK_ROWS - 1)).fetchone()
+        high = min(high[0] if high else top, top)
+        rows = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {key} > ? AND {key} <= ?",
+                            (low, high)).fetchone()[0]
+        if rows:
+            rows = export_block(conn, out, table, seq, low, high, rows)
+            blocks.append({'seq': seq, 'rows': rows, 'first_id': low + 1, 'last_id': high})
+            seq += 1
+        low = high
+    blocks, obsolete = merge_tail(out, table, blocks)
+    return {'key': key, 'high_water': low, 'rows': sum(b['rows'] for b in blocks),
+            'columns': {name: dtype for name, (_, dtype) in FACTS[table][1].items()}, 'blocks': blocks}, obsolete
+
+
+def export_dimension(conn, out, table, previous):
+    """Dimension réécrite entière (petite) : 1 tableau de codes par colonne, indexé par id"""
+    key, columns = DIMENSIONS[table]
+    directory = out / 'dims' / table
+    directory.mkdir(parents=True, exist_ok=True)
+    dictionaries = {col: list(previous.get('dictionaries', {}).get(col, [])) for col in columns}
+    rows = conn.execute(f"SELECT {key}, {', '.join(columns)} FROM {table}").fetchall()
+    size = max((row[0] for row in rows), default=0) + 1
+    for i, col in enumerate(columns, 1):
+        dictionary = dictionaries[col]
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        codes = np.full(size, NULL, dtype=np.int32)
+        for row in rows:
+            value = row[i]
+            if value is None:
+                continue
+            if value not in lookup:
+                lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes[row[0]] = lookup[value]
+        tmp = directory / f"{col}.tmp.npy"
+        np.save(tmp, codes)
+        os.replace(tmp, directory / f"{col}.npy")
+    return {'key': key, 'size': size, 'dictionaries': dictionaries}
+
+
+def export(db_path=DB_PATH, out=OUT_DIR, full=False):
+    out = Path(out)
+    manifest = None if full else read_manifest(out)
+    if manifest is None and out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = manifest or {'format': FORMAT, 'tables': {}, 'dimensions': {}}
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    obsolete = []
+    t0 = time.perf_counter()
+    try:
+        for table in FACTS:
+            previous = manifest['tables'].get(table, {'high_water': 0, 'blocks': []})
+            t = time.perf_counter()
+            state, replaced = export_table(conn, out, table, previous)
+            manifest['tables'][table] = state
+            obsolete += [(table, block['seq']) for block in replaced]
+            added = state['rows'] - sum(b['rows'] for b in previous['blocks'])
+            print(f"   🧱 {table}: +{added:,} ligne(s) → {state['rows']:,} en {len(state['blocks'])} bloc(s), "
+                  f"id ≤ {state['high_water']:,} ({time.perf_counter() - t:.2f}s)")
+        for table in DIMENSIONS:
+            manifest['dimensions'][table] = export_dimension(conn, out, table, manifest['dimensions'].get(table, {}))
+            sizes = ', '.join(f"{col} {len(d)}" for col, d in manifest['dimensions'][table]['dictionaries'].items())
+            print(f"   📚 {table}: {manifest['dimensions'][table]['size']:,} id ({sizes} valeur(s))")
+    finally:
+        conn.close()
+    manifest['exported_at'] = int(time.time())
+    write_atomic(out / 'manifest.json', manifest)
+    # Blocs fusionnés supprimés une fois le nouveau manifest en place
+    for table, seq in obsolete:
+        for name in FACTS[table][1]:
+            block_path(out, table, name, seq).unlink(missing_ok=True)
+    print(f"✅ Export colonnaire {out} en {time.perf_counter() - t0:.2f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export colonnaire (.npy en mmap) de Avis, Historique et Favori")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Base lue (connexion lecture seule)")
+    parser.add_argument('--out', type=Path, default=OUT_DIR, help=f"Dossier de l'export (défaut {OUT_DIR})")
+    parser.add_argument('--full', action='store_true', help="Tout réexporter (sinon id postérieurs au dernier export)")
+    args = parser.parse_args()
+    print(f"🧱 Export colonnaire ({args.db})")
+    export(args.db, args.out, args.full)
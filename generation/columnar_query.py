@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from columnar_export import DIMENSIONS, FACTS, NULL, OUT_DIR, block_path, read_manifest
+
+# Agrégats group-by / filtre sur l'export colonnaire (columnar_export.py), sans ouvrir serveur/database.db
+#   aggregate('Avis', by=['license_type', 'note'], where=[('created_at', '>=', ts)], func='mean', value='note')
+#   colonnes : celles du fait, celles d'une dimension jointe par sa clé (license_type/platform → software_id,
+#   role → user_id), ou un horodatage tronqué ('viewed_at:day', 'created_at:month')
+#   chaque bloc est agrégé par un process (fichiers en mmap : pages partagées par le cache OS), puis fusion
+
+FUNCS = ('count', 'sum', 'mean')
+OPS = {'==': np.equal, '!=': np.not_equal, '<': np.less, '<=': np.less_equal,
+       '>': np.greater, '>=': np.greater_equal}
+UNITS = ('day', 'month')
+TOP = 20
+
+
+def dimension_of(table, name):
+    """(dimension, clé de jointure) portant la colonne name pour ce fait, ou None"""
+    for dim, (key, columns) in DIMENSIONS.items():
+        if name in columns and key in FACTS[table][1]:
+            return dim, key
+    return None
+
+
+def check_column(table, name):
+    base, _, unit = name.partition(':')
+    if unit and (unit not in UNITS or base not in FACTS[table][1]):
+        raise ValueError(f"Troncature inconnue: {name} (horodatage:{'|'.join(UNITS)})")
+    if base not in FACTS[table][1] and not dimension_of(table, base):
+        dims = [c for d, (k, cols) in DIMENSIONS.items() if k in FACTS[table][1] for c in cols]
+        raise ValueError(f"Colonne inconnue pour {table}: {name} "
+                         f"(disponibles: {', '.join([*FACTS[table][1], *dims])})")
+
+
+def column(root, table, seq, name):
+    """Valeurs int64 de la colonne name pour un bloc (codes de dictionnaire pour une dimension)"""
+    base, _, unit = name.partition(':')
+    if base in FACTS[table][1]:
+        values = np.load(block_path(root, table, base, seq), mmap_mode='r')
+        if unit == 'day':
+            return np.where(values == NULL, NULL, values // 86400)
+        if unit == 'month':
+            months = values.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+            return np.where(values == NULL, NULL, months)
+        return values.astype(np.int64)
+    dim, key = dimension_of(table, base)
+    codes = np.load(root / 'dims' / dim / f"{base}.npy", mmap_mode='r')
+    ids = np.load(block_path(root, table, key, seq), mmap_mode='r')
+    # Id absent de la dimension (ligne créée après l'export de la dimension) → NULL
+    inside = ids < len(codes)
+    return np.where(inside, codes[np.where(inside, ids, 0)], NULL).astype(np.int64)
+
+
+def group(keys):
+    """Colonnes de regroupement → (groupes distincts [n_groupes × n_colonnes], indice de groupe par ligne)"""
+    if not keys:
+        return np.zeros((1, 0), dtype=np.int64), None
+    lows = [k.min() for k in keys]
+    spans = [int(k.max() - low) + 1 for k, low in zip(keys, lows)]
+    if np.prod(spans, dtype=float) < 2 ** 62:
+        # Clé unique en base mixte : 1 seul tri (np.unique) au lieu d'un tri lexicographique multi-colonnes
+        combined = np.zeros(len(keys[0]), dtype=np.int64)
+        for k, low, span in zip(keys, lows, spans):
+            combined = combined * span + (k - low)
+        unique, inverse = np.unique(combined, return_inverse=True)
+        groups = np.empty((len(unique), len(keys)), dtype=np.int64)
+        for i in range(len(keys) - 1, -1, -1):
+            groups[:, i] = unique % spans[i] + lows[i]
+            unique = unique // spans[i]
+        return groups, inverse
+    return np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+
+
+def partial(root, table, seq, by, where, value):
+    """Agrégat d'un bloc → {groupe (codes): [lignes, somme]} (exécuté dans un process du pool)"""
+    mask = None
+    for name, op, operand in where:
+        values = column(root, table, seq, name)
+        if op == 'in':
+            selected = np.isin(values, operand)
+        elif op == 'between':
+            selected = (values >= operand[0]) & (values <= operand[1])
+        else:
+            selected = OPS[op](values, operand)
+        mask = selected if mask is None else mask & selected
+    if value:
+        values = column(root, table, seq, value)
+        present = values != NULL
+        mask = present if mask is None else mask & present
+    keys = [column(root, table, seq, name) for name in by]
+    if mask is not None:
+        keys = [k[mask] for k in keys]
+    rows = int(mask.sum()) if mask is not None else None
+    if rows == 0:
+        return {}
+    groups, inverse = group(keys)
+    if inverse is None:
+        count = np.array([rows if rows is not None else
+                          len(np.load(block_path(root, table, next(iter(FACTS[table][1])), seq), mmap_mode='r'))])
+        inverse = np.zeros(count[0], dtype=np.int64)
+    else:
+        count = np.bincount(inverse, minlength=len(groups))
+    sums = np.zeros(len(groups))
+    if value:
+        weights = values[mask] if mask is not None else values
+        sums = np.bincount(inverse, weights=weights, minlength=len(groups))
+    return {tuple(g.tolist()): [int(c), float(s)] for g, c, s in zip(groups, count, sums) if c}
+
+
+def decoder(manifest, table, name):
+    """Code → valeur lisible : texte de dictionnaire, date ISO, mois, ou l'entier (NULL → None)"""
+    base, _, unit = name.partition(':')
+    if base not in FACTS[table][1]:
+        dictionary = manifest['dimensions'][dimension_of(table, base)[0]]['dictionaries'][base]
+        return lambda code: dictionary[code] if code != NULL else None
+    if unit == 'day':
+        return lambda code: (datetime.fromtimestamp(code * 86400, timezone.utc).date().isoformat()
+                             if code != NULL else None)
+    if unit == 'month':
+        return lambda code: f"{1970 + code // 12:04d}-{code % 12 + 1:02d}" if code != NULL else None
+    return lambda code: code if code != NULL else None
+
+
+def encode(manifest, table, name, operand):
+    """Valeurs de filtre sur une dimension → codes du dictionnaire (valeur inconnue : ne filtre rien)"""
+    if name.partition(':')[0] in FACTS[table][1]:
+        return operand
+    dictionary = manifest['dimensions'][dimension_of(table, name)[0]]['dictionaries'][name]
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    if isinstance(operand, (list, tuple)):
+        return [lookup.get(v, NULL - 1) for v in operand]
+    return lookup.get(operand, NULL - 1)
+
+
+def aggregate(table, by=(), where=(), func='count', value=None, root=OUT_DIR, workers=None):
+    """{groupe décodé (tuple): valeur} ; func count | sum | mean (value = colonne sommée, NULL exclus)"""
+    root = Path(root)
+    manifest = read_manifest(root)
+    if manifest is None or table not in manifest['tables']:
+        raise FileNotFoundError(f"Pas d'export colonnaire de {table} dans {root} (lancer columnar_export.py)")
+    if func not in FUNCS:
+        raise ValueError(f"Fonction inconnue: {func} ({', '.join(FUNCS)})")
+    if func != 'count' and not value:
+        raise ValueError(f"{func} demande une colonne value")
+    for name in [*by, *(w[0] for w in where), *([value] if value else [])]:
+        check_column(table, name)
+    where = [(name, op, encode(manifest, table, name, operand)) for name, op, operand in where]
+    for _, op, _ in where:
+        if op not in OPS and op not in ('in', 'between'):
+            raise ValueError(f"Opérateur inconnu: {op}")
+
+    blocks = [block['seq'] for block in manifest['tables'][table]['blocks']]
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    args = [(root, table, seq, tuple(by), tuple(where), value) for seq in blocks]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(partial, *zip(*args)))
+    else:
+        partials = [partial(*a) for a in args]
+
+    merged = {}
+    for result in partials:
+        for key, (count, total) in result.items():
+            slot = merged.setdefault(key, [0, 0.0])
+            slot[0] += count
+            slot[1] += total
+    decoders = [decoder(manifest, table, name) for name in by]
+    pick = {'count': lambda c, s: c, 'sum': lambda c, s: s, 'mean': lambda c, s: s / c}[func]
+    return {tuple(d(code) for d, code in zip(decoders, key)): pick(count, total)
+            for key, (count, total) in merged.items()}
+
+
+WHERE_RE = re.compile(r"^\s*([\w:]+)\s*(==|!=|<=|>=|<|>|=)\s*(.+?)\s*$")
+
+
+def parse_where(text):
+    """'note>=4', 'license_type=GPL,MIT' (liste → in)"""
+    match = WHERE_RE.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Filtre invalide: {text} (ex: note>=4, platform=Web)")
+    name, op, raw = match.groups()
+    parse = lambda v: int(v) if re.fullmatch(r"-?\d+", v) else v
+    values = [parse(v.strip()) for v in raw.split(',')]
+    if len(values) > 1:
+        if op not in ('=', '=='):
+            raise argparse.ArgumentTypeError(f"Liste de valeurs avec = seulement: {text}")
+        return name, 'in', values
+    return name, '==' if op == '=' else op, values[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrégats sur l'export colonnaire (sans accès à la base SQLite)")
+    parser.add_argument('table', choices=tuple(FACTS))
+    parser.add_argument('--by', default='', help="Colonnes de regroupement (ex: license_type,note ou viewed_at:month)")
+    parser.add_argument('--where', type=parse_where, action='append', default=[], help="Filtre (répétable)")
+    parser.add_argument('--func', choices=FUNCS, default='count')
+    parser.add_argument('--value', help="Colonne sommée par sum/mean (ex: note)")
+    parser.add_argument('--root', type=Path, default=OUT_DIR, help=f"Dossier de l'export (défaut {OUT_DIR})")
+    parser.add_argument('--workers', type=int, help="Process (défaut : nb de cœurs)")
+    parser.add_argument('--top', type=int, default=TOP, help=f"Groupes affichés (défaut {TOP})")
+    parser.add_argument('--json', type=Path, help="Écrire tous les groupes en JSON")
+    args = parser.parse_args()
+
+    by = [name for name in args.by.split(',') if name]
+    t0 = time.perf_counter()
+    try:
+        result = aggregate(args.table, by, args.where, args.func, args.value, args.root, args.workers)
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - t0
+    ranked = sorted(result.items(), key=lambda item: item[1], reverse=True)
+    print(f"📊 {args.table} {args.func}{f'({args.value})' if args.value else ''}"
+          f"{' par ' + ', '.join(by) if by else ''} : {len(result):,} groupe(s) en {elapsed * 1000:.1f} ms")
+    for key, value in ranked[:args.top]:
+        label = ' | '.join('∅' if k is None else str(k) for k in key) or 'total'
+        print(f"   {label:<40} {value:>14,.3f}" if isinstance(value, float) else f"   {label:<40} {value:>14,}")
+    if args.json:
+        args.json.write_text(json.dumps([{'group': list(key), 'value': value} for key, value in ranked],
+                                        indent=1, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 {args.json}")
@@ -0,0 +1,550 @@
+"""Accès typé aux tables NIRD pour les scripts Python (auto-généré par generation/generate_models.py)
+
+    with Database() as db:
+        for vue in db.historique.stream("viewed_at >= ?", (debut,)):   # fetchmany : mémoire constante
+            ...
+        db.favori.insert_many(Favori(user_id=u, software_id=s) for u, s in couples)
+        nb_logiciels, nb_avis = db.parallel(db.logiciel.count, db.avis.count)   # lecteurs read-only en parallèle
+"""
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Generic, Iterable, Iterator, Optional, TypeVar
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "serveur" / "database.db"
+READERS = 4              # connexions read-only du pool de parallel()/submit()
+FETCH_ROWS = 1000        # lignes par fetchmany dans stream()
+BATCH_ROWS = 5000        # lignes par transaction dans insert_many()/upsert_many()
+BUSY_TIMEOUT_S = 30
+
+Row = TypeVar("Row")
+
+
+class Database:
+    """1 connexion writer (écritures sérialisées) + 1 connexion read-only par thread lecteur"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, readers=READERS):
+        self.path = Path(path)
+        self.readers = readers
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._pool = None
+        self.utilisateur = UtilisateurRepository(self)
+        self.logiciel = LogicielRepository(self)
+        self.categorie = CategorieRepository(self)
+        self.tag = TagRepository(self)
+        self.avis = AvisRepository(self)
+        self.favori = FavoriRepository(self)
+        self.historique = HistoriqueRepository(self)
+        self.logiciel_tag = LogicielTagRepository(self)
+        self.logiciel_categorie = LogicielCategorieRepository(self)
+        self.demarche_nird = Demarche_nirdRepository(self)
+        self.pourquoi_nird = Pourquoi_nirdRepository(self)
+        self.pilote = PiloteRepository(self)
+        self.table_stats = Table_statsRepository(self)
+        self.logiciel_stats = LogicielStatsRepository(self)
+        self.pilote_cluster = PiloteClusterRepository(self)
+        self.pilote_cluster_dirty = PiloteClusterDirtyRepository(self)
+        self.logiciel_similar = LogicielSimilarRepository(self)
+        self.logiciel_similar_dirty = LogicielSimilarDirtyRepository(self)
+        self.logiciel_trending = LogicielTrendingRepository(self)
+        self.logiciel_trending_state = LogicielTrendingStateRepository(self)
+        self.historique_daily = HistoriqueDailyRepository(self)
+        self.table_changes = Table_changesRepository(self)
+
+    def reader(self):
+        """Connexion read-only du thread courant (sqlite3 : une connexion n'est utilisée que par son thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S,
+                                   check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._handles.append(conn)
+        return conn
+
+    def writer(self):
+        if self._writer is None:
+            self._writer = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_S, check_same_thread=False)
+        return self._writer
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs):
+        """Exécute fn dans le pool de lecteurs → Future (les lectures de fn y utilisent la connexion du thread)"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="nird-reader")
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def parallel(self, *calls: Callable[[], Any]) -> list:
+        """Requêtes indépendantes en parallèle (sqlite3 relâche le GIL pendant l'exécution) → résultats dans l'ordre"""
+        return [future.result() for future in [self.submit(call) for call in calls]]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            for conn in self._handles:
+                conn.close()
+            self._handles.clear()
+        self._local = threading.local()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Repository(Generic[Row]):
+    """Lectures en flux et écritures en lot d'une table ; colonnes = champs de la dataclass row"""
+    table: ClassVar[str]
+    row: ClassVar[type]
+    key: ClassVar[Optional[str]]
+    unique_keys: ClassVar[list]
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.columns = [f.name for f in fields(self.row)]
+        self.select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+
+    def _cursor(self):
+        cursor = self.db.reader().cursor()
+        row = self.row
+        cursor.row_factory = lambda _, values: row(*values)
+        return cursor
+
+    def stream(self, where: str = "", params: Iterable = (), order_by: Optional[str] = None,
+               size: int = FETCH_ROWS) -> Iterator[Row]:
+        """Lignes une à une, lues par paquets de size (fetchmany) : jamais toute la table en mémoire"""
+        sql = self.select + (f" WHERE {where}" if where else "") + (f" ORDER BY {order_by}" if order_by else "")
+        cursor = self._cursor().execute(sql, tuple(params))
+        try:
+            while True:
+                batch = cursor.fetchmany(size)
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            cursor.close()
+
+    def find(self, where: str = "", params: Iterable = (), order_by: Optional[str] = None,
+             limit: int = 100) -> list:
+        sql = self.select + (f" WHERE {where}" if where else "") + (f" ORDER BY {order_by}" if order_by else "")
+        return self._cursor().execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+
+    def get(self, key) -> Optional[Row]:
+        if self.key is None:
+            raise ValueError(f"{self.table} n'a ni rowid ni clé primaire simple : utiliser find()")
+        return self._cursor().execute(f"{self.select} WHERE {self.key} = ?", (key,)).fetchone()
+
+    def count(self, where: str = "", params: Iterable = ()) -> int:
+        sql = f"SELECT COUNT(*) FROM {self.table}" + (f" WHERE {where}" if where else "")
+        return self.db.reader().execute(sql, tuple(params)).fetchone()[0]
+
+    def insert_many(self, rows: Iterable, batch: int = BATCH_ROWS) -> int:
+        """Insertion en lot (dataclasses ou dicts, itérable consommé par paquets) ; None = DEFAULT de la colonne"""
+        return self._write_many(rows, batch, "")
+
+    def upsert_many(self, rows: Iterable, conflict: Optional[list] = None, batch: int = BATCH_ROWS) -> int:
+        """Insertion ou mise à jour en lot sur une contrainte UNIQUE (par défaut unique_keys[0])"""
+        conflict = list(conflict or (self.unique_keys[0] if self.unique_keys else []))
+        if conflict not in self.unique_keys:
+            raise ValueError(f"Pas de contrainte UNIQUE sur ({', '.join(conflict)}) dans {self.table} "
+                             f"(disponibles: {', '.join(map(str, self.unique_keys)) or 'aucune'})")
+        return self._write_many(rows, batch, conflict)
+
+    def _write_many(self, rows, batch, conflict):
+        rows = iter(rows)
+        total = 0
+        while True:
+            chunk = list(islice(rows, batch))
+            if not chunk:
+                return total
+            with self.db._write_lock:
+                conn = self.db.writer()
+                with conn:
+                    for columns, values in self._group(chunk).items():
+                        total += conn.executemany(self._insert_sql(columns, conflict), values).rowcount
+
+    def _group(self, chunk):
+        """{colonnes renseignées: [valeurs]} : les colonnes à None/absentes gardent leur DEFAULT"""
+        groups = {}
+        for item in chunk:
+            pairs = item.items() if isinstance(item, dict) else ((c, getattr(item, c)) for c in self.columns)
+            pairs = [(c, v) for c, v in pairs if v is not None]
+            unknown = [c for c, _ in pairs if c not in self.columns]
+            if unknown:
+                raise ValueError(f"Colonne(s) inconnue(s) dans {self.table}: {', '.join(unknown)}")
+            groups.setdefault(tuple(c for c, _ in pairs), []).append(tuple(v for _, v in pairs))
+        return groups
+
+    def _insert_sql(self, columns, conflict):
+        sql = (f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+               if columns else f"INSERT INTO {self.table} DEFAULT VALUES")
+        if not conflict:
+            return sql
+        missing = [c for c in conflict if c not in columns]
+        if missing:
+            raise ValueError(f"Colonne(s) de conflit absente(s) des lignes: {', '.join(missing)}")
+        updates = [c for c in columns if c not in conflict and c != self.key]
+        return (sql + f" ON CONFLICT({', '.join(conflict)}) DO "
+                + (f"UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updates)}" if updates else "NOTHING"))
+
+
+@dataclass(slots=True)
+class Utilisateur:
+    username: str
+    email: str
+    password_hash: str
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    avatar_url: Optional[str] = None
+    created_at: Optional[Any] = None
+    updated_at: Optional[Any] = None
+
+
+class UtilisateurRepository(Repository[Utilisateur]):
+    table = 'Utilisateur'
+    row = Utilisateur
+    key = 'user_id'
+    unique_keys = [['username'], ['email'], ['user_id']]
+
+
+@dataclass(slots=True)
+class Logiciel:
+    nom: str
+    software_id: Optional[int] = None
+    version: Optional[str] = None
+    description: Optional[str] = None
+    website_url: Optional[str] = None
+    license_type: Optional[str] = None
+    platform: Optional[str] = None
+    created_at: Optional[Any] = None
+    updated_at: Optional[Any] = None
+    submitted_by: Optional[int] = None
+
+
+class LogicielRepository(Repository[Logiciel]):
+    table = 'Logiciel'
+    row = Logiciel
+    key = 'software_id'
+    unique_keys = [['software_id']]
+
+
+@dataclass(slots=True)
+class Categorie:
+    nom: str
+    category_id: Optional[int] = None
+    description: Optional[str] = None
+
+
+class CategorieRepository(Repository[Categorie]):
+    table = 'Categorie'
+    row = Categorie
+    key = 'category_id'
+    unique_keys = [['nom'], ['category_id']]
+
+
+@dataclass(slots=True)
+class Tag:
+    nom: str
+    tag_id: Optional[int] = None
+
+
+class TagRepository(Repository[Tag]):
+    table = 'Tag'
+    row = Tag
+    key = 'tag_id'
+    unique_keys = [['nom'], ['tag_id']]
+
+
+@dataclass(slots=True)
+class Avis:
+    user_id: int
+    software_id: int
+    review_id: Optional[int] = None
+    note: Optional[int] = None
+    titre: Optional[str] = None
+    commentaire: Optional[str] = None
+    created_at: Optional[Any] = None
+    updated_at: Optional[Any] = None
+
+
+class AvisRepository(Repository[Avis]):
+    table = 'Avis'
+    row = Avis
+    key = 'review_id'
+    unique_keys = [['review_id']]
+
+
+@dataclass(slots=True)
+class Favori:
+    user_id: int
+    software_id: int
+    favorite_id: Optional[int] = None
+    added_at: Optional[Any] = None
+
+
+class FavoriRepository(Repository[Favori]):
+    table = 'Favori'
+    row = Favori
+    key = 'favorite_id'
+    unique_keys = [['user_id', 'software_id'], ['favorite_id']]
+
+
+@dataclass(slots=True)
+class Historique:
+    user_id: int
+    software_id: int
+    history_id: Optional[int] = None
+    viewed_at: Optional[Any] = None
+
+
+class HistoriqueRepository(Repository[Historique]):
+    table = 'Historique'
+    row = Historique
+    key = 'history_id'
+    unique_keys = [['history_id']]
+
+
+@dataclass(slots=True)
+class LogicielTag:
+    software_id: int
+    tag_id: int
+
+
+class LogicielTagRepository(Repository[LogicielTag]):
+    table = 'LogicielTag'
+    row = LogicielTag
+    key = 'rowid'
+    unique_keys = [['software_id', 'tag_id']]
+
+
+@dataclass(slots=True)
+class LogicielCategorie:
+    software_id: int
+    category_id: int
+
+
+class LogicielCategorieRepository(Repository[LogicielCategorie]):
+    table = 'LogicielCategorie'
+    row = LogicielCategorie
+    key = 'rowid'
+    unique_keys = [['software_id', 'category_id']]
+
+
+@dataclass(slots=True)
+class Demarche_nird:
+    nom: str
+    rowid: Optional[int] = None
+    type: Optional[str] = None
+    machines_reconditionnees: Optional[int] = None
+    region: Optional[str] = None
+    created_at: Optional[Any] = None
+
+
+class Demarche_nirdRepository(Repository[Demarche_nird]):
+    table = 'demarche_nird'
+    row = Demarche_nird
+    key = 'rowid'
+    unique_keys = []
+
+
+@dataclass(slots=True)
+class Pourquoi_nird:
+    titre: str
+    rowid: Optional[int] = None
+    source: Optional[str] = None
+    type: Optional[str] = None
+    impact: Optional[float] = None
+    annee: Optional[int] = None
+    url: Optional[str] = None
+    created_at: Optional[Any] = None
+
+
+class Pourquoi_nirdRepository(Repository[Pourquoi_nird]):
+    table = 'pourquoi_nird'
+    row = Pourquoi_nird
+    key = 'rowid'
+    unique_keys = []
+
+
+@dataclass(slots=True)
+class Pilote:
+    nom: str
+    rowid: Optional[int] = None
+    code: Optional[str] = None
+    ville: Optional[str] = None
+    academie: Optional[str] = None
+    type: Optional[str] = None
+    contact: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    url: Optional[str] = None
+    created_at: Optional[Any] = None
+    updated_at: Optional[Any] = None
+
+
+class PiloteRepository(Repository[Pilote]):
+    table = 'Pilote'
+    row = Pilote
+    key = 'rowid'
+    unique_keys = [['code']]
+
+
+@dataclass(slots=True)
+class Table_stats:
+    table_name: str
+    bucket: str
+    row_count: Optional[int] = None
+
+
+class Table_statsRepository(Repository[Table_stats]):
+    table = 'table_stats'
+    row = Table_stats
+    key = None
+    unique_keys = [['table_name', 'bucket']]
+
+
+@dataclass(slots=True)
+class LogicielStats:
+    software_id: Optional[int] = None
+    nb_avis: Optional[int] = None
+    nb_notes: Optional[int] = None
+    sum_note: Optional[int] = None
+    avg_note: Optional[float] = None
+    nb_favoris: Optional[int] = None
+    last_review_at: Optional[Any] = None
+
+
+class LogicielStatsRepository(Repository[LogicielStats]):
+    table = 'LogicielStats'
+    row = LogicielStats
+    key = 'software_id'
+    unique_keys = [['software_id']]
+
+
+@dataclass(slots=True)
+class PiloteCluster:
+    zoom: int
+    tile_x: int
+    tile_y: int
+    nb: int
+    lat: float
+    lon: float
+    types: Optional[str] = None
+    sample_id: Optional[int] = None
+
+
+class PiloteClusterRepository(Repository[PiloteCluster]):
+    table = 'PiloteCluster'
+    row = PiloteCluster
+    key = None
+    unique_keys = [['zoom', 'tile_x', 'tile_y']]
+
+
+@dataclass(slots=True)
+class PiloteClusterDirty:
+    latitude: float
+    longitude: float
+    dirty_id: Optional[int] = None
+
+
+class PiloteClusterDirtyRepository(Repository[PiloteClusterDirty]):
+    table = 'PiloteClusterDirty'
+    row = PiloteClusterDirty
+    key = 'dirty_id'
+    unique_keys = [['dirty_id']]
+
+
+@dataclass(slots=True)
+class LogicielSimilar:
+    software_id: int
+    similar_id: int
+    score: float
+
+
+class LogicielSimilarRepository(Repository[LogicielSimilar]):
+    table = 'LogicielSimilar'
+    row = LogicielSimilar
+    key = None
+    unique_keys = [['software_id', 'similar_id']]
+
+
+@dataclass(slots=True)
+class LogicielSimilarDirty:
+    software_id: Optional[int] = None
+    version: Optional[int] = None
+
+
+class LogicielSimilarDirtyRepository(Repository[LogicielSimilarDirty]):
+    table = 'LogicielSimilarDirty'
+    row = LogicielSimilarDirty
+    key = 'software_id'
+    unique_keys = [['software_id']]
+
+
+@dataclass(slots=True)
+class LogicielTrending:
+    category_id: int
+    software_id: int
+    score: float
+
+
+class LogicielTrendingRepository(Repository[LogicielTrending]):
+    table = 'LogicielTrending'
+    row = LogicielTrending
+    key = None
+    unique_keys = [['category_id', 'software_id']]
+
+
+@dataclass(slots=True)
+class LogicielTrendingState:
+    name: str
+    value: float
+
+
+class LogicielTrendingStateRepository(Repository[LogicielTrendingState]):
+    table = 'LogicielTrendingState'
+    row = LogicielTrendingState
+    key = 'name'
+    unique_keys = [['name']]
+
+
+@dataclass(slots=True)
+class HistoriqueDaily:
+    software_id: int
+    day: str
+    views: int
+    unique_users: int
+
+
+class HistoriqueDailyRepository(Repository[HistoriqueDaily]):
+    table = 'HistoriqueDaily'
+    row = HistoriqueDaily
+    key = None
+    unique_keys = [['software_id', 'day']]
+
+
+@dataclass(slots=True)
+class Table_changes:
+    table_name: str
+    version: Optional[int] = None
+
+
+class Table_changesRepository(Repository[Table_changes]):
+    table = 'table_changes'
+    row = Table_changes
+    key = 'table_name'
+    unique_keys = [['table_name']]
@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from backup_db import publish, table_counts
+from bench import bench_shapes, evict, percentile, run_once
+from generate_db import BASE_DIR, DB_PATH
+
+# Étape finale du build : base défragmentée (VACUUM INTO) et statistiques à jour (ANALYZE) pour le déploiement
+#   - un profil = réglages du fichier (page_size, auto_vacuum : appliqués par VACUUM INTO)
+#     + réglages de connexion (mmap_size, cache_size : non persistés, repris par connection.js via l'environnement)
+#   - chaque profil demandé est construit, mesuré (taille, pages, latence des requêtes des models à chaud
+#     et à froid) ; seul l'artefact du profil retenu est publié (rename atomique)
+#   - la base source n'est jamais modifiée (lecture seule)
+
+DIST_PATH = BASE_DIR / "dist" / "database.db"
+MIB = 1024 * 1024
+
+PROFILES = {
+    # Réglages par défaut de SQLite : référence
+    'defaut': {'page_size': 4096, 'auto_vacuum': 'NONE', 'cache_size': -2000, 'mmap_size': 0},
+    # Lecture majoritaire : I/O mappée, cache de pages plus grand
+    'lecture': {'page_size': 4096, 'auto_vacuum': 'NONE', 'cache_size': -16384, 'mmap_size': 256 * MIB},
+    # Pages de 16 Ko : moins de niveaux d'arbre pour les gros parcours (Historique, Avis)
+    'pages16k': {'page_size': 16384, 'auto_vacuum': 'NONE', 'cache_size': -16384, 'mmap_size': 256 * MIB},
+    # Base qui grossit puis se purge (historique_rollup.py) : pages libres rendues par PRAGMA incremental_vacuum
+    'incremental': {'page_size': 4096, 'auto_vacuum': 'INCREMENTAL', 'cache_size': -16384, 'mmap_size': 256 * MIB},
+}
+DEPLOY_PROFILE = 'lecture'
+
+REPEAT = 20        # échantillons à chaud par requête
+COLD_REPEAT = 3    # échantillons à froid (pages OS évincées, nouvelle connexion)
+BUDGET_S = 1.0     # temps max par (requête, état)
+
+
+def build(src_path, dest_path, profile):
+    """VACUUM INTO avec les réglages de fichier du profil, puis ANALYZE sur l'artefact ; renvoie ses statistiques"""
+    Path(dest_path).unlink(missing_ok=True)
+    t0 = time.perf_counter()
+    src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True, timeout=30)
+    try:
+        src.execute(f"PRAGMA page_size = {profile['page_size']}")
+        src.execute(f"PRAGMA auto_vacuum = {profile['auto_vacuum']}")
+        src.execute("VACUUM INTO ?", (str(dest_path),))
+    finally:
+        src.close()
+    vacuum_s = time.perf_counter() - t0
+
+    dest = sqlite3.connect(str(dest_path))
+    try:
+        dest.execute("ANALYZE")
+        dest.execute("PRAGMA optimize")
+        # Fichier autonome (pas de -wal) ; le writer du serveur repasse en WAL à l'ouverture
+        dest.execute("PRAGMA journal_mode = DELETE")
+        check = dest.execute("PRAGMA quick_check").fetchone()[0]
+        stats = {name: dest.execute(f"PRAGMA {name}").fetchone()[0]
+                 for name in ('page_size', 'page_count', 'freelist_count', 'auto_vacuum')}
+    finally:
+        dest.close()
+    stats.update(size=Path(dest_path).stat().st_size, quick_check=check,
+                 vacuum_s=round(vacuum_s, 3), build_s=round(time.perf_counter() - t0, 3))
+    return stats
+
+
+def connect(db_path, profile):
+    """Connexion lecture seule avec les réglages de connexion du profil (comme les lecteurs de connection.js)"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    conn.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+    conn.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+    return conn
+
+
+def measure(db_path, profile, only=None, cold=True, repeat=REPEAT, cold_repeat=COLD_REPEAT, budget=BUDGET_S):
+    """{label: {'warm': p50, 'warm_p95': p95, 'cold': p50}} pour les requêtes des models (bench.py)"""
+    conn = connect(db_path, profile)
+    results = {}
+    try:
+        shapes = [s for s in bench_shapes(conn) if not only or only in s['label']]
+        for s in shapes:
+            run_once(conn, s['sql'], s['params'])
+            samples, started = [], time.perf_counter()
+            while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() - started < budget):
+                samples.append(run_once(conn, s['sql'], s['params'])[0])
+            samples.sort()
+            results[s['label']] = {'warm': round(percentile(samples, 50), 4),
+                                   'warm_p95': round(percentile(samples, 95), 4)}
+    finally:
+        conn.close()
+    if cold:
+        os.sync()  # artefact fraîchement écrit : pages sales non évinçables par fadvise
+        for s in shapes:
+            samples, started = [], time.perf_counter()
+            while len(samples) < cold_repeat and (len(samples) < 2 or time.perf_counter() - started < budget):
+                evict(db_path)
+                conn = connect(db_path, profile)
+                try:
+                    samples.append(run_once(conn, s['sql'], s['params'])[0])
+                finally:
+                    conn.close()
+            results[s['label']]['cold'] = round(percentile(sorted(samples), 50), 4)
+    return results
+
+
+def total(latencies, key):
+    return sum(r[key] for r in latencies.values() if key in r)
+
+
+def print_report(report, deploy):
+    names = list(report)
+    print(f"\n📊 {'profil':<12} {'taille':>10} {'pages':>9} {'page':>6} {'libres':>7} "
+          f"{'Σ p50 chaud':>12} {'Σ p50 froid':>12}")
+    for name in names:
+        r = report[name]
+        mark = '👉' if name == deploy else '  '
+        print(f"{mark} {name:<12} {r['size'] / MIB:>8.1f}Mo {r['page_count']:>9,} {r['page_size']:>6} "
+              f"{r['freelist_count']:>7,} {total(r['latency'], 'warm'):>10.3f}ms {total(r['latency'], 'cold'):>10.3f}ms")
+    labels = list(report[names[0]]['latency'])
+    if not labels:
+        return
+    print("\n⏱️  p50 à chaud (ms) par requête")
+    print(f"   {'requête':<45}" + ''.join(f"{name:>12}" for name in names))
+    for label in labels:
+        print(f"   {label:<45}" + ''.join(f"{report[name]['latency'][label]['warm']:>12.3f}" for name in names))
+
+
+def finalize(db_path=DB_PATH, out=DIST_PATH, profiles=tuple(PROFILES), deploy=DEPLOY_PROFILE,
+             only=None, cold=True):
+    db_path, out = Path(db_path), Path(out)
+    if deploy not in profiles:
+        profiles = (*profiles, deploy)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    source_size = db_path.stat().st_size + (Path(f"{db_path}-wal").stat().st_size
+                                            if Path(f"{db_path}-wal").exists() else 0)
+    print(f"🏗️  Finalisation {db_path} ({source_size / MIB:,.1f} Mo avec le WAL) → {out}")
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        expected = table_counts(source)
+    finally:
+        source.close()
+
+    report = {}
+    with tempfile.TemporaryDirectory(dir=out.parent, prefix=".finalize-") as workdir:
+        for name in profiles:
+            profile = PROFILES[name]
+            artifact = Path(workdir) / f"{name}.db"
+            print(f"   🔧 {name}: page_size {profile['page_size']}, auto_vacuum {profile['auto_vacuum']}, "
+                  f"mmap {profile['mmap_size'] // MIB} Mo, cache {-profile['cache_size'] // 1024} Mo")
+            stats = build(db_path, artifact, profile)
+            conn = sqlite3.connect(f"file:{artifact}?mode=ro", uri=True)
+            try:
+                counts = table_counts(conn)
+            finally:
+                conn.close()
+            if stats['quick_check'] != 'ok':
+                raise RuntimeError(f"Artefact {name} invalide (quick_check: {stats['quick_check']})")
+            drift = [table for table in expected if counts.get(table) != expected[table]]
+            if drift:
+                # Écritures arrivées pendant la construction (serveur actif) : artefact cohérent mais plus récent
+                print(f"      ⚠️ comptages différents de la source: {', '.join(drift)}")
+            stats['latency'] = measure(artifact, profile, only, cold)
+            report[name] = {**stats, 'profile': profile}
+            print(f"      ✅ {stats['size'] / MIB:,.1f} Mo, {stats['page_count']:,} pages, "
+                  f"VACUUM INTO {stats['vacuum_s']:.2f}s, Σ p50 chaud {total(stats['latency'], 'warm'):.3f} ms")
+            if name == deploy:
+                publish(artifact, out)
+
+    print_report(report, deploy)
+    profile = PROFILES[deploy]
+    print(f"\n✅ {out} ({deploy}) — serveur : NIRD_DB_PATH={out} NIRD_DB_MMAP_SIZE={profile['mmap_size']} "
+          f"NIRD_DB_CACHE_KB={-profile['cache_size']} node src/app.js")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artefact de déploiement optimisé (ANALYZE + VACUUM INTO) par profil")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Base source (lue seulement)")
+    parser.add_argument('--out', type=Path, default=DIST_PATH, help=f"Artefact publié (défaut {DIST_PATH})")
+    parser.add_argument('--profile', choices=tuple(PROFILES), default=DEPLOY_PROFILE, help="Profil publié")
+    parser.add_argument('--compare', default=','.join(PROFILES),
+                        help="Profils construits et mesurés (liste séparée par des virgules)")
+    parser.add_argument('--only', help="Ne mesurer que les requêtes dont le libellé contient ce texte")
+    parser.add_argument('--no-cold', action='store_true', help="Sans mesures à froid (éviction du cache OS)")
+    parser.add_argument('--json', type=Path, help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    compare = tuple(name for name in args.compare.split(',') if name)
+    unknown = [name for name in compare if name not in PROFILES]
+    if unknown:
+        parser.error(f"profil(s) inconnu(s): {', '.join(unknown)} (disponibles: {', '.join(PROFILES)})")
+    result = finalize(args.db, args.out, compare, args.profile, args.only, not args.no_cold)
+    if args.json:
+        args.json.write_text(json.dumps({'source': str(args.db), 'deploy': args.profile, 'profiles': result},
+                                        indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Rapport → {args.json}")
@@ -1,23 +1,21 @@
+import argparse
+import re
 import sqlite3
 import os
+import time
 from pathlib import Path
 from datetime import datetime
 
-print("🚀 Création de la base de données NIRD...")
+from migrate_db import migrate
+from sharded_build import load_synthetic_sharded
+from synthetic_data import load_synthetic, parse_scale
 
 # ✅ CHEMIN ABSOLU CORRIGÉ
 BASE_DIR = Path(__file__).parent.parent  # generation/ → racine NDI/SITE
 DB_PATH = BASE_DIR / "serveur" / "database.db"
 
-print(f"📁 Projet root: {BASE_DIR.absolute()}")
-print(f"📄 DB cible: {DB_PATH.absolute()}")
-
-# ✅ CRÉER DOSSIERS + VÉRIFIER PERMISSIONS
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-if not os.access(DB_PATH.parent, os.W_OK):
-    print("❌ ERREUR: Pas de permission d'écriture!")
-    exit(1)
+# Version du schéma (PRAGMA user_version) : à incrémenter à chaque modification du DDL ci-dessous
+SCHEMA_VERSION = 11
 
 # Script SQL COMPLET + NIRD
 SQL_SCHEMA = """
@@ -152,13 +150,408 @@ CREATE TABLE IF NOT EXISTS Pilote (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
+"""
 
+# Index créés APRÈS le chargement des données (plus rapide qu'une mise à jour ligne à ligne)
+SQL_INDEXES = """
 -- Indexes performance
 CREATE INDEX IF NOT EXISTS idx_pilotes_nom ON Pilote(nom);
 CREATE INDEX IF NOT EXISTS idx_pilotes_type ON Pilote(type);
 CREATE INDEX IF NOT EXISTS idx_pilotes_academie ON Pilote(academie);
 CREATE INDEX IF NOT EXISTS idx_pilotes_code ON Pilote(code);
+CREATE INDEX IF NOT EXISTS idx_pilote_type_nom ON Pilote(type, nom);
+CREATE INDEX IF NOT EXISTS idx_pilote_created_at ON Pilote(created_at);
+
+-- Index issus de index_advisor.py (EXPLAIN QUERY PLAN des chemins chauds)
+CREATE INDEX IF NOT EXISTS idx_avis_software_id_created_at ON Avis(software_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_avis_user_id_created_at ON Avis(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_avis_created_at ON Avis(created_at);
+CREATE INDEX IF NOT EXISTS idx_favori_user_id_added_at ON Favori(user_id, added_at);
+CREATE INDEX IF NOT EXISTS idx_favori_software_id ON Favori(software_id);
+CREATE INDEX IF NOT EXISTS idx_historique_user_id_viewed_at ON Historique(user_id, viewed_at);
+CREATE INDEX IF NOT EXISTS idx_historique_software_id_viewed_at ON Historique(software_id, viewed_at);
+CREATE INDEX IF NOT EXISTS idx_logicieltag_tag_id_software_id ON LogicielTag(tag_id, software_id);
+CREATE INDEX IF NOT EXISTS idx_logicielcategorie_category_id_software_id ON LogicielCategorie(category_id, software_id);
+CREATE INDEX IF NOT EXISTS idx_logiciel_created_at ON Logiciel(created_at);
+CREATE INDEX IF NOT EXISTS idx_logiciel_nom ON Logiciel(nom);
+CREATE INDEX IF NOT EXISTS idx_logiciel_submitted_by ON Logiciel(submitted_by);
+CREATE INDEX IF NOT EXISTS idx_utilisateur_created_at ON Utilisateur(created_at);
+CREATE INDEX IF NOT EXISTS idx_demarche_nird_nom ON demarche_nird(nom);
+CREATE INDEX IF NOT EXISTS idx_demarche_nird_created_at ON demarche_nird(created_at);
+CREATE INDEX IF NOT EXISTS idx_pourquoi_nird_created_at ON pourquoi_nird(created_at);
+"""
+
+# 🔎 Index plein texte FTS5 (contenu externe = la table elle-même, accents ignorés)
+# table → (clé primaire, colonnes indexées)
+FTS_TABLES = {
+    'Logiciel': ('software_id', ('nom', 'description')),
+    'Categorie': ('category_id', ('nom', 'description')),
+    'Tag': ('tag_id', ('nom',)),
+    'Pilote': ('rowid', ('nom', 'ville', 'academie')),
+}
+
+
+def fts_sql(table, pk, columns):
+    """Table FTS5 {table}_fts + reconstruction + triggers de synchronisation"""
+    fts = f"{table}_fts"
+    cols = ', '.join(columns)
+    new_vals = ', '.join(f"new.{c}" for c in columns)
+    old_vals = ', '.join(f"old.{c}" for c in columns)
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    {cols}, content='{table}', content_rowid='{pk}',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+INSERT INTO {fts}({fts}) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+    INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_vals});
+END;
+CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_vals});
+END;
+CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{pk}, {old_vals});
+    INSERT INTO {fts}(rowid, {cols}) VALUES (new.{pk}, {new_vals});
+END;
+"""
+
+
+# Créé après le chargement : 'rebuild' indexe tout d'un coup, puis les triggers prennent le relais
+SQL_FTS = ''.join(fts_sql(table, pk, columns) for table, (pk, columns) in FTS_TABLES.items())
+
+# 🔢 Compteurs maintenus par triggers : count() sans COUNT(*) (parcours complet du b-tree)
+# bucket '*' = total de la table, sinon valeur de la colonne de COUNTED_TYPES
+STATS_TABLES = re.findall(r'CREATE TABLE IF NOT EXISTS (\w+)', SQL_SCHEMA)
+COUNTED_TYPES = {'Pilote': 'type', 'demarche_nird': 'type'}
+
+SQL_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS table_stats (
+    table_name TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_name, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def stats_bump(table, bucket, delta):
+    return (f"INSERT INTO table_stats (table_name, bucket, row_count) VALUES ('{table}', {bucket}, {delta}) "
+            f"ON CONFLICT(table_name, bucket) DO UPDATE SET row_count = row_count + ({delta});")
+
+
+def stats_sql(table, column=None):
+    """Triggers {table}_stats_ai/_ad (+ _au si compteur par type) sur une table"""
+    new_bumps = [stats_bump(table, "'*'", 1)]
+    old_bumps = [stats_bump(table, "'*'", -1)]
+    if column:
+        new_bumps.append(stats_bump(table, f"COALESCE(new.{column}, '')", 1))
+        old_bumps.append(stats_bump(table, f"COALESCE(old.{column}, '')", -1))
+    sql = f"""
+CREATE TRIGGER IF NOT EXISTS {table}_stats_ai AFTER INSERT ON {table} BEGIN
+    {' '.join(new_bumps)}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_stats_ad AFTER DELETE ON {table} BEGIN
+    {' '.join(old_bumps)}
+END;
+"""
+    if column:
+        sql += f"""CREATE TRIGGER IF NOT EXISTS {table}_stats_au AFTER UPDATE OF {column} ON {table}
+WHEN old.{column} IS NOT new.{column} BEGIN
+    {old_bumps[1]} {new_bumps[1]}
+END;
 """
+    return sql
+
+
+def stats_rebuild_sql():
+    """Recalcule tous les compteurs depuis les tables (chargement initial / dérive)"""
+    sql = "DELETE FROM table_stats;\n"
+    for table in STATS_TABLES:
+        sql += f"INSERT INTO table_stats SELECT '{table}', '*', COUNT(*) FROM {table};\n"
+        if table in COUNTED_TYPES:
+            column = COUNTED_TYPES[table]
+            sql += (f"INSERT INTO table_stats SELECT '{table}', COALESCE({column}, ''), COUNT(*) "
+                    f"FROM {table} GROUP BY 1, 2;\n")
+    return sql
+
+
+# Comme FTS : triggers créés après le chargement, compteurs initialisés d'un coup
+SQL_STATS = SQL_STATS_TABLE + ''.join(stats_sql(t, COUNTED_TYPES.get(t)) for t in STATS_TABLES)
+
+# ⭐ Résumé des notes par logiciel (vues détail / populaires) : plus d'agrégat sur Avis à chaque rendu
+# sum_note/nb_notes permettent de tenir avg_note à jour incrémentalement (note peut être NULL)
+SQL_LOGICIEL_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS LogicielStats (
+    software_id INTEGER PRIMARY KEY,
+    nb_avis INTEGER NOT NULL DEFAULT 0,
+    nb_notes INTEGER NOT NULL DEFAULT 0,
+    sum_note INTEGER NOT NULL DEFAULT 0,
+    avg_note REAL,
+    nb_favoris INTEGER NOT NULL DEFAULT 0,
+    last_review_at DATETIME,
+    FOREIGN KEY (software_id) REFERENCES Logiciel(software_id)
+);
+CREATE INDEX IF NOT EXISTS idx_logicielstats_top ON LogicielStats(avg_note, nb_avis);
+"""
+
+
+def review_added(row):
+    """Upsert LogicielStats pour un avis ajouté (row = 'new')"""
+    return f"""INSERT INTO LogicielStats (software_id, nb_avis, nb_notes, sum_note, avg_note, last_review_at)
+    VALUES ({row}.software_id, 1, {row}.note IS NOT NULL, COALESCE({row}.note, 0), {row}.note, {row}.created_at)
+    ON CONFLICT(software_id) DO UPDATE SET
+        nb_avis = nb_avis + 1,
+        nb_notes = nb_notes + excluded.nb_notes,
+        sum_note = sum_note + excluded.sum_note,
+        avg_note = CASE WHEN nb_notes + excluded.nb_notes > 0
+                        THEN (sum_note + excluded.sum_note) * 1.0 / (nb_notes + excluded.nb_notes) END,
+        last_review_at = CASE WHEN last_review_at IS NULL OR excluded.last_review_at > last_review_at
+                              THEN excluded.last_review_at ELSE last_review_at END;"""
+
+
+def review_removed(row):
+    """Retire un avis (row = 'old') ; last_review_at relu via idx_avis_software_id_created_at"""
+    return f"""UPDATE LogicielStats SET
+        nb_avis = nb_avis - 1,
+        nb_notes = nb_notes - ({row}.note IS NOT NULL),
+        sum_note = sum_note - COALESCE({row}.note, 0),
+        avg_note = CASE WHEN nb_notes - ({row}.note IS NOT NULL) > 0
+                        THEN (sum_note - COALESCE({row}.note, 0)) * 1.0 / (nb_notes - ({row}.note IS NOT NULL)) END,
+        last_review_at = (SELECT MAX(created_at) FROM Avis WHERE software_id = {row}.software_id)
+    WHERE software_id = {row}.software_id;"""
+
+
+def favorite_delta(row, delta):
+    return (f"INSERT INTO LogicielStats (software_id, nb_favoris) VALUES ({row}.software_id, {delta}) "
+            f"ON CONFLICT(software_id) DO UPDATE SET nb_favoris = nb_favoris + ({delta});")
+
+
+SQL_LOGICIEL_STATS = SQL_LOGICIEL_STATS_TABLE + f"""
+CREATE TRIGGER IF NOT EXISTS Avis_logicielstats_ai AFTER INSERT ON Avis BEGIN
+    {review_added('new')}
+END;
+CREATE TRIGGER IF NOT EXISTS Avis_logicielstats_ad AFTER DELETE ON Avis BEGIN
+    {review_removed('old')}
+END;
+CREATE TRIGGER IF NOT EXISTS Avis_logicielstats_au AFTER UPDATE OF note, software_id, created_at ON Avis BEGIN
+    {review_removed('old')}
+    {review_added('new')}
+END;
+CREATE TRIGGER IF NOT EXISTS Favori_logicielstats_ai AFTER INSERT ON Favori BEGIN
+    {favorite_delta('new', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS Favori_logicielstats_ad AFTER DELETE ON Favori BEGIN
+    {favorite_delta('old', -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS Favori_logicielstats_au AFTER UPDATE OF software_id ON Favori BEGIN
+    {favorite_delta('old', -1)}
+    {favorite_delta('new', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS Logiciel_logicielstats_ad AFTER DELETE ON Logiciel BEGIN
+    DELETE FROM LogicielStats WHERE software_id = old.software_id;
+END;
+"""
+
+# Remplissage en masse : 1 GROUP BY par table source au lieu d'un trigger par ligne
+LOGICIEL_STATS_REBUILD = """
+DELETE FROM LogicielStats;
+INSERT INTO LogicielStats (software_id, nb_avis, nb_notes, sum_note, avg_note, nb_favoris, last_review_at)
+SELECT l.software_id, COALESCE(a.nb_avis, 0), COALESCE(a.nb_notes, 0), COALESCE(a.sum_note, 0), a.avg_note,
+       COALESCE(f.nb_favoris, 0), a.last_review_at
+FROM Logiciel l
+LEFT JOIN (SELECT software_id, COUNT(*) AS nb_avis, COUNT(note) AS nb_notes, SUM(note) AS sum_note,
+                  AVG(note) AS avg_note, MAX(created_at) AS last_review_at
+           FROM Avis GROUP BY software_id) a ON a.software_id = l.software_id
+LEFT JOIN (SELECT software_id, COUNT(*) AS nb_favoris FROM Favori GROUP BY software_id) f
+       ON f.software_id = l.software_id;
+"""
+
+# 🗺️ Index spatial R*Tree (boîte = point) : recherche par zone / plus proches voisins
+# table → (clé primaire, latitude, longitude)
+GEO_TABLES = {'Pilote': ('rowid', 'latitude', 'longitude')}
+
+
+def geo_rebuild_sql(table, pk, lat, lon):
+    return f"""DELETE FROM {table}_geo;
+INSERT INTO {table}_geo SELECT {pk}, {lat}, {lat}, {lon}, {lon} FROM {table}
+WHERE {lat} IS NOT NULL AND {lon} IS NOT NULL;
+"""
+
+
+def geo_sql(table, pk, lat, lon):
+    """R*Tree {table}_geo + triggers de synchronisation (lignes sans coordonnées ignorées)"""
+    geo = f"{table}_geo"
+    insert = (f"INSERT INTO {geo} SELECT new.{pk}, new.{lat}, new.{lat}, new.{lon}, new.{lon} "
+              f"WHERE new.{lat} IS NOT NULL AND new.{lon} IS NOT NULL;")
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {geo} USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+
+CREATE TRIGGER IF NOT EXISTS {geo}_ai AFTER INSERT ON {table} BEGIN
+    {insert}
+END;
+CREATE TRIGGER IF NOT EXISTS {geo}_ad AFTER DELETE ON {table} BEGIN
+    DELETE FROM {geo} WHERE id = old.{pk};
+END;
+CREATE TRIGGER IF NOT EXISTS {geo}_au AFTER UPDATE OF {lat}, {lon} ON {table} BEGIN
+    DELETE FROM {geo} WHERE id = old.{pk};
+    {insert}
+END;
+"""
+
+
+SQL_GEO = ''.join(geo_sql(table, *cols) for table, cols in GEO_TABLES.items())
+
+# 📍 Pyramide de clusters de la carte (construite par pilote_clusters.py, NumPy)
+# Cellules = tuiles Web Mercator du niveau zoom + CLUSTER_CELL_BITS (4x4 cellules par tuile affichée)
+CLUSTER_MIN_ZOOM = 0
+CLUSTER_MAX_ZOOM = 16
+CLUSTER_CELL_BITS = 2
+
+SQL_CLUSTER = """
+CREATE TABLE IF NOT EXISTS PiloteCluster (
+    zoom INTEGER NOT NULL,
+    tile_x INTEGER NOT NULL,
+    tile_y INTEGER NOT NULL,
+    nb INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    types TEXT NOT NULL DEFAULT '{}',
+    sample_id INTEGER,
+    PRIMARY KEY (zoom, tile_x, tile_y)
+) WITHOUT ROWID;
+
+-- Points modifiés depuis le dernier passage : seules leurs cellules sont recalculées
+CREATE TABLE IF NOT EXISTS PiloteClusterDirty (
+    dirty_id INTEGER PRIMARY KEY,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS Pilote_cluster_ai AFTER INSERT ON Pilote
+WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+    INSERT INTO PiloteClusterDirty (latitude, longitude) VALUES (new.latitude, new.longitude);
+END;
+CREATE TRIGGER IF NOT EXISTS Pilote_cluster_ad AFTER DELETE ON Pilote
+WHEN old.latitude IS NOT NULL AND old.longitude IS NOT NULL BEGIN
+    INSERT INTO PiloteClusterDirty (latitude, longitude) VALUES (old.latitude, old.longitude);
+END;
+CREATE TRIGGER IF NOT EXISTS Pilote_cluster_au AFTER UPDATE OF latitude, longitude, type ON Pilote BEGIN
+    INSERT INTO PiloteClusterDirty (latitude, longitude)
+    SELECT old.latitude, old.longitude WHERE old.latitude IS NOT NULL AND old.longitude IS NOT NULL;
+    INSERT INTO PiloteClusterDirty (latitude, longitude)
+    SELECT new.latitude, new.longitude WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+"""
+
+# 🤝 « Ceux qui utilisent ce logiciel utilisent aussi... » (calculé par logiciel_similar.py, NumPy)
+# Interactions = Favori + Historique ; les logiciels touchés depuis le dernier calcul sont marqués « dirty »
+SIMILAR_TOP_K = 20
+
+SQL_SIMILAR_TABLES = """
+CREATE TABLE IF NOT EXISTS LogicielSimilar (
+    software_id INTEGER NOT NULL,
+    similar_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (software_id, similar_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_logicielsimilar_score ON LogicielSimilar(software_id, score DESC);
+
+-- version incrémentée à chaque interaction : une ligne n'est retirée que si elle n'a pas bougé pendant le calcul
+CREATE TABLE IF NOT EXISTS LogicielSimilarDirty (
+    software_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID;
+"""
+
+
+def similar_dirty_sql(table, suffix, event, row):
+    """Trigger {table}_similar_{suffix} : marque le logiciel de la ligne écrite"""
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_similar_{suffix} AFTER {event} ON {table} BEGIN
+    INSERT INTO LogicielSimilarDirty (software_id) VALUES ({row}.software_id)
+    ON CONFLICT(software_id) DO UPDATE SET version = version + 1;
+END;
+"""
+
+
+# Pas de trigger DELETE sur Historique : le compactage (historique_rollup.py) fait vieillir les
+# consultations, pris en compte au prochain calcul complet (logiciel_similar.py --full)
+SIMILAR_TRIGGERS = (('Favori', 'ai', 'INSERT', 'new'), ('Favori', 'ad', 'DELETE', 'old'),
+                    ('Historique', 'ai', 'INSERT', 'new'))
+SQL_SIMILAR = SQL_SIMILAR_TABLES + ''.join(similar_dirty_sql(*t) for t in SIMILAR_TRIGGERS)
+
+# 📈 Tendances (logiciel_trending.py) : score à décroissance exponentielle tenu par high-water marks
+# score = Σ poids · 2^((t - epoch) / demi-vie) → l'ordre des scores ne change pas avec le temps,
+# seuls les nouveaux événements sont ajoutés. category_id = 0 : toutes catégories
+SQL_TRENDING = """
+CREATE TABLE IF NOT EXISTS LogicielTrending (
+    category_id INTEGER NOT NULL,
+    software_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (category_id, software_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_logicieltrending_score ON LogicielTrending(category_id, score DESC);
+
+-- epoch, demi-vie et dernier id traité par table source
+CREATE TABLE IF NOT EXISTS LogicielTrendingState (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Lignes par catégorie = copie de la ligne globale, suivent les (dé)classements
+CREATE TRIGGER IF NOT EXISTS LogicielCategorie_trending_ai AFTER INSERT ON LogicielCategorie BEGIN
+    INSERT INTO LogicielTrending (category_id, software_id, score)
+    SELECT new.category_id, software_id, score FROM LogicielTrending WHERE category_id = 0 AND software_id = new.software_id
+    ON CONFLICT(category_id, software_id) DO NOTHING;
+END;
+CREATE TRIGGER IF NOT EXISTS LogicielCategorie_trending_ad AFTER DELETE ON LogicielCategorie BEGIN
+    DELETE FROM LogicielTrending WHERE category_id = old.category_id AND software_id = old.software_id;
+END;
+"""
+
+# 📆 Consultations agrégées par jour (historique_rollup.py compacte les lignes Historique anciennes)
+SQL_HISTORIQUE_DAILY = """
+CREATE TABLE IF NOT EXISTS HistoriqueDaily (
+    software_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    views INTEGER NOT NULL,
+    unique_users INTEGER NOT NULL,
+    PRIMARY KEY (software_id, day)
+) WITHOUT ROWID;
+"""
+
+# 🔁 Compteurs de modifications par table (snapshot_export.py ne régénère que les tables modifiées)
+CHANGE_TRACKED_TABLES = ('Logiciel', 'Categorie', 'Pilote')
+
+SQL_CHANGES_TABLE = """
+CREATE TABLE IF NOT EXISTS table_changes (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+def changes_sql(table):
+    """Triggers {table}_changes_ai/_au/_ad : version + 1 à chaque ligne écrite"""
+    bump = (f"INSERT INTO table_changes (table_name, version) VALUES ('{table}', 1) "
+            f"ON CONFLICT(table_name) DO UPDATE SET version = version + 1;")
+    return ''.join(f"""CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN
+    {bump}
+END;
+""" for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')))
+
+
+SQL_CHANGES = SQL_CHANGES_TABLE + ''.join(changes_sql(t) for t in CHANGE_TRACKED_TABLES)
+
+# Remplissage des tables dérivées quand une migration les crée sur une DB existante
+BACKFILL_SQL = {'table_stats': stats_rebuild_sql(), 'LogicielStats': LOGICIEL_STATS_REBUILD,
+                **{f"{table}_geo": geo_rebuild_sql(table, *cols) for table, cols in GEO_TABLES.items()}}
+
+
+def schema_ddl():
+    """DDL complet du schéma cible (référence de migrate_db.py)"""
+    return (SQL_SCHEMA + SQL_INDEXES + SQL_FTS + SQL_STATS + SQL_LOGICIEL_STATS + SQL_GEO + SQL_CLUSTER
+            + SQL_SIMILAR + SQL_TRENDING + SQL_HISTORIQUE_DAILY + SQL_CHANGES)
 
 # ✅ Données de test COMPLETES avec GPS
 TEST_DATA = """
@@ -219,11 +612,49 @@ INSERT OR IGNORE INTO Pilote (nom, code, url, type, ville, academie, latitude, l
 ('Lycée Vincent d''Indy', '0070021k', 'https://nird.forge.apps.education.fr/pilotes/0070021k.html', 'lycee', 'Privas', 'Grenoble', 44.7354, 4.5996, 'actif');
 """
 
-def create_database():
-    """Crée la base de données complète"""
+# Tables dérivées calculées en Python (pas de backfill SQL possible) : vides tant qu'elles ne sont pas construites
+DERIVED_TABLES = ('PiloteCluster', 'LogicielSimilar', 'LogicielTrending')
+
+
+def build_derived(conn, tables=DERIVED_TABLES):
+    """Construit les tables dérivées demandées (création de la base, ou tables créées par une migration)"""
+    if 'PiloteCluster' in tables:
+        print("📍 Clusters de la carte (PiloteCluster)...")
+        try:
+            from pilote_clusters import build_clusters
+        except ImportError:
+            print("⚠️  NumPy absent : clusters non calculés (pip install numpy puis generation/pilote_clusters.py)")
+        else:
+            with conn:
+                build_clusters(conn)
+            print("✅ Clusters prêts")
+
+    if 'LogicielSimilar' in tables:
+        print("🤝 Logiciels similaires (LogicielSimilar)...")
+        try:
+            from logiciel_similar import build_similar
+        except ImportError:
+            print("⚠️  NumPy absent : voisins non calculés (pip install numpy puis generation/logiciel_similar.py)")
+        else:
+            build_similar(conn)
+            print("✅ Voisins prêts")
+
+    if 'LogicielTrending' in tables:
+        print("📈 Tendances (LogicielTrending)...")
+        from logiciel_trending import build_trending
+        build_trending(conn)
+        print("✅ Tendances prêtes")
+
+
+def create_database(db_path=DB_PATH, scale=None, seed=42, workers=1):
+    """Crée la base de données complète (+ jeu synthétique si scale est fourni)
+    → renvoie les durées (s) de chaque étape"""
+    db_path = Path(db_path)
+    timings = {}
+    started = time.perf_counter()
     try:
         print("🔗 Connexion SQLite...")
-        conn = sqlite3.connect(str(DB_PATH.absolute()), timeout=30)
+        conn = sqlite3.connect(str(db_path.absolute()), timeout=30)
         cursor = conn.cursor()
         conn.execute("PRAGMA journal_mode=WAL")
         
@@ -238,10 +669,59 @@ def create_database():
         print("📦 Insertion des données...")
         cursor.executescript(TEST_DATA)
         print("✅ Données insérées")
+
+        if scale:
+            print(f"🧪 Jeu synthétique (seed={seed}, workers={workers})...")
+            t0 = time.perf_counter()
+            if workers > 1:
+                timings.update(load_synthetic_sharded(conn, db_path, scale, seed, workers, SQL_SCHEMA))
+            else:
+                load_synthetic(conn, scale, seed)
+                timings['generation'] = time.perf_counter() - t0
+            print("✅ Jeu synthétique chargé")
+
+        print("📇 Création des index...")
+        t0 = time.perf_counter()
+        cursor.executescript(SQL_INDEXES)
+        timings['index'] = time.perf_counter() - t0
+        print(f"✅ Index créés ({timings['index']:.1f}s)")
+
+        print("🔎 Index plein texte FTS5...")
+        t0 = time.perf_counter()
+        cursor.executescript(SQL_FTS)
+        timings['fts'] = time.perf_counter() - t0
+        print(f"✅ FTS5 prêt: {', '.join(FTS_TABLES)} ({timings['fts']:.1f}s)")
+
+        print("🔢 Compteurs table_stats...")
+        cursor.executescript(SQL_STATS + stats_rebuild_sql())
+        print(f"✅ Compteurs prêts ({len(STATS_TABLES)} tables, par type: {', '.join(COUNTED_TYPES)})")
+
+        print("⭐ Résumés LogicielStats (notes, favoris)...")
+        t0 = time.perf_counter()
+        cursor.executescript(SQL_LOGICIEL_STATS + LOGICIEL_STATS_REBUILD)
+        print(f"✅ LogicielStats prêt ({time.perf_counter() - t0:.1f}s)")
+
+        print("🗺️ Index spatial R*Tree...")
+        t0 = time.perf_counter()
+        cursor.executescript(SQL_GEO + ''.join(geo_rebuild_sql(t, *cols) for t, cols in GEO_TABLES.items()))
+        print(f"✅ R*Tree prêt: {', '.join(f'{t}_geo' for t in GEO_TABLES)} ({time.perf_counter() - t0:.1f}s)")
+
+        cursor.executescript(SQL_CLUSTER + SQL_SIMILAR + SQL_TRENDING)
+        build_derived(conn)
+
+        # Vide à la création : alimentée par historique_rollup.py au-delà de la rétention
+        cursor.executescript(SQL_HISTORIQUE_DAILY)
+        cursor.executescript(SQL_CHANGES)
+
+        # Statistiques pour le planificateur (choix des index ci-dessus)
+        cursor.execute("ANALYZE")
+        cursor.execute("PRAGMA optimize")
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        timings['total'] = time.perf_counter() - started
         
         # Vérification complète
         print("\n🔍 VÉRIFICATION:")
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE '%_fts%' AND name NOT LIKE '%_geo%' ORDER BY name;")
         tables = [t[0] for t in cursor.fetchall()]
         print(f"📋 Tables créées: {len(tables)}")
         for table in tables:
@@ -255,12 +735,13 @@ def create_database():
         for row in cursor.fetchall():
             print(f"   {row[0]}: {row[1]}")
         
-        cursor.execute("SELECT COUNT(*) FROM Pilote WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+        cursor.execute("SELECT COUNT(*) FROM Pilote_geo")
         geo_count = cursor.fetchone()[0]
         print(f"   🗺️ Géolocalisés: {geo_count}")
         
-        print(f"\n🎉 DB prête: {DB_PATH.absolute()}")
-        print(f"📏 Taille: {DB_PATH.stat().st_size / 1024:.2f} KB")
+        print(f"\n🎉 DB prête: {db_path.absolute()}")
+        print(f"📏 Taille: {db_path.stat().st_size / 1024:.2f} KB")
+        return timings
         
     except sqlite3.Error as e:
         print(f"❌ SQLite Error: {e}")
@@ -275,19 +756,72 @@ def create_database():
             print("🔒 DB fermée proprement")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Création de la base de données NIRD")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite cible")
+    parser.add_argument('--scale', type=parse_scale, default=None,
+                        help="Jeu synthétique, ex: users=1e6,avis=5e6,historique=5e7")
+    parser.add_argument('--seed', type=int, default=42, help="Graine du jeu synthétique")
+    parser.add_argument('--workers', type=lambda v: [int(w) for w in v.split(',')], default=[1],
+                        help="Process de génération (ex: 4), ou liste pour un rapport temps/workers (ex: 1,2,4,8)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Supprimer et recréer la DB (par défaut : migration en place, sans perte de données)")
+    parser.add_argument('-y', '--yes', action='store_true', help="Écraser la DB existante sans confirmation")
+    args = parser.parse_args()
+    db_path = args.db
+
+    print("🚀 Création de la base de données NIRD...")
+    print(f"📁 Projet root: {BASE_DIR.absolute()}")
+    print(f"📄 DB cible: {db_path.absolute()}")
+
+    # ✅ CRÉER DOSSIERS + VÉRIFIER PERMISSIONS
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not os.access(db_path.parent, os.W_OK):
+        print("❌ ERREUR: Pas de permission d'écriture!")
+        exit(1)
+
     print("🎯 Vérifications préalables:")
-    print(f"   📁 Dossier existe: {DB_PATH.parent.exists()}")
-    print(f"   ✅ Permission écriture: {os.access(DB_PATH.parent, os.W_OK)}")
-    print(f"   📄 DB existe déjà: {DB_PATH.exists()}")
+    print(f"   📁 Dossier existe: {db_path.parent.exists()}")
+    print(f"   ✅ Permission écriture: {os.access(db_path.parent, os.W_OK)}")
+    print(f"   📄 DB existe déjà: {db_path.exists()}")
     
-    if DB_PATH.exists():
+    # DB existante sans --rebuild/--scale → migration incrémentale (données conservées)
+    if db_path.exists() and not (args.rebuild or args.scale):
+        print("\n" + "="*50)
+        steps = migrate(db_path, schema_ddl(), SCHEMA_VERSION, backfill=BACKFILL_SQL)
+        # Tables dérivées créées (vides) par la migration → calculées maintenant
+        created = {name for action, kind, name, _, _ in steps if kind == 'table' and action in ('create', 'recreate')}
+        derived = [table for table in DERIVED_TABLES if table in created]
+        if derived:
+            conn = sqlite3.connect(str(db_path), timeout=30)
+            try:
+                build_derived(conn, derived)
+            finally:
+                conn.close()
+        print("="*50 + "\n")
+        exit(0)
+
+    if db_path.exists() and not args.yes:
         response = input("\n⚠️  database.db existe déjà. Écraser? (y/N): ")
         if response.lower() != 'y':
             print("❌ Opération annulée")
             exit(0)
-        DB_PATH.unlink()
-        print("🗑️  Ancienne DB supprimée")
-    
-    print("\n" + "="*50)
-    create_database()
-    print("="*50 + "\n")
+
+    report = []
+    for workers in args.workers:
+        for path in (db_path, db_path.with_name(db_path.name + '-wal'), db_path.with_name(db_path.name + '-shm')):
+            if path.exists():
+                path.unlink()
+                print(f"🗑️  {path.name} supprimé")
+
+        print("\n" + "="*50)
+        report.append((workers, create_database(db_path, args.scale, args.seed, workers)))
+        print("="*50 + "\n")
+
+    if len(report) > 1:
+        print("⏱️  TEMPS DE CONSTRUCTION PAR NOMBRE DE WORKERS:")
+        print(f"   {'workers':>7} {'génération':>11} {'fusion':>8} {'index':>8} {'fts':>8} {'total':>8} {'speedup':>8}")
+        baseline = report[0][1]['total']
+        for workers, t in report:
+            print(f"   {workers:>7} {t.get('generation', 0):>10.1f}s {t.get('merge', 0):>7.1f}s "
+                  f"{t['index']:>7.1f}s {t['fts']:>7.1f}s {t['total']:>7.1f}s {baseline / t['total']:>7.2f}x")
@@ -1,182 +1,1333 @@
+import re
 import sqlite3
 from pathlib import Path
 import sys
 
-def generate_models_from_db(db_path='./serveur/database.db'):
-    """Lit la DB et génère les models Node.js PURE JS (sans @ pour éviter erreurs TS)"""
-    
-    print("🔍 Analyse de la base de données...")
-    print(f"   📂 DB path: {db_path}")
-    
-    if not Path(db_path).exists():
-        print(f"❌ DB introuvable: {db_path}")
-        return
-    
-    print("✅ DB trouvée, connexion...")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Récupérer toutes les tables (exclut sqlite_*)
-    print("📋 Récupération des tables...")
-    cursor.execute("""
-        SELECT name FROM sqlite_master 
-        WHERE type='table' AND name NOT LIKE 'sqlite_%'
-    """)
-    tables = [row[0] for row in cursor.fetchall()]
-    print(f"   📊 {len(tables)} table(s) trouvée(s): {tables}")
-    
-    if not tables:
-        print("❌ Aucune table trouvée dans la DB")
-        conn.close()
-        return
-    
-    models_dir = Path('./src/models')
-    models_dir.mkdir(parents=True, exist_ok=True)
-    
-    for table_name in tables:
-        print(f"\n📝 Génération model '{table_name}'...")
-        
-        # Récupérer colonnes + types
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
-        print(f"   📏 {len(columns)} colonne(s)")
-        
-        # PK column
-        pk_col = next((col[1] for col in columns if col[5]), 'rowid')
-        print(f"   🗝️  PK: '{pk_col}'")
-        
-        # Nom classe capitalisé
-        class_name = table_name[0].upper() + table_name[1:]
-        print(f"   🏷️  Classe: '{class_name}Model'")
-        
-        # ✅ JS PURE - AUCUN @ (évite erreurs TS)
-        model_code = f"""// Model {table_name.title()} (auto-généré depuis DB)
-// ✅ Compatible TypeScript/VSCode - Utilisez @aliases dans CONTROLLERS seulement
+from generate_db import CLUSTER_CELL_BITS, CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM
+
+# Tables techniques des scripts de génération (pas de model Node.js)
+INTERNAL_TABLES = {'import_checkpoint', 'table_stats', 'LogicielStats', 'PiloteCluster', 'PiloteClusterDirty',
+                   'LogicielSimilar', 'LogicielSimilarDirty', 'LogicielTrending', 'LogicielTrendingState',
+                   'HistoriqueDaily', 'table_changes'}
+
+CONNECTION_MODULE = """// Connexions SQLite partagées (auto-généré par generation/generate_models.py)
+// 1 connexion writer + un petit pool de connexions read-only par fichier, pour tous les models/controllers
 
+const fs = require('fs');
+const path = require('path');
 const sqlite3 = require('sqlite3').verbose();
 
-class {class_name}Model {{
-  constructor(dbPath = 'C:/Users/maxim/Desktop/NDI/SITE/serveur/database.db') {{
-    this.tableName = '{table_name}';
-    this.db = new sqlite3.Database(dbPath);
-    console.log(`🗄️ ${{this.tableName}} DB connectée`);
+// Base unique du serveur (NIRD_DB_PATH : artefact produit par generation/finalize_db.py)
+const DEFAULT_DB_PATH = process.env.NIRD_DB_PATH
+  ? path.resolve(process.env.NIRD_DB_PATH)
+  : path.join(__dirname, '..', '..', 'database.db');
+const READERS = parseInt(process.env.NIRD_DB_READERS) || 4;
+const BUSY_TIMEOUT_MS = 5000;
+// Statements préparés gardés par model (LRU)
+const MAX_STATEMENTS = 64;
+// Paramètres par statement des écritures en lot (SQLITE_MAX_VARIABLE_NUMBER avant 3.32, 32766 ensuite)
+const MAX_VARIABLES = 999;
+
+// 🧠 Cache de lectures optionnel (NIRD_DB_CACHE=1) : LRU borné en entrées et en octets, avec TTL
+const CACHE_ENABLED = process.env.NIRD_DB_CACHE === '1';
+const CACHE_MAX_ENTRIES = parseInt(process.env.NIRD_CACHE_ENTRIES) || 1000;
+const CACHE_MAX_BYTES = parseInt(process.env.NIRD_CACHE_BYTES) || 16 * 1024 * 1024;
+const CACHE_TTL_MS = parseInt(process.env.NIRD_CACHE_TTL_MS) || 30000;
+// Écritures des autres process (scripts generation/) détectées par PRAGMA data_version
+const DATA_VERSION_POLL_MS = parseInt(process.env.NIRD_CACHE_POLL_MS) || 500;
+
+// 🔬 Instrumentation : chaque requête exécutée → ring buffer en mémoire (toujours actif, 1 objet par requête)
+// + journal NDJSON optionnel (NIRD_QUERY_LOG=chemin, requêtes ≥ NIRD_QUERY_LOG_MIN_MS) → generation/slow_queries.py
+const TRACE_SIZE = parseInt(process.env.NIRD_TRACE_SIZE) || 1000;
+const QUERY_LOG = process.env.NIRD_QUERY_LOG || null;
+const QUERY_LOG_MIN_MS = parseFloat(process.env.NIRD_QUERY_LOG_MIN_MS) || 0;
+// Journal en retard de plus de ~1 Mo (disque lent) : événements abandonnés plutôt que de bloquer les requêtes
+const QUERY_LOG_MAX_PENDING = 1024 * 1024;
+
+// 📚 Réplique lecture seule pour le reporting lourd (generation/backup_db.py --replica) :
+// NIRD_DB_REPLICA, sinon database.replica.db à côté de la base ; absente → lecteur du pool
+const REPLICA_PATH = process.env.NIRD_DB_REPLICA || null;
+
+// 🗺️ Lecteurs (pool + réplique) en I/O mappée : NIRD_DB_MMAP_SIZE octets (0 = désactivé, défaut 256 Mo)
+// NIRD_DB_CACHE_KB = cache de pages par connexion (défaut SQLite sinon) ; profils : generation/finalize_db.py
+const MMAP_SIZE = process.env.NIRD_DB_MMAP_SIZE !== undefined
+  ? parseInt(process.env.NIRD_DB_MMAP_SIZE) || 0
+  : 256 * 1024 * 1024;
+const CACHE_KB = parseInt(process.env.NIRD_DB_CACHE_KB) || 0;
+
+const registry = new Map(); // chemin absolu → { writer, readers, next, queue, cache }
+const trace = { ring: new Array(TRACE_SIZE), next: 0, total: 0, dropped: 0, hooks: new Set(), log: null };
+
+function entry(dbPath = DEFAULT_DB_PATH) {
+  const key = path.resolve(dbPath);
+  let db = registry.get(key);
+  if (!db) {
+    const writer = new sqlite3.Database(key, (err) => {
+      if (err) console.error(`❌ Erreur DB ${key}:`, err.message);
+    });
+    writer.configure('busyTimeout', BUSY_TIMEOUT_MS);
+    writer.run('PRAGMA journal_mode=WAL');
+    writer.poolKey = 'w';
+    db = { key, writer, readers: [], next: 0, queue: Promise.resolve(), cache: newCache(), replica: null };
+    registry.set(key, db);
+    if (CACHE_ENABLED) watchDataVersion(db);
+    console.log(`✅ DB partagée ouverte: ${key}`);
+  }
+  return db;
+}
+
+// ✏️ Connexion d'écriture (unique par fichier)
+function writer(dbPath) {
+  return entry(dbPath).writer;
+}
+
+// 🔒 Écritures sérialisées sur le writer : une transaction en lot (BEGIN ... COMMIT) n'est jamais
+// entrelacée avec l'écriture d'un autre model ; work(handle) → Promise
+// tables = tables modifiées (triggers compris) → entrées du cache à invalider (toutes si absent)
+function withWriter(dbPath, work, tables = null) {
+  const db = entry(dbPath);
+  const result = db.queue.then(() => work(db.writer)).finally(() => invalidate(db, tables));
+  db.queue = result.catch(() => {});
+  return result;
+}
+
+// Réglages de connexion des lecteurs (non persistés dans le fichier)
+function tune(handle) {
+  handle.run(`PRAGMA mmap_size=${MMAP_SIZE}`);
+  if (CACHE_KB) handle.run(`PRAGMA cache_size=-${CACHE_KB}`);
+}
+
+// 👓 Connexion read-only du pool (créées à la demande, puis round-robin)
+function reader(dbPath) {
+  const db = entry(dbPath);
+  if (db.readers.length < READERS) {
+    const handle = new sqlite3.Database(db.key, sqlite3.OPEN_READONLY, (err) => {
+      if (err) console.error(`❌ Lecteur DB ${db.key}:`, err.message);
+    });
+    handle.configure('busyTimeout', BUSY_TIMEOUT_MS);
+    tune(handle);
+    handle.poolKey = `r${db.readers.length}`;
+    db.readers.push(handle);
+    return handle;
+  }
+  const handle = db.readers[db.next];
+  db.next = (db.next + 1) % db.readers.length;
+  return handle;
+}
+
+// 📚 Connexion read-only sur la réplique (rouverte quand backup_db.py la remplace par rename)
+function replica(dbPath) {
+  const db = entry(dbPath);
+  const file = REPLICA_PATH ? path.resolve(REPLICA_PATH) : db.key.replace(/\.db$/, '') + '.replica.db';
+  let stat;
+  try {
+    stat = fs.statSync(file);
+  } catch (e) {
+    return reader(dbPath);
+  }
+  if (db.replica && db.replica.ino === stat.ino) return db.replica.handle;
+  // Nouvelle copie : l'ancienne connexion se ferme une fois ses requêtes en cours terminées
+  if (db.replica) db.replica.handle.close();
+  const handle = new sqlite3.Database(file, sqlite3.OPEN_READONLY, (err) => {
+    if (err) console.error(`❌ Réplique DB ${file}:`, err.message);
+  });
+  handle.configure('busyTimeout', BUSY_TIMEOUT_MS);
+  tune(handle);
+  handle.poolKey = 'replica';
+  db.replica = { ino: stat.ino, handle };
+  console.log(`📚 Réplique ouverte: ${file}`);
+  return handle;
+}
+
+function newCache() {
+  return {
+    entries: new Map(),   // clé → { value, tags, bytes, expires } (ordre d'insertion = LRU)
+    pending: new Map(),   // clé → Promise : lectures identiques simultanées → 1 seule requête
+    versions: new Map(),  // table → n° d'invalidation (une lecture commencée avant une écriture n'est pas gardée)
+    epoch: 0,
+    bytes: 0,
+    dataVersion: null,
+    timer: null,
+    stats: { hits: 0, misses: 0, evictions: 0, invalidations: 0, expired: 0 },
+  };
+}
+
+// Tables lues par une requête (FROM/JOIN) : étiquettes d'invalidation
+function readTables(sql) {
+  return [...new Set([...sql.matchAll(/\\b(?:FROM|JOIN)\\s+([A-Za-z_]\\w*)/gi)].map(m => m[1].toLowerCase()))];
+}
+
+// Copie superficielle : les appelants peuvent enrichir les lignes (loadRelations) sans polluer le cache
+function copy(value) {
+  if (Array.isArray(value)) return value.map(row => (row && typeof row === 'object' ? { ...row } : row));
+  return value && typeof value === 'object' ? { ...value } : value;
+}
+
+function drop(cache, key, item) {
+  cache.entries.delete(key);
+  cache.bytes -= item.bytes;
+}
+
+function snapshot(cache, tags) {
+  return `${cache.epoch}:${tags.map(t => cache.versions.get(t) || 0).join(',')}`;
+}
+
+function store(cache, key, tags, value) {
+  const bytes = Buffer.byteLength(JSON.stringify(value) ?? '');
+  if (bytes > CACHE_MAX_BYTES / 4) return;  // résultat trop gros : jamais gardé
+  const old = cache.entries.get(key);
+  if (old) drop(cache, key, old);
+  while (cache.entries.size && (cache.entries.size >= CACHE_MAX_ENTRIES || cache.bytes + bytes > CACHE_MAX_BYTES)) {
+    const [oldKey, oldItem] = cache.entries.entries().next().value;
+    drop(cache, oldKey, oldItem);
+    cache.stats.evictions++;
+  }
+  cache.entries.set(key, { value, tags, bytes, expires: Date.now() + CACHE_TTL_MS });
+  cache.bytes += bytes;
+}
+
+// 🧠 Lecture via le cache : load() n'est appelé qu'en cas d'absence (ou d'expiration)
+function cached(dbPath, sql, params, load) {
+  if (!CACHE_ENABLED) return load();
+  const cache = entry(dbPath).cache;
+  const key = JSON.stringify([sql, params]);
+  const item = cache.entries.get(key);
+  if (item && item.expires > Date.now()) {
+    cache.entries.delete(key);
+    cache.entries.set(key, item);
+    cache.stats.hits++;
+    return Promise.resolve(copy(item.value));
+  }
+  if (item) {
+    drop(cache, key, item);
+    cache.stats.expired++;
+  }
+  cache.stats.misses++;
+  let pending = cache.pending.get(key);
+  if (!pending) {
+    const tags = readTables(sql);
+    const before = snapshot(cache, tags);
+    pending = load().then(value => {
+      if (snapshot(cache, tags) === before) store(cache, key, tags, value);
+      return value;
+    }).finally(() => {
+      if (cache.pending.get(key) === pending) cache.pending.delete(key);
+    });
+    pending.tags = tags;
+    cache.pending.set(key, pending);
+  }
+  return pending.then(copy);
+}
+
+// Vide les entrées qui lisent l'une des tables (toutes si tables est null)
+function invalidate(db, tables = null) {
+  const cache = db.cache;
+  const names = tables && tables.map(t => t.toLowerCase());
+  const hit = tags => !names || tags.some(t => names.includes(t));
+  if (names) names.forEach(t => cache.versions.set(t, (cache.versions.get(t) || 0) + 1));
+  else cache.epoch++;
+  for (const [key, item] of cache.entries) {
+    if (hit(item.tags)) drop(cache, key, item);
+  }
+  for (const [key, pending] of cache.pending) {
+    if (hit(pending.tags)) cache.pending.delete(key);
+  }
+  cache.stats.invalidations++;
+}
+
+// data_version du writer ne change qu'aux COMMIT des AUTRES connexions (scripts Python, autres process)
+function watchDataVersion(db) {
+  const check = () => db.writer.get('PRAGMA data_version', (err, row) => {
+    if (err || !row) return;
+    if (db.cache.dataVersion !== null && row.data_version !== db.cache.dataVersion) invalidate(db);
+    db.cache.dataVersion = row.data_version;
+  });
+  check();  // référence prise dès l'ouverture, avant toute mise en cache
+  db.cache.timer = setInterval(check, DATA_VERSION_POLL_MS);
+  db.cache.timer.unref();
+}
+
+// ⏱️ Exécute work() → Promise en mesurant la requête sql (les lectures servies par le cache ne passent pas ici)
+function traced(table, sql, params, work) {
+  const started = process.hrtime.bigint();
+  return work().then(result => {
+    record(table, sql, params, started, result, null);
+    return result;
+  }, err => {
+    record(table, sql, params, started, undefined, err);
+    throw err;
+  });
+}
+
+function record(table, sql, params, started, result, err) {
+  const ms = Number(process.hrtime.bigint() - started) / 1e6;
+  // Lignes renvoyées (all/get) ou modifiées (run)
+  const rows = Array.isArray(result) ? result.length
+    : result && typeof result.changes === 'number' ? result.changes : result ? 1 : 0;
+  const event = { ts: Date.now(), table, sql, params: params ? params.length : 0, ms, rows };
+  if (err) event.error = err.message;
+  trace.ring[trace.next] = event;
+  trace.next = (trace.next + 1) % TRACE_SIZE;
+  trace.total++;
+  for (const hook of trace.hooks) {
+    try {
+      hook(event);
+    } catch (e) {
+      console.error('❌ Hook requête:', e.message);
+    }
+  }
+  if (QUERY_LOG && ms >= QUERY_LOG_MIN_MS) writeLog(event);
+}
+
+function writeLog(event) {
+  if (!trace.log) {
+    trace.log = fs.createWriteStream(QUERY_LOG, { flags: 'a' });
+    trace.log.on('error', err => console.error(`❌ Journal requêtes ${QUERY_LOG}:`, err.message));
+  }
+  if (trace.log.writableLength > QUERY_LOG_MAX_PENDING) {
+    trace.dropped++;
+    return;
+  }
+  trace.log.write(JSON.stringify(event) + '\\n');
+}
+
+// 🪝 hook(event) appelé après chaque requête ({ ts, table, sql, params, ms, rows, error? }) → fonction de retrait
+function onQuery(hook) {
+  trace.hooks.add(hook);
+  return () => trace.hooks.delete(hook);
+}
+
+// 🔬 Dernières requêtes exécutées (plus récente en premier)
+function recentQueries(limit = TRACE_SIZE) {
+  const events = [];
+  for (let i = 1; i <= Math.min(limit, TRACE_SIZE, trace.total); i++) {
+    events.push(trace.ring[(trace.next - i + TRACE_SIZE) % TRACE_SIZE]);
+  }
+  return events;
+}
+
+function traceStats() {
+  return { size: TRACE_SIZE, total: trace.total, dropped: trace.dropped, log: QUERY_LOG };
+}
+
+// 📈 Compteurs du cache (par fichier DB)
+function cacheStats(dbPath) {
+  const cache = entry(dbPath).cache;
+  return { enabled: CACHE_ENABLED, entries: cache.entries.size, bytes: cache.bytes, ...cache.stats };
+}
+
+function closeAll() {
+  for (const db of registry.values()) {
+    clearInterval(db.cache.timer);
+    for (const handle of [db.writer, ...db.readers]) handle.close();
+    if (db.replica) db.replica.handle.close();
+  }
+  registry.clear();
+  if (trace.log) {
+    trace.log.end();
+    trace.log = null;
+  }
+}
+
+module.exports = {
+  DEFAULT_DB_PATH, MAX_STATEMENTS, MAX_VARIABLES,
+  writer, withWriter, reader, replica, cached, cacheStats, closeAll,
+  traced, onQuery, recentQueries, traceStats,
+};
+"""
+
+# Écritures bufferisées (journal à fort débit) : table → (colonne horodatage, flush toutes les N ms, ou N lignes)
+BUFFERED_WRITES = {'Historique': ('viewed_at', 1000, 500)}
+# Lignes gardées en mémoire au plus si la DB refuse les flush (au-delà : plus anciennes abandonnées)
+BUFFER_MAX_ROWS = 50000
+
+# Colonnes utilisées par search() en LIKE quand la table n'a pas d'index FTS5
+LIKE_SEARCH_COLUMNS = ('nom', 'description')
+
+FTS_QUERY_HELPER = """
+// 🔎 "logi édu" → "logi"* "édu"* (tous les mots, en préfixe)
+function toFtsQuery(query) {
+  const terms = String(query || '').match(/[\\p{L}\\p{N}]+/gu) || [];
+  return terms.map(t => `"${t}"*`).join(' ');
+}
+"""
+
+
+GEO_HELPER = """
+const EARTH_RADIUS_KM = 6371.0088;
+const KM_PER_DEG_LAT = 111.32;
+
+// 📏 Distance orthodromique (haversine) en km
+function haversineKm(lat1, lon1, lat2, lon2) {
+  const rad = Math.PI / 180;
+  const dLat = (lat2 - lat1) * rad;
+  const dLon = (lon2 - lon1) * rad;
+  const a = Math.sin(dLat / 2) ** 2 + Math.cos(lat1 * rad) * Math.cos(lat2 * rad) * Math.sin(dLon / 2) ** 2;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(a)));
+}
+"""
+
+
+def detect_fts(cursor):
+    """{table: (table_fts, [colonnes indexées])} pour les index FTS5 à contenu externe"""
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%fts5%'")
+    fts = {}
+    for name, sql in cursor.fetchall():
+        content = re.search(r"content\s*=\s*'(\w+)'", sql)
+        if content:
+            cursor.execute(f"PRAGMA table_info({name})")
+            fts[content.group(1)] = (name, [col[1] for col in cursor.fetchall()])
+    return fts
+
+
+def list_virtual_tables(cursor):
+    """Tables virtuelles (FTS5, R*Tree...)"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%'")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def detect_geo(cursor):
+    """{table: table_geo} pour les index R*Tree {table}_geo créés par generate_db.py"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%rtree%'")
+    return {row[0][:-len('_geo')]: row[0] for row in cursor.fetchall() if row[0].endswith('_geo')}
+
+
+def is_virtual_or_shadow(name, virtual_tables):
+    """Table virtuelle (FTS5, R*Tree) ou l'une de ses tables internes (_data, _idx, _node, ...)"""
+    return any(name == v or name.startswith(f"{v}_") for v in virtual_tables)
+
+
+def search_method(table_name, pk_col, columns, fts):
+    """search() : MATCH + bm25 si la table a un index FTS5, sinon LIKE sur nom/description"""
+    if fts:
+        fts_table, fts_cols = fts
+        weights = ', '.join(['10.0'] + ['1.0'] * (len(fts_cols) - 1))
+        return f"""  // 🔎 Recherche plein texte (FTS5 : classement bm25, préfixes, accents ignorés)
+  search(query, limit = 20) {{
+    const match = toFtsQuery(query);
+    if (!match) return Promise.resolve([]);
+    return this.queryAll(
+      `SELECT t.* FROM {fts_table} JOIN ${{this.tableName}} t ON t.{pk_col} = {fts_table}.rowid
+       WHERE {fts_table} MATCH ? ORDER BY bm25({fts_table}, {weights}) LIMIT ?`,
+      [match, limit]
+    );
+  }}"""
+
+    names = [col[1] for col in columns]
+    like_cols = [c for c in LIKE_SEARCH_COLUMNS if c in names] or \
+        [col[1] for col in columns if 'TEXT' in (col[2] or '').upper() and 'password' not in col[1]]
+    if not like_cols:
+        return """  // 🔎 Recherche (aucune colonne texte)
+  search(query, limit = 20) {
+    return Promise.resolve([]);
+  }"""
+    where = ' OR '.join(f"{c} LIKE ?" for c in like_cols)
+    params = ', '.join(['`%${query}%`'] * len(like_cols))
+    return f"""  // 🔎 Recherche
+  search(query, limit = 20) {{
+    return this.queryAll(`SELECT * FROM ${{this.tableName}} WHERE {where} LIMIT ?`,
+      [{params}, limit]);
+  }}"""
+
+
+def stats_triggers(cursor, table_name):
+    """Triggers de compteurs table_stats posés par generate_db.py ({table}_stats_ai/_au)"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE ?", (f"{table_name}_stats_%",))
+    return {row[0][len(table_name) + 1:] for row in cursor.fetchall()}
+
+
+def count_method(table_name, cursor):
+    """count() : lit le compteur table_stats (O(1)) si la table en a un, sinon COUNT(*)"""
+    triggers = stats_triggers(cursor, table_name)
+    if 'stats_ai' not in triggers:
+        return """  // 🔢 Compter
+  count() {
+    return this.queryRow(`SELECT COUNT(*) as count FROM ${this.tableName}`).then(row => row?.count || 0);
+  }"""
+    method = """  // 🔢 Compter : compteur maintenu par triggers (table_stats) au lieu d'un COUNT(*) complet
+  count() {
+    return this.queryRow(
+      `SELECT row_count as count FROM table_stats WHERE table_name = ? AND bucket = '*'`, [this.tableName]
+    ).then(row => row || this.queryRow(`SELECT COUNT(*) as count FROM ${this.tableName}`))
+      .then(row => row?.count || 0);
+  }"""
+    if 'stats_au' in triggers:
+        method += """
+
+  // 🔢 Compteurs par type ({ lycee: 12, college: 30, ... })
+  countByType() {
+    return this.queryAll(
+      `SELECT bucket, row_count FROM table_stats WHERE table_name = ? AND bucket <> '*' AND row_count > 0`,
+      [this.tableName]
+    ).then(rows => Object.fromEntries(rows.map(r => [r.bucket, r.row_count])));
+  }"""
+    return method
+
+
+def summary_methods(cursor, table_name, pk_col):
+    """findWithStats()/topRated() si une table résumé {table}Stats (generate_db.py) existe"""
+    stats_table = f"{table_name}Stats"
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (stats_table,))
+    if not cursor.fetchone():
+        return ''
+    return f"""
+
+  // ⭐ Avec résumé {stats_table} (tenu à jour par triggers) : aucune agrégation sur Avis
+  findWithStats(id) {{
+    return this.queryRow(
+      `SELECT t.*, COALESCE(s.nb_avis, 0) as nb_avis, s.avg_note, COALESCE(s.nb_favoris, 0) as nb_favoris,
+              s.last_review_at
+       FROM ${{this.tableName}} t LEFT JOIN {stats_table} s ON s.{pk_col} = t.{pk_col}
+       WHERE t.{pk_col} = ?`,
+      [id]
+    );
   }}
 
-  // 🔢 Compter
-  count() {{
-    return new Promise((resolve, reject) => {{
-      this.db.get(`SELECT COUNT(*) as count FROM ${{this.tableName}}`, (err, row) => {{
-        if (err) reject(err);
-        else resolve(row?.count || 0);
-      }});
-    }});
+  // 🏆 Mieux notés : parcours de idx_{stats_table.lower()}_top → O(limit)
+  topRated(limit = 10, minReviews = 1) {{
+    return this.queryAll(
+      `SELECT t.*, s.nb_avis, s.avg_note, s.nb_favoris, s.last_review_at
+       FROM {stats_table} s JOIN ${{this.tableName}} t ON t.{pk_col} = s.{pk_col}
+       WHERE s.nb_avis >= ? ORDER BY s.avg_note DESC, s.nb_avis DESC LIMIT ?`,
+      [minReviews, limit]
+    );
+  }}"""
+
+
+def similar_methods(cursor, table_name, pk_col):
+    """similar() si la table de voisins {table}Similar (logiciel_similar.py) existe"""
+    similar_table = f"{table_name}Similar"
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (similar_table,))
+    if not cursor.fetchone():
+        return ''
+    return f"""
+
+  // 🤝 « Ceux qui utilisent celui-ci utilisent aussi... » : voisins précalculés, 1 parcours de
+  // idx_{similar_table.lower()}_score (id, score DESC) → O(limit)
+  similar(id, limit = 10) {{
+    return this.queryAll(
+      `SELECT t.*, s.score FROM {similar_table} s JOIN ${{this.tableName}} t ON t.{pk_col} = s.similar_id
+       WHERE s.{pk_col} = ? ORDER BY s.score DESC LIMIT ?`,
+      [id, limit]
+    );
+  }}"""
+
+
+def trending_methods(cursor, table_name, pk_col):
+    """trending() si la table de tendances {table}Trending (logiciel_trending.py) existe"""
+    trending_table = f"{table_name}Trending"
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (trending_table,))
+    if not cursor.fetchone():
+        return ''
+    return f"""
+
+  // 📈 Tendances (décroissance exponentielle, tenues à jour par logiciel_trending.py) : 1 parcours de
+  // idx_{trending_table.lower()}_score (catégorie, score DESC) → O(limit) ; categoryId absent = toutes
+  trending(limit = 10, categoryId = null) {{
+    return this.queryAll(
+      `SELECT t.*, s.score FROM {trending_table} s JOIN ${{this.tableName}} t ON t.{pk_col} = s.{pk_col}
+       WHERE s.category_id = ? ORDER BY s.score DESC LIMIT ?`,
+      [categoryId || 0, limit]
+    );
+  }}"""
+
+
+def geo_methods(geo_table, pk_col):
+    """findInBBox()/findNearest() via l'index R*Tree {table}_geo"""
+    if not geo_table:
+        return ''
+    return f"""
+
+  // 🗺️ Dans une zone : filtre R*Tree (boîtes float32 arrondies vers l'extérieur) puis test exact
+  findInBBox(minLat, minLon, maxLat, maxLon, limit = 500) {{
+    return this.queryAll(
+      `SELECT t.* FROM {geo_table} g JOIN ${{this.tableName}} t ON t.{pk_col} = g.id
+       WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+         AND t.latitude BETWEEN ? AND ? AND t.longitude BETWEEN ? AND ?
+       LIMIT ?`,
+      [minLat, maxLat, minLon, maxLon, minLat, maxLat, minLon, maxLon, limit]
+    );
   }}
 
-  // 📋 Liste paginée
-  findAll(limit = 50, offset = 0) {{
-    return new Promise((resolve, reject) => {{
-      this.db.all(`SELECT * FROM ${{this.tableName}} LIMIT ? OFFSET ?`, [limit, offset], (err, rows) => {{
-        if (err) reject(err);
-        else resolve(rows || []);
-      }});
+  // 📍 k plus proches : rayon élargi (x4) jusqu'à k résultats DANS le cercle, distances haversine exactes
+  async findNearest(lat, lon, k = 10) {{
+    for (let radiusKm = 5; ; radiusKm *= 4) {{
+      const dLat = radiusKm / KM_PER_DEG_LAT;
+      // Largeur en longitude prise à la latitude la plus éloignée de l'équateur → le cercle tient dans la boîte
+      const cosLat = Math.cos(Math.min(Math.abs(lat) + dLat, 89.9) * Math.PI / 180);
+      const dLon = Math.min(radiusKm / (KM_PER_DEG_LAT * cosLat), 360);
+      // Boîte qui passe l'antiméridien (±180°) → 2 boîtes, de part et d'autre
+      let spans = [[lon - dLon, lon + dLon]];
+      if (dLon >= 180) spans = [[-180, 180]];
+      else if (lon - dLon < -180) spans = [[lon - dLon + 360, 180], [-180, lon + dLon]];
+      else if (lon + dLon > 180) spans = [[lon - dLon, 180], [-180, lon + dLon - 360]];
+      const rows = (await Promise.all(spans.map(([minLon, maxLon]) =>
+        this.findInBBox(lat - dLat, minLon, lat + dLat, maxLon, -1)))).flat();
+      const ranked = rows
+        .map(row => ({{ ...row, distance_km: haversineKm(lat, lon, row.latitude, row.longitude) }}))
+        .filter(row => row.distance_km <= radiusKm)
+        .sort((a, b) => a.distance_km - b.distance_km);
+      if (ranked.length >= k || radiusKm >= Math.PI * EARTH_RADIUS_KM) return ranked.slice(0, k);
+    }}
+  }}"""
+
+
+def cluster_methods(cursor, table_name):
+    """clustersForViewport() si la pyramide {table}Cluster (pilote_clusters.py) existe"""
+    cluster_table = f"{table_name}Cluster"
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (cluster_table,))
+    if not cursor.fetchone():
+        return ''
+    return f"""
+
+  // 📍 Clusters précalculés de la vue carte (mêmes cellules Web Mercator que generation/pilote_clusters.py)
+  // bbox = {{ minLat, minLon, maxLat, maxLon }} ; au-delà de CLUSTER_MAX_ZOOM → findInBBox() (points bruts)
+  clustersForViewport(zoom, bbox) {{
+    const z = Math.max({CLUSTER_MIN_ZOOM}, Math.min({CLUSTER_MAX_ZOOM}, Math.floor(zoom)));
+    const n = 2 ** (z + {CLUSTER_CELL_BITS});
+    const clampLat = lat => Math.max(-85.05112878, Math.min(85.05112878, lat));
+    const cellX = lon => Math.min(n - 1, Math.max(0, Math.floor((lon + 180) / 360 * n)));
+    const cellY = lat => {{
+      const rad = clampLat(lat) * Math.PI / 180;
+      return Math.min(n - 1, Math.max(0, Math.floor((1 - Math.asinh(Math.tan(rad)) / Math.PI) / 2 * n)));
+    }};
+    return this.queryAll(
+      `SELECT zoom, tile_x, tile_y, nb, lat, lon, types, sample_id FROM {cluster_table}
+       WHERE zoom = ? AND tile_x BETWEEN ? AND ? AND tile_y BETWEEN ? AND ?`,
+      [z, cellX(bbox.minLon), cellX(bbox.maxLon), cellY(bbox.maxLat), cellY(bbox.minLat)]
+    ).then(rows => rows.map(row => ({{ ...row, types: JSON.parse(row.types) }})));
+  }}"""
+
+
+def keyset_column(columns, pk_col):
+    """Départage du curseur : la PK si elle est unique (alias rowid), sinon rowid (PK composite)"""
+    return pk_col if sum(1 for col in columns if col[5]) == 1 else 'rowid'
+
+
+# WHERE des pages suivantes de findPage() (mêmes segments que le JS) : chacun doit être une recherche d'index
+SEEK_WHERES = (('ASC', "({col}, {key}) > (?, ?)"), ('DESC', "({col}, {key}) < (?, ?)"))
+# Segments NULL, seulement pour une colonne nullable (NULL en premier en ASC, en dernier en DESC)
+NULL_SEEK_WHERES = (('ASC', "{col} IS NULL AND {key} > ?"), ('ASC', "{col} IS NOT NULL"),
+                    ('DESC', "{col} IS NULL"), ('DESC', "{col} IS NULL AND {key} < ?"))
+
+
+def seek_plans(cursor, table_name, col, key_col, nullable):
+    """Plans (EXPLAIN QUERY PLAN) des pages suivantes qui ne sont pas un SEARCH trié par l'index.
+    Vérifiés sur le schéma seul (sans sqlite_stat1) : plan d'une table qui grandit, pas celui de la graine"""
+    schema = sqlite3.connect(':memory:')
+    cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+                   "AND sql IS NOT NULL ORDER BY type DESC", (table_name,))
+    for (sql,) in cursor.fetchall():
+        schema.execute(sql)
+    bad = []
+    for order, where in SEEK_WHERES + (NULL_SEEK_WHERES if nullable else ()):
+        where = where.format(col=col, key=key_col)
+        sql = f"SELECT * FROM {table_name} WHERE {where} ORDER BY {col} {order}, {key_col} {order} LIMIT 1"
+        details = [row[3] for row in schema.execute(f"EXPLAIN QUERY PLAN {sql}", (None,) * sql.count('?'))]
+        if not any(d.startswith('SEARCH') for d in details) or any('TEMP B-TREE' in d for d in details):
+            bad.append(f"{where} {order}: {' / '.join(details)}")
+    schema.close()
+    return bad
+
+
+def indexed_columns(cursor, table_name, key_col):
+    """Colonnes triables en keyset = 1re colonne d'un index dont la suivante est la clé de départage
+    (index à 1 colonne : rowid implicite), vérifiées par EXPLAIN QUERY PLAN → (triables, nullables)"""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = cursor.fetchall()
+    # Alias rowid : l'index le porte implicitement en dernière colonne
+    rowid_alias = key_col == 'rowid' or any(c[1] == key_col and c[5] and c[2].upper() == 'INTEGER'
+                                            for c in columns)
+    not_null = {c[1] for c in columns if c[3] or c[5]}
+    sortable, nullable = [key_col], []
+    cursor.execute(f"PRAGMA index_list({table_name})")
+    for index in cursor.fetchall():
+        cursor.execute(f"PRAGMA index_xinfo({index[1]})")
+        infos = sorted(cursor.fetchall())
+        if len(infos) < 2 or infos[0][2] is None or infos[0][2] in sortable:
+            continue
+        first, second = infos[0][2], infos[1]
+        # (col, autre colonne, ...) : ORDER BY col, clé demanderait un tri (TEMP B-TREE) → ignoré
+        if second[2] != key_col and not (second[1] == -1 and rowid_alias):
+            continue
+        bad = seek_plans(cursor, table_name, first, key_col, first not in not_null)
+        if bad:
+            print(f"   ⚠️  Tri sur '{first}' ignoré (pas de recherche d'index) : {bad[0]}")
+            continue
+        sortable.append(first)
+        if first not in not_null:
+            nullable.append(first)
+    return sortable, nullable
+
+
+def find_page_method(key_col, sortable):
+    """findPage() : pagination par curseur (keyset) sur une colonne indexée, départagée par key_col"""
+    return f"""  // 📄 Page suivante par curseur (keyset) : coût O(limit) quelle que soit la profondeur
+  // sort = colonne indexée ('nom') ou '-nom' pour l'ordre décroissant ; after = nextCursor précédent
+  findPage({{ after = null, sort = '{key_col}', limit = 50 }} = {{}}) {{
+    const desc = sort.startsWith('-');
+    const col = desc ? sort.slice(1) : sort;
+    if (!SORTABLE_COLUMNS.includes(col)) {{
+      return Promise.reject(new Error(`Tri non indexé: ${{col}} (autorisés: ${{SORTABLE_COLUMNS.join(', ')}})`));
+    }}
+    limit = Math.min(Math.max(parseInt(limit) || 50, 1), 500);
+
+    const dir = desc ? 'DESC' : 'ASC';
+    const orderBy = col === '{key_col}' ? `{key_col} ${{dir}}` : `${{col}} ${{dir}}, {key_col} ${{dir}}`;
+    // Segments lus dans l'ordre du tri, chacun par une recherche d'index (SEARCH) : pas de OR,
+    // qui ferait parcourir l'index depuis le début ; le segment suivant n'est lu que si la page n'est pas pleine
+    const segments = [];
+    if (!after) {{
+      segments.push(['', []]);
+    }} else {{
+      let value, key;
+      try {{
+        [value, key] = JSON.parse(Buffer.from(after, 'base64url').toString('utf8'));
+      }} catch (e) {{
+        return Promise.reject(new Error('Curseur invalide'));
+      }}
+      const op = desc ? '<' : '>';
+      if (col === '{key_col}') {{
+        segments.push([`WHERE {key_col} ${{op}} ?`, [key]]);
+      }} else if (value === null) {{
+        // NULL trié en premier (ASC) / en dernier (DESC) ; jamais pour une colonne NOT NULL
+        segments.push([`WHERE ${{col}} IS NULL AND {key_col} ${{op}} ?`, [key]]);
+        if (!desc) segments.push([`WHERE ${{col}} IS NOT NULL`, []]);
+      }} else {{
+        segments.push([`WHERE (${{col}}, {key_col}) ${{op}} (?, ?)`, [value, key]]);
+        if (desc && NULLABLE_SORT_COLUMNS.includes(col)) segments.push([`WHERE ${{col}} IS NULL`, []]);
+      }}
+    }}
+
+    const read = (i, items) => i === segments.length || items.length > limit
+      ? Promise.resolve(items)
+      : this.queryAll(
+          `SELECT {'' if key_col != 'rowid' else 'rowid AS _rowid_, '}* FROM ${{this.tableName}} ${{segments[i][0]}} ORDER BY ${{orderBy}} LIMIT ?`,
+          [...segments[i][1], limit + 1 - items.length]
+        ).then(rows => read(i + 1, items.concat(rows)));
+    return read(0, []).then(items => {{
+      const hasMore = items.length > limit;
+      if (hasMore) items.pop();
+      const last = items[items.length - 1];
+      const nextCursor = hasMore
+        ? Buffer.from(JSON.stringify([last[col] ?? null, last.{'_rowid_' if key_col == 'rowid' else key_col}])).toString('base64url')
+        : null;
+      return {{ items, nextCursor }};
     }});
+  }}"""
+
+
+FK_ACTIONS = ('CASCADE', 'SET NULL', 'SET DEFAULT')
+
+
+def written_tables(cursor, table_name):
+    """Tables modifiées par une écriture sur table_name : elle-même + cibles des triggers
+    (table_stats, LogicielStats, FTS, R*Tree...) + tables filles en ON DELETE/UPDATE CASCADE, transitivement"""
+    cursor.execute("SELECT tbl_name, sql FROM sqlite_master WHERE type='trigger'")
+    triggers = cursor.fetchall()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND sql NOT LIKE 'CREATE VIRTUAL%'")
+    cascades = {}
+    for (child,) in cursor.fetchall():
+        cursor.execute(f"PRAGMA foreign_key_list({child})")
+        for fk in cursor.fetchall():
+            if fk[5] in FK_ACTIONS or fk[6] in FK_ACTIONS:
+                cascades.setdefault(fk[2], []).append(child)
+    written, todo = [], [table_name]
+    while todo:
+        table = todo.pop(0)
+        if table in written:
+            continue
+        written.append(table)
+        for owner, sql in triggers:
+            if owner == table:
+                todo += re.findall(r'\b(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|(?<!DO )UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)'
+                                   r'\s+"?(\w+)', sql.split('BEGIN', 1)[-1], re.I)
+        todo += cascades.get(table, [])
+    return written
+
+
+def unique_keys(cursor, table_name, key_col):
+    """Cibles ON CONFLICT : contraintes UNIQUE / PK composite (ordre du schéma), puis la PK entière"""
+    cursor.execute(f"PRAGMA index_list({table_name})")
+    keys = []
+    # index_list liste les index du plus récent au plus ancien → seq décroissant = ordre de déclaration
+    for _, name, unique, _, partial in sorted(cursor.fetchall(), key=lambda i: -i[0]):
+        if unique and not partial:
+            cursor.execute(f"PRAGMA index_info({name})")
+            keys.append([info[2] for info in sorted(cursor.fetchall())])
+    if key_col != 'rowid':
+        keys.append([key_col])
+    # PK TEXT : son autoindex UNIQUE est déjà listé → une seule fois, à sa première place
+    unique = []
+    for key in keys:
+        if None not in key and key not in unique:
+            unique.append(key)
+    return unique
+
+
+def batch_methods(key_col):
+    """createMany()/upsertMany()/updateMany()/deleteMany() : 1 transaction, statements réutilisés,
+    INSERT multi-lignes découpés sous la limite de paramètres SQLite (connection.MAX_VARIABLES)"""
+    return f"""  // 📦 Insertion en lot : 1 transaction (1 seul fsync), INSERT multi-lignes par paquets
+  createMany(rows) {{
+    return this.writeMany(rows, () => '').then(count => ({{ success: true, count }}));
   }}
 
-  // 🔍 Par ID
-  findById(id) {{
-    return new Promise((resolve, reject) => {{
-      this.db.get(`SELECT * FROM ${{this.tableName}} WHERE {pk_col} = ?`, [id], (err, row) => {{
-        if (err) reject(err);
-        else resolve(row);
-      }});
+  // 📦 Insertion ou mise à jour en lot sur une contrainte UNIQUE (par défaut {{UNIQUE_KEYS[0]}})
+  upsertMany(rows, conflictCols = UNIQUE_KEYS[0]) {{
+    const target = (conflictCols || []).join(', ');
+    if (!UNIQUE_KEYS.some(key => key.join(', ') === target)) {{
+      return Promise.reject(new Error(`Pas de contrainte UNIQUE sur (${{target}}) (disponibles: ${{UNIQUE_KEYS.map(k => `(${{k.join(', ')}})`).join(', ') || 'aucune'}})`));
+    }}
+    return this.writeMany(rows, columns => {{
+      const missing = conflictCols.filter(col => !columns.includes(col));
+      if (missing.length) throw new Error(`Colonne(s) de conflit absente(s) des lignes: ${{missing.join(', ')}}`);
+      const updates = columns.filter(col => !conflictCols.includes(col) && col !== '{key_col}');
+      return ` ON CONFLICT(${{target}}) DO ` +
+        (updates.length ? `UPDATE SET ${{updates.map(col => `${{col}} = excluded.${{col}}`).join(', ')}}` : 'NOTHING');
+    }}).then(count => ({{ success: true, count }}));
+  }}
+
+  // ✏️ Mise à jour en lot : rows = [{{ {key_col}, ...colonnes }}], 1 UPDATE préparé par jeu de colonnes
+  updateMany(rows) {{
+    if (!rows.length) return Promise.resolve({{ success: true, changes: 0 }});
+    return this.transaction(async handle => {{
+      let changes = 0;
+      for (const {{ columns, rows: group }} of this.groupByColumns(rows, ['{key_col}'])) {{
+        const sets = columns.filter(col => col !== '{key_col}');
+        if (!sets.length) continue;
+        const sql = `UPDATE ${{this.tableName}} SET ${{sets.map(col => `${{col}} = ?`).join(', ')}} WHERE {key_col} = ?`;
+        for (const row of group) {{
+          changes += (await this.run(handle, sql, [...sets.map(col => row[col]), row.{key_col}])).changes;
+        }}
+      }}
+      return {{ success: true, changes }};
     }});
   }}
 
-  // 🔎 Recherche
-  search(query, limit = 20) {{
-    return new Promise((resolve, reject) => {{
-      this.db.all(`SELECT * FROM ${{this.tableName}} WHERE nom LIKE ? OR description LIKE ? LIMIT ?`, 
-        [`%${{query}}%`, `%${{query}}%`, limit], (err, rows) => {{
-        if (err) reject(err);
-        else resolve(rows || []);
-      }});
+  // 🗑️ Suppression en lot : ids passés en 1 paramètre JSON par paquet (texte SQL constant)
+  deleteMany(ids) {{
+    if (!ids.length) return Promise.resolve({{ success: true, changes: 0 }});
+    return this.transaction(async handle => {{
+      let changes = 0;
+      for (let i = 0; i < ids.length; i += connection.MAX_VARIABLES) {{
+        changes += (await this.run(handle,
+          `DELETE FROM ${{this.tableName}} WHERE {key_col} IN (SELECT value FROM json_each(?))`,
+          [JSON.stringify(ids.slice(i, i + connection.MAX_VARIABLES))])).changes;
+      }}
+      return {{ success: true, changes }};
     }});
   }}
 
-  // ➕ Créer
-  create(data) {{
-    return new Promise((resolve, reject) => {{
-      const columns = Object.keys(data);
-      const placeholders = columns.map(() => '?').join(', ');
-      const values = columns.map(col => data[col]);
-      
-      this.db.run(
-        `INSERT INTO ${{this.tableName}} (${{columns.join(', ')}}) VALUES (${{placeholders}})`,
-        values,
-        function(err) {{
-          if (err) reject(err);
-          else resolve({{ success: true, id: this.lastID }});
+  // INSERT multi-lignes par jeu de colonnes ; conflict(columns) → clause ON CONFLICT éventuelle
+  writeMany(rows, conflict) {{
+    if (!rows.length) return Promise.resolve(0);
+    return this.transaction(async handle => {{
+      let count = 0;
+      for (const {{ columns, rows: group }} of this.groupByColumns(rows)) {{
+        const suffix = conflict(columns);
+        const tuple = `(${{columns.map(() => '?').join(', ')}})`;
+        const perChunk = Math.max(1, Math.floor(connection.MAX_VARIABLES / columns.length));
+        for (let i = 0; i < group.length; i += perChunk) {{
+          const chunk = group.slice(i, i + perChunk);
+          const sql = `INSERT INTO ${{this.tableName}} (${{columns.join(', ')}}) ` +
+            `VALUES ${{Array(chunk.length).fill(tuple).join(', ')}}${{suffix}}`;
+          count += (await this.run(handle, sql, chunk.flatMap(row => columns.map(col => row[col])))).changes;
         }}
-      );
+      }}
+      return count;
     }});
   }}
 
-  // ✏️ Update
-  update(id, data) {{
-    return new Promise((resolve, reject) => {{
-      const setClause = Object.keys(data).map(k => `${{k}} = ?`).join(', ');
-      const values = Object.values(data).concat(id);
-      
-      this.db.run(
-        `UPDATE ${{this.tableName}} SET ${{setClause}} WHERE rowid = ?`,
-        values,
-        function(err) {{
-          if (err) reject(err);
-          else resolve({{ success: true, changes: this.changes }});
+  // Regroupe les lignes par jeu de colonnes (les DEFAULT des colonnes absentes restent appliqués)
+  groupByColumns(rows, required = []) {{
+    const groups = new Map();
+    for (const row of rows) {{
+      const columns = Object.keys(row).sort();
+      const unknown = columns.filter(col => !COLUMNS.includes(col) && !required.includes(col));
+      if (unknown.length) throw new Error(`Colonne(s) inconnue(s) dans ${{this.tableName}}: ${{unknown.join(', ')}}`);
+      const missing = required.filter(col => !columns.includes(col));
+      if (missing.length) throw new Error(`Colonne(s) requise(s) absente(s): ${{missing.join(', ')}}`);
+      const signature = columns.join(',');
+      if (!groups.has(signature)) groups.set(signature, {{ columns, rows: [] }});
+      groups.get(signature).rows.push(row);
+    }}
+    return groups.values();
+  }}"""
+
+
+def buffered_methods(table_name, columns):
+    """createBuffered()/flush() : lignes regroupées en mémoire puis écrites par createMany() (1 transaction)"""
+    if table_name not in BUFFERED_WRITES:
+        return '', ''
+    timestamp, flush_ms, flush_rows = BUFFERED_WRITES[table_name]
+    # NOT NULL sans DEFAULT (hors PK) : une ligne sans ces colonnes ferait échouer tout le lot
+    required = [col[1] for col in columns if col[3] and col[4] is None and not col[5] and col[1] != timestamp]
+    const = f"""
+// Tampon d'écriture partagé par toutes les instances (par fichier DB) : flush toutes les {flush_ms} ms ou {flush_rows} lignes
+const FLUSH_MS = {flush_ms};
+const FLUSH_ROWS = {flush_rows};
+const BUFFER_MAX_ROWS = {BUFFER_MAX_ROWS};
+const REQUIRED_COLUMNS = {required!r};
+const buffers = new Map(); // dbPath → {{ rows, timer, flushing }}
+// Verrou (réessayer plus tard) vs erreur propre aux lignes (contrainte : réessayer ne sert à rien)
+const isBusy = err => /SQLITE_(BUSY|LOCKED)|database is locked/.test(`${{err.code}} ${{err.message}}`);
+"""
+    methods = f"""
+
+  // 🧺 Écriture différée : la ligne est horodatée maintenant ({timestamp}, UTC comme CURRENT_TIMESTAMP)
+  // puis écrite avec les autres en 1 transaction → 1 fsync par lot au lieu d'1 par consultation
+  createBuffered(data) {{
+    const unknown = Object.keys(data).filter(col => !COLUMNS.includes(col));
+    if (unknown.length) return Promise.reject(new Error(`Colonne(s) inconnue(s) dans ${{this.tableName}}: ${{unknown.join(', ')}}`));
+    const missing = REQUIRED_COLUMNS.filter(col => data[col] === undefined || data[col] === null);
+    if (missing.length) return Promise.reject(new Error(`Colonne(s) obligatoire(s) absente(s) dans ${{this.tableName}}: ${{missing.join(', ')}}`));
+    const buffer = this.buffer();
+    buffer.rows.push({{ {timestamp}: new Date().toISOString().slice(0, 19).replace('T', ' '), ...data }});
+    if (buffer.rows.length >= FLUSH_ROWS) this.flush();
+    else if (!buffer.timer) {{
+      buffer.timer = setTimeout(() => this.flush(), FLUSH_MS);
+      buffer.timer.unref();  // ne retient pas la sortie du process
+    }}
+    return Promise.resolve({{ success: true, buffered: buffer.rows.length }});
+  }}
+
+  // 💾 Écrit le tampon (aussi appelé par close()) ; base verrouillée → lignes remises en tête et réessayées,
+  // lot refusé pour une contrainte → réécrit ligne par ligne, seules les lignes fautives sont écartées
+  flush() {{
+    const buffer = this.buffer();
+    clearTimeout(buffer.timer);
+    buffer.timer = null;
+    if (buffer.flushing) return buffer.flushing.then(() => buffer.rows.length ? this.flush() : {{ success: true, count: 0 }});
+    const rows = buffer.rows.splice(0);
+    if (!rows.length) return Promise.resolve({{ success: true, count: 0 }});
+    buffer.flushing = this.createMany(rows)
+      .catch(err => isBusy(err) ? Promise.reject(err) : this.insertEach(rows))
+      .catch(err => {{
+        console.error(`❌ Flush ${{this.tableName}} (${{rows.length}} lignes):`, err.message);
+        buffer.rows.unshift(...rows);
+        buffer.rows.splice(0, Math.max(0, buffer.rows.length - BUFFER_MAX_ROWS));
+        if (!buffer.timer) {{
+          buffer.timer = setTimeout(() => this.flush(), FLUSH_MS);
+          buffer.timer.unref();
         }}
-      );
-    }});
+        return {{ success: false, count: 0 }};
+      }})
+      .finally(() => {{ buffer.flushing = null; }});
+    return buffer.flushing;
   }}
 
-  // 🗑️ Delete
-  delete(id) {{
-    return new Promise((resolve, reject) => {{
-      this.db.run(`DELETE FROM ${{this.tableName}} WHERE rowid = ?`, [id], function(err) {{
-        if (err) reject(err);
-        else resolve({{ success: true, changes: this.changes }});
-      }});
+  // Lignes insérées une à une dans 1 transaction : une INSERT refusée n'annule qu'elle-même
+  insertEach(rows) {{
+    return this.transaction(async handle => {{
+      let count = 0;
+      for (const row of rows) {{
+        const columns = Object.keys(row);
+        try {{
+          await this.run(handle, `INSERT INTO ${{this.tableName}} (${{columns.join(', ')}}) VALUES (${{columns.map(() => '?').join(', ')}})`,
+            columns.map(col => row[col]));
+          count++;
+        }} catch (err) {{
+          if (isBusy(err)) throw err;
+          console.error(`🗑️ ${{this.tableName}}: ligne écartée (${{err.message}}):`, JSON.stringify(row));
+        }}
+      }}
+      return {{ success: true, count, dropped: rows.length - count }};
     }});
   }}
 
-  close() {{
-    if (this.db) {{
-      this.db.close();
+  buffer() {{
+    if (!buffers.has(this.dbPath)) buffers.set(this.dbPath, {{ rows: [], timer: null, flushing: null }});
+    return buffers.get(this.dbPath);
+  }}"""
+    return const, methods
+
+
+def close_method(buffered):
+    """close() : finalise les statements (après écriture du tampon pour les tables bufferisées)"""
+    if not buffered:
+        return """  // Finalise les statements du model (les connexions partagées restent ouvertes → connection.closeAll())
+  close() {
+    for (const stmt of this.statements.values()) stmt.finalize();
+    this.statements.clear();
+    this.db = null;
+  }"""
+    return """  // Écrit le tampon puis finalise les statements (les connexions partagées restent ouvertes → connection.closeAll())
+  close() {
+    return this.flush().then(() => {
+      for (const stmt of this.statements.values()) stmt.finalize();
+      this.statements.clear();
       this.db = null;
-    }}
-  }}
-}};
+    });
+  }"""
 
-module.exports = {class_name}Model;
+
+def plural(table_name):
+    """Nom de relation 1-N / N-N : 'Tag' → 'tags', 'Avis' → 'avis'"""
+    name = table_name.lower()
+    return name if name.endswith(('s', 'x', 'z')) else f"{name}s"
+
+
+def build_relations(cursor, tables):
+    """{table: {relation: spec}} depuis PRAGMA foreign_key_list
+    belongsTo (FK locale), hasMany (FK d'une autre table), manyToMany (table de liaison à PK = 2 FK)"""
+    pks, fks = {}, {}
+    for table in tables:
+        cursor.execute(f"PRAGMA table_info({table})")
+        cols = cursor.fetchall()
+        pks[table] = [c[1] for c in sorted(cols, key=lambda c: c[5]) if c[5]] or ['rowid']
+    for table in tables:
+        cursor.execute(f"PRAGMA foreign_key_list({table})")
+        fks[table] = [(row[3], row[2], row[4] or pks.get(row[2], ['rowid'])[0])
+                      for row in cursor.fetchall() if row[2] in pks]
+
+    relations = {table: {} for table in tables}
+    junctions = {t for t in tables if len(pks[t]) == 2 and set(pks[t]) <= {fk[0] for fk in fks[t]}}
+
+    def add(table, name, spec):
+        columns = {c for c in pks[table]}
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns |= {c[1] for c in cursor.fetchall()}
+        if name in columns or name in relations[table]:
+            print(f"   ⚠️  Relation {table}.{name} ignorée (nom déjà pris)")
+            return
+        relations[table][name] = spec
+
+    for table in tables:
+        parents = [parent for _, parent, _ in fks[table]]
+        for column, parent, key in fks[table]:
+            if table in junctions:
+                # N-N : chaque côté de la liaison voit l'autre
+                other = next((fk for fk in fks[table] if fk[0] != column), None)
+                if other:
+                    add(parent, plural(other[1]), {'type': 'manyToMany', 'table': other[1], 'key': other[2],
+                                                   'through': table, 'throughLocal': column,
+                                                   'throughForeign': other[0], 'local': key})
+                continue
+            name = parent.lower() if parents.count(parent) == 1 else re.sub(r'_id$', '', column)
+            add(table, name, {'type': 'belongsTo', 'table': parent, 'key': key, 'local': column})
+            name = plural(table) if parents.count(parent) == 1 else f"{plural(table)}_{re.sub(r'_id$', '', column)}"
+            add(parent, name, {'type': 'hasMany', 'table': table, 'foreign': column, 'local': key})
+    return relations
+
+
+def relations_const(relations):
+    if not relations:
+        return ''
+    entries = [f"  {name}: {{ {', '.join(f'{k}: {v!r}' for k, v in spec.items())} }}," for name, spec in relations.items()]
+    body = '\n'.join(entries)
+    return f"""
+// Relations chargeables en lot par loadRelations() (déduites des clés étrangères)
+const RELATIONS = {{
+{body}
+}};
 """
-        
-        file_path = models_dir / f"{table_name}.js"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(model_code)
-        print(f"   ✅ {file_path.name} créé ({len(model_code)} chars)")
-    
-    conn.close()
-    print("\n🎉 TOUS les models générés SANS ERREURS TS !")
-    print("📁 Utilisez @users, @softsCtrl dans les CONTROLLERS")
-    print(f"📂 Dossier: {models_dir.absolute()}")
 
-if __name__ == "__main__":
-    print("🚀 Lancement générateur de models (JS PURE)...")
-    db_path = sys.argv[1] if len(sys.argv) > 1 else 'C:/Users/maxim/Desktop/NDI/SITE/serveur/database.db'
-    print(f"📂 DB: {db_path}")
-    generate_models_from_db(db_path)
+
+def relation_methods(relations):
+    """findAllWithRelations()/findByIdWithRelations() : 1 requête groupée (IN json_each) par relation"""
+    if not relations:
+        return ''
+    return f"""
+
+  // 🔗 Relations (PRAGMA foreign_key_list) : {', '.join(relations)}
+  // 1 requête pour la page + 1 requête groupée par relation incluse, quel que soit le nombre de lignes
+  findAllWithRelations({{ include = [], limit = 50, offset = 0 }} = {{}}) {{
+    return this.findAll(limit, offset).then(rows => this.loadRelations(rows, include));
+  }}
+
+  findByIdWithRelations(id, include = []) {{
+    return this.findById(id).then(row => row ? this.loadRelations([row], include).then(rows => rows[0]) : row);
+  }}
+
+  // Attache les relations demandées à des lignes déjà chargées (clés passées en 1 seul paramètre JSON)
+  loadRelations(rows, include = []) {{
+    const unknown = include.filter(name => !RELATIONS[name]);
+    if (unknown.length) {{
+      return Promise.reject(new Error(`Relation inconnue: ${{unknown.join(', ')}} (disponibles: ${{Object.keys(RELATIONS).join(', ')}})`));
+    }}
+    if (!rows.length || !include.length) return Promise.resolve(rows);
+
+    return Promise.all(include.map(name => {{
+      const rel = RELATIONS[name];
+      const keys = JSON.stringify([...new Set(rows.map(row => row[rel.local]).filter(k => k !== null && k !== undefined))]);
+      let sql, groupBy;
+      if (rel.type === 'belongsTo') {{
+        sql = `SELECT * FROM ${{rel.table}} WHERE ${{rel.key}} IN (SELECT value FROM json_each(?))`;
+        groupBy = rel.key;
+      }} else if (rel.type === 'hasMany') {{
+        sql = `SELECT * FROM ${{rel.table}} WHERE ${{rel.foreign}} IN (SELECT value FROM json_each(?))`;
+        groupBy = rel.foreign;
+      }} else {{
+        sql = `SELECT j.${{rel.throughLocal}} AS _owner_, t.* FROM ${{rel.through}} j
+               JOIN ${{rel.table}} t ON t.${{rel.key}} = j.${{rel.throughForeign}}
+               WHERE j.${{rel.throughLocal}} IN (SELECT value FROM json_each(?))`;
+        groupBy = '_owner_';
+      }}
+      return this.queryAll(sql, [keys]).then(related => {{
+        const byKey = new Map();
+        for (const item of related) {{
+          const key = item[groupBy];
+          if (groupBy === '_owner_') delete item._owner_;
+          if (!byKey.has(key)) byKey.set(key, []);
+          byKey.get(key).push(item);
+        }}
+        for (const row of rows) {{
+          const found = byKey.get(row[rel.local]) || [];
+          row[name] = rel.type === 'belongsTo' ? (found[0] || null) : found;
+        }}
+      }});
+    }})).then(() => rows);
+  }}"""
+
+
+# 🐍 Accès typé pour les scripts Python (generation/db_models.py) : 1 dataclass à __slots__ + 1 repository par table
+PYTHON_MODULE_PATH = Path(__file__).parent / 'db_models.py'
+
+PYTHON_RUNTIME = '''"""Accès typé aux tables NIRD pour les scripts Python (auto-généré par generation/generate_models.py)
+
+    with Database() as db:
+        for vue in db.historique.stream("viewed_at >= ?", (debut,)):   # fetchmany : mémoire constante
+            ...
+        db.favori.insert_many(Favori(user_id=u, software_id=s) for u, s in couples)
+        nb_logiciels, nb_avis = db.parallel(db.logiciel.count, db.avis.count)   # lecteurs read-only en parallèle
+"""
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from itertools import islice
 from pathlib import Path
-import sys
+from typing import Any, Callable, ClassVar, Generic, Iterable, Iterator, Optional, TypeVar
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "serveur" / "database.db"
+READERS = 4              # connexions read-only du pool de parallel()/submit()
+FETCH_ROWS = 1000        # lignes par fetchmany dans stream()
+BATCH_ROWS = 5000        # lignes par transaction dans insert_many()/upsert_many()
+BUSY_TIMEOUT_S = 30
+
+Row = TypeVar("Row")
+
+
+class Database:
+    """1 connexion writer (écritures sérialisées) + 1 connexion read-only par thread lecteur"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, readers=READERS):
+        self.path = Path(path)
+        self.readers = readers
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._pool = None
+{repositories}
+
+    def reader(self):
+        """Connexion read-only du thread courant (sqlite3 : une connexion n'est utilisée que par son thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{{self.path}}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S,
+                                   check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._handles.append(conn)
+        return conn
+
+    def writer(self):
+        if self._writer is None:
+            self._writer = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_S, check_same_thread=False)
+        return self._writer
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs):
+        """Exécute fn dans le pool de lecteurs → Future (les lectures de fn y utilisent la connexion du thread)"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="nird-reader")
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def parallel(self, *calls: Callable[[], Any]) -> list:
+        """Requêtes indépendantes en parallèle (sqlite3 relâche le GIL pendant l'exécution) → résultats dans l'ordre"""
+        return [future.result() for future in [self.submit(call) for call in calls]]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            for conn in self._handles:
+                conn.close()
+            self._handles.clear()
+        self._local = threading.local()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Repository(Generic[Row]):
+    """Lectures en flux et écritures en lot d'une table ; colonnes = champs de la dataclass row"""
+    table: ClassVar[str]
+    row: ClassVar[type]
+    key: ClassVar[Optional[str]]
+    unique_keys: ClassVar[list]
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.columns = [f.name for f in fields(self.row)]
+        self.select = f"SELECT {{', '.join(self.columns)}} FROM {{self.table}}"
+
+    def _cursor(self):
+        cursor = self.db.reader().cursor()
+        row = self.row
+        cursor.row_factory = lambda _, values: row(*values)
+        return cursor
+
+    def stream(self, where: str = "", params: Iterable = (), order_by: Optional[str] = None,
+               size: int = FETCH_ROWS) -> Iterator[Row]:
+        """Lignes une à une, lues par paquets de size (fetchmany) : jamais toute la table en mémoire"""
+        sql = self.select + (f" WHERE {{where}}" if where else "") + (f" ORDER BY {{order_by}}" if order_by else "")
+        cursor = self._cursor().execute(sql, tuple(params))
+        try:
+            while True:
+                batch = cursor.fetchmany(size)
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            cursor.close()
+
+    def find(self, where: str = "", params: Iterable = (), order_by: Optional[str] = None,
+             limit: int = 100) -> list:
+        sql = self.select + (f" WHERE {{where}}" if where else "") + (f" ORDER BY {{order_by}}" if order_by else "")
+        return self._cursor().execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+
+    def get(self, key) -> Optional[Row]:
+        if self.key is None:
+            raise ValueError(f"{{self.table}} n'a ni rowid ni clé primaire simple : utiliser find()")
+        return self._cursor().execute(f"{{self.select}} WHERE {{self.key}} = ?", (key,)).fetchone()
+
+    def count(self, where: str = "", params: Iterable = ()) -> int:
+        sql = f"SELECT COUNT(*) FROM {{self.table}}" + (f" WHERE {{where}}" if where else "")
+        return self.db.reader().execute(sql, tuple(params)).fetchone()[0]
+
+    def insert_many(self, rows: Iterable, batch: int = BATCH_ROWS) -> int:
+        """Insertion en lot (dataclasses ou dicts, itérable consommé par paquets) ; None = DEFAULT de la colonne"""
+        return self._write_many(rows, batch, "")
+
+    def upsert_many(self, rows: Iterable, conflict: Optional[list] = None, batch: int = BATCH_ROWS) -> int:
+        """Insertion ou mise à jour en lot sur une contrainte UNIQUE (par défaut unique_keys[0])"""
+        conflict = list(conflict or (self.unique_keys[0] if self.unique_keys else []))
+        if conflict not in self.unique_keys:
+            raise ValueError(f"Pas de contrainte UNIQUE sur ({{', '.join(conflict)}}) dans {{self.table}} "
+                             f"(disponibles: {{', '.join(map(str, self.unique_keys)) or 'aucune'}})")
+        return self._write_many(rows, batch, conflict)
+
+    def _write_many(self, rows, batch, conflict):
+        rows = iter(rows)
+        total = 0
+        while True:
+            chunk = list(islice(rows, batch))
+            if not chunk:
+                return total
+            with self.db._write_lock:
+                conn = self.db.writer()
+                with conn:
+                    for columns, values in self._group(chunk).items():
+                        total += conn.executemany(self._insert_sql(columns, conflict), values).rowcount
+
+    def _group(self, chunk):
+        """{{colonnes renseignées: [valeurs]}} : les colonnes à None/absentes gardent leur DEFAULT"""
+        groups = {{}}
+        for item in chunk:
+            pairs = item.items() if isinstance(item, dict) else ((c, getattr(item, c)) for c in self.columns)
+            pairs = [(c, v) for c, v in pairs if v is not None]
+            unknown = [c for c, _ in pairs if c not in self.columns]
+            if unknown:
+                raise ValueError(f"Colonne(s) inconnue(s) dans {{self.table}}: {{', '.join(unknown)}}")
+            groups.setdefault(tuple(c for c, _ in pairs), []).append(tuple(v for _, v in pairs))
+        return groups
+
+    def _insert_sql(self, columns, conflict):
+        sql = (f"INSERT INTO {{self.table}} ({{', '.join(columns)}}) VALUES ({{', '.join('?' * len(columns))}})"
+               if columns else f"INSERT INTO {{self.table}} DEFAULT VALUES")
+        if not conflict:
+            return sql
+        missing = [c for c in conflict if c not in columns]
+        if missing:
+            raise ValueError(f"Colonne(s) de conflit absente(s) des lignes: {{', '.join(missing)}}")
+        updates = [c for c in columns if c not in conflict and c != self.key]
+        return (sql + f" ON CONFLICT({{', '.join(conflict)}}) DO "
+                + (f"UPDATE SET {{', '.join(f'{{c}} = excluded.{{c}}' for c in updates)}}" if updates else "NOTHING"))
+'''
+
+
+def python_type(declared):
+    """Type Python de l'affinité SQLite du type déclaré (DATETIME, NUMERIC... → Any : epoch ou texte)"""
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return 'int'
+    if any(t in declared for t in ('CHAR', 'CLOB', 'TEXT')):
+        return 'str'
+    if 'BLOB' in declared:
+        return 'bytes'
+    if any(t in declared for t in ('REAL', 'FLOA', 'DOUB')):
+        return 'float'
+    return 'Any'
+
+
+def snake_case(name):
+    """'LogicielCategorie' → 'logiciel_categorie' (attribut de Database)"""
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name).lower()
+
+
+def python_table(cursor, table_name):
+    """Dataclass à __slots__ (colonnes obligatoires d'abord, les autres à None = DEFAULT) + repository"""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = cursor.fetchall()
+    pk_col = next((col[1] for col in columns if col[5]), 'rowid')
+    key_col = keyset_column(columns, pk_col)
+    single_pk = sum(1 for col in columns if col[5]) == 1
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    if not single_pk and 'WITHOUT ROWID' in cursor.fetchone()[0].upper():
+        key_col = None  # ni rowid ni PK simple : get() indisponible
+    required, optional = [], []
+    for _, name, declared, notnull, default, pk in columns:
+        kind = python_type(declared)
+        # PK entière seule = alias rowid, attribuée par SQLite si absente
+        if notnull and default is None and not (pk and single_pk and kind == 'int'):
+            required.append(f"    {name}: {kind}")
+        else:
+            optional.append(f"    {name}: Optional[{kind}] = None")
+    class_name = table_name[0].upper() + table_name[1:]
+    return f'''
+
+@dataclass(slots=True)
+class {class_name}:
+{chr(10).join(required + optional)}
+
+
+class {class_name}Repository(Repository[{class_name}]):
+    table = {table_name!r}
+    row = {class_name}
+    key = {key_col!r}
+    unique_keys = {unique_keys(cursor, table_name, key_col)!r}
+'''
+
+
+def generate_python_module(cursor, tables, path=PYTHON_MODULE_PATH):
+    """db_models.py : toutes les tables hors tables virtuelles (internes comprises, utiles aux scripts)"""
+    classes = {table[0].upper() + table[1:]: table for table in tables}
+    repositories = '\n'.join(f"        self.{snake_case(table)} = {name}Repository(self)"
+                             for name, table in classes.items())
+    code = PYTHON_RUNTIME.format(repositories=repositories) + ''.join(python_table(cursor, t) for t in tables)
+    path.write_text(code, encoding='utf-8')
+    print(f"\n🐍 {path.name} créé ({len(tables)} dataclass + repositories)")
+
 
 def generate_models_from_db(db_path='./serveur/database.db'):
     """Lit la DB et génère les models Node.js PURE JS (sans @ pour éviter erreurs TS)"""
@@ -198,7 +1349,12 @@ def generate_models_from_db(db_path='./serveur/database.db'):
         SELECT name FROM sqlite_master 
         WHERE type='table' AND name NOT LIKE 'sqlite_%'
     """)
-    tables = [row[0] for row in cursor.fetchall()]
+    names = [row[0] for row in cursor.fetchall()]
+    fts_tables = detect_fts(cursor)
+    geo_tables = detect_geo(cursor)
+    virtual_tables = list_virtual_tables(cursor)
+    tables = [name for name in names
+              if name not in INTERNAL_TABLES and not is_virtual_or_shadow(name, virtual_tables)]
     print(f"   📊 {len(tables)} table(s) trouvée(s): {tables}")
     
     if not tables:
@@ -208,6 +1364,8 @@ def generate_models_from_db(db_path='./serveur/database.db'):
     
     models_dir = Path('./src/models')
     models_dir.mkdir(parents=True, exist_ok=True)
+
+    all_relations = build_relations(cursor, tables)
     
     for table_name in tables:
         print(f"\n📝 Génération model '{table_name}'...")
@@ -220,116 +1378,201 @@ def generate_models_from_db(db_path='./serveur/database.db'):
         # PK column
         pk_col = next((col[1] for col in columns if col[5]), 'rowid')
         print(f"   🗝️  PK: '{pk_col}'")
+
+        key_col = keyset_column(columns, pk_col)
+        sortable, nullable = indexed_columns(cursor, table_name, key_col)
+        print(f"   📄 Keyset: tri sur {sortable} (départage '{key_col}')")
+        keys = unique_keys(cursor, table_name, key_col)
+        written = written_tables(cursor, table_name)
+        print(f"   📦 Upsert: conflit sur {keys or 'aucune contrainte UNIQUE'}")
         
         # Nom classe capitalisé
         class_name = table_name[0].upper() + table_name[1:]
         print(f"   🏷️  Classe: '{class_name}Model'")
+
+        fts = fts_tables.get(table_name)
+        if fts:
+            print(f"   🔎 FTS5: '{fts[0]}' ({', '.join(fts[1])})")
+        geo = geo_tables.get(table_name)
+        if geo:
+            print(f"   🗺️  R*Tree: '{geo}'")
+        helpers = (FTS_QUERY_HELPER if fts else '') + (GEO_HELPER if geo else '')
+        buffer_const, buffer_methods = buffered_methods(table_name, columns)
+        if buffer_const:
+            print(f"   🧺 Écritures bufferisées: createBuffered() (flush {BUFFERED_WRITES[table_name][1]} ms)")
+        relations = all_relations[table_name]
+        if relations:
+            described = [f"{name} ({rel['type']})" for name, rel in relations.items()]
+            print(f"   🔗 Relations: {', '.join(described)}")
         
         # ✅ JS PURE - AUCUN @ (évite erreurs TS)
         model_code = f"""// Model {table_name.title()} (auto-généré depuis DB)
 // ✅ Compatible TypeScript/VSCode - Utilisez @aliases dans CONTROLLERS seulement
 
-const sqlite3 = require('sqlite3').verbose();
+const connection = require('./connection');
 
+// Colonnes en tête d'un index (col, clé) → seules autorisées pour findPage() ; nullables : segment NULL en plus
+const SORTABLE_COLUMNS = {sortable!r};
+const NULLABLE_SORT_COLUMNS = {nullable!r};
+// Colonnes acceptées par les écritures en lot, cibles ON CONFLICT de upsertMany() (contraintes UNIQUE)
+const COLUMNS = {[col[1] for col in columns]!r};
+const UNIQUE_KEYS = {keys!r};
+// Tables modifiées par une écriture du model (triggers et FK en cascade compris) → invalidation du cache
+const WRITTEN_TABLES = {written!r};
+{relations_const(relations)}{helpers}{buffer_const}
 class {class_name}Model {{
-  constructor(dbPath = 'C:/Users/maxim/Desktop/NDI/SITE/serveur/database.db') {{
+  constructor(dbPath = connection.DEFAULT_DB_PATH) {{
     this.tableName = '{table_name}';
-    this.db = new sqlite3.Database(dbPath);
+    // ♻️ Connexions partagées (1 writer + pool read-only), pas de handle par model
+    this.dbPath = dbPath;
+    this.db = connection.writer(dbPath);
+    this.statements = new Map();
     console.log(`🗄️ ${{this.tableName}} DB connectée`);
   }}
 
-  // 🔢 Compter
-  count() {{
-    return new Promise((resolve, reject) => {{
-      this.db.get(`SELECT COUNT(*) as count FROM ${{this.tableName}}`, (err, row) => {{
-        if (err) reject(err);
-        else resolve(row?.count || 0);
-      }});
-    }});
-  }}
+{count_method(table_name, cursor)}
 
   // 📋 Liste paginée
   findAll(limit = 50, offset = 0) {{
-    return new Promise((resolve, reject) => {{
-      this.db.all(`SELECT * FROM ${{this.tableName}} LIMIT ? OFFSET ?`, [limit, offset], (err, rows) => {{
-        if (err) reject(err);
-        else resolve(rows || []);
-      }});
-    }});
+    return this.queryAll(`SELECT * FROM ${{this.tableName}} LIMIT ? OFFSET ?`, [limit, offset]);
   }}
 
   // 🔍 Par ID
   findById(id) {{
-    return new Promise((resolve, reject) => {{
-      this.db.get(`SELECT * FROM ${{this.tableName}} WHERE {pk_col} = ?`, [id], (err, row) => {{
-        if (err) reject(err);
-        else resolve(row);
-      }});
-    }});
+    return this.queryRow(`SELECT * FROM ${{this.tableName}} WHERE {pk_col} = ?`, [id]);
   }}
 
-  // 🔎 Recherche
-  search(query, limit = 20) {{
-    return new Promise((resolve, reject) => {{
-      this.db.all(`SELECT * FROM ${{this.tableName}} WHERE nom LIKE ? OR description LIKE ? LIMIT ?`, 
-        [`%${{query}}%`, `%${{query}}%`, limit], (err, rows) => {{
-        if (err) reject(err);
-        else resolve(rows || []);
-      }});
-    }});
-  }}
+{find_page_method(key_col, sortable)}
+
+{search_method(table_name, pk_col, columns, fts)}{summary_methods(cursor, table_name, pk_col)}{similar_methods(cursor, table_name, pk_col)}{trending_methods(cursor, table_name, pk_col)}{geo_methods(geo, pk_col)}{cluster_methods(cursor, table_name)}{relation_methods(relations)}
 
   // ➕ Créer
   create(data) {{
-    return new Promise((resolve, reject) => {{
-      const columns = Object.keys(data);
-      const placeholders = columns.map(() => '?').join(', ');
-      const values = columns.map(col => data[col]);
-      
-      this.db.run(
-        `INSERT INTO ${{this.tableName}} (${{columns.join(', ')}}) VALUES (${{placeholders}})`,
-        values,
-        function(err) {{
-          if (err) reject(err);
-          else resolve({{ success: true, id: this.lastID }});
-        }}
-      );
-    }});
+    const columns = Object.keys(data);
+    const placeholders = columns.map(() => '?').join(', ');
+    const values = columns.map(col => data[col]);
+
+    return this.execute(
+      `INSERT INTO ${{this.tableName}} (${{columns.join(', ')}}) VALUES (${{placeholders}})`,
+      values
+    ).then(res => ({{ success: true, id: res.lastID }}));
   }}
 
   // ✏️ Update
   update(id, data) {{
-    return new Promise((resolve, reject) => {{
-      const setClause = Object.keys(data).map(k => `${{k}} = ?`).join(', ');
-      const values = Object.values(data).concat(id);
-      
-      this.db.run(
-        `UPDATE ${{this.tableName}} SET ${{setClause}} WHERE rowid = ?`,
-        values,
-        function(err) {{
-          if (err) reject(err);
-          else resolve({{ success: true, changes: this.changes }});
-        }}
-      );
-    }});
+    const setClause = Object.keys(data).map(k => `${{k}} = ?`).join(', ');
+    const values = Object.values(data).concat(id);
+
+    return this.execute(`UPDATE ${{this.tableName}} SET ${{setClause}} WHERE rowid = ?`, values)
+      .then(res => ({{ success: true, changes: res.changes }}));
   }}
 
   // 🗑️ Delete
   delete(id) {{
-    return new Promise((resolve, reject) => {{
-      this.db.run(`DELETE FROM ${{this.tableName}} WHERE rowid = ?`, [id], function(err) {{
+    return this.execute(`DELETE FROM ${{this.tableName}} WHERE rowid = ?`, [id])
+      .then(res => ({{ success: true, changes: res.changes }}));
+  }}
+
+{batch_methods(key_col)}{buffer_methods}
+
+  // 🛠️ Statement préparé, mis en cache par (connexion, texte SQL) → plus de re-prepare par appel
+  prepare(handle, sql) {{
+    const key = `${{handle.poolKey}}|${{sql}}`;
+    let stmt = this.statements.get(key);
+    if (stmt) {{
+      // LRU : remis en fin de Map
+      this.statements.delete(key);
+    }} else {{
+      stmt = handle.prepare(sql, (err) => {{
+        if (err) this.statements.delete(key);
+      }});
+      if (this.statements.size >= connection.MAX_STATEMENTS) {{
+        const [oldKey, oldStmt] = this.statements.entries().next().value;
+        this.statements.delete(oldKey);
+        oldStmt.finalize();
+      }}
+    }}
+    this.statements.set(key, stmt);
+    return stmt;
+  }}
+
+  // Lecture 1 ligne (lecteur read-only du pool, via le cache de connection.js s'il est activé)
+  queryRow(sql, params = []) {{
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {{
+        const stmt = this.prepare(connection.reader(this.dbPath), sql);
+        stmt.get(params, (err, row) => {{
+          if (err) reject(err);
+          else resolve(row);
+        }});
+        // reset → libère le snapshot de lecture (sinon le checkpoint WAL est bloqué)
+        stmt.reset();
+      }})));
+  }}
+
+  // Lecture n lignes (lecteur read-only du pool, via le cache de connection.js s'il est activé)
+  queryAll(sql, params = []) {{
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {{
+        this.prepare(connection.reader(this.dbPath), sql).all(params, (err, rows) => {{
+          if (err) reject(err);
+          else resolve(rows || []);
+        }});
+      }})));
+  }}
+
+  // 📚 Requête de reporting lourde sur la réplique lecture seule (base principale si absente), hors cache :
+  // les lecteurs du pool restent libres pour les pages ; statement non gardé (la réplique peut être remplacée)
+  report(sql, params = []) {{
+    return connection.traced(this.tableName, sql, params, () => new Promise((resolve, reject) => {{
+      connection.replica(this.dbPath).all(sql, params, (err, rows) => {{
         if (err) reject(err);
-        else resolve({{ success: true, changes: this.changes }});
+        else resolve(rows || []);
       }});
-    }});
+    }}));
   }}
 
-  close() {{
-    if (this.db) {{
-      this.db.close();
-      this.db = null;
-    }}
+  // 🔬 Dernières requêtes exécutées (tous models/controllers) : {{ ts, table, sql, params, ms, rows }}
+  recentQueries(limit) {{
+    return connection.recentQueries(limit);
+  }}
+
+  // 📈 Succès/échecs/évictions du cache de lectures (partagé par fichier DB)
+  cacheStats() {{
+    return connection.cacheStats(this.dbPath);
+  }}
+
+  // Écriture (connexion writer unique, file d'attente partagée avec les transactions)
+  execute(sql, params = []) {{
+    return connection.withWriter(this.dbPath, handle => this.run(handle, sql, params), WRITTEN_TABLES);
+  }}
+
+  // 🔒 work(handle) dans une transaction : COMMIT si la promesse aboutit, ROLLBACK sinon
+  transaction(work) {{
+    return connection.withWriter(this.dbPath, async handle => {{
+      await this.run(handle, 'BEGIN IMMEDIATE');
+      try {{
+        const result = await work(handle);
+        await this.run(handle, 'COMMIT');
+        return result;
+      }} catch (err) {{
+        await this.run(handle, 'ROLLBACK').catch(() => {{}});
+        throw err;
+      }}
+    }}, WRITTEN_TABLES);
+  }}
+
+  // Statement préparé exécuté sur handle (writer déjà acquis par execute()/transaction())
+  run(handle, sql, params = []) {{
+    return connection.traced(this.tableName, sql, params, () => new Promise((resolve, reject) => {{
+      this.prepare(handle, sql).run(params, function(err) {{
+        if (err) reject(err);
+        else resolve({{ lastID: this.lastID, changes: this.changes }});
+      }});
+    }}));
   }}
+
+{close_method(bool(buffer_const))}
 }};
 
 module.exports = {class_name}Model;
@@ -340,6 +1583,13 @@ module.exports = {class_name}Model;
             f.write(model_code)
         print(f"   ✅ {file_path.name} créé ({len(model_code)} chars)")
     
+    file_path = models_dir / "connection.js"
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(CONNECTION_MODULE)
+    print(f"\n♻️  {file_path.name} créé (connexions partagées)")
+
+    generate_python_module(cursor, [name for name in names if not is_virtual_or_shadow(name, virtual_tables)])
+
     conn.close()
     print("\n🎉 TOUS les models générés SANS ERREURS TS !")
     print("📁 Utilisez @users, @softsCtrl dans les CONTROLLERS")
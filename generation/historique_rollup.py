@@ -0,0 +1,122 @@
+import argparse
+import sqlite3
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from generate_db import DB_PATH
+
+# Compactage de Historique : les consultations plus anciennes que la rétention sont agrégées
+# dans HistoriqueDaily(software_id, day, views, unique_users) puis supprimées.
+#   - unité de travail = (logiciel, plage de jours) : agrégat + DELETE dans la MÊME transaction
+#     → ni double comptage ni perte si le job est interrompu
+#   - transactions courtes (≈ batch lignes) + pause entre deux → le writer Node.js passe entre les lots
+#   - lectures de planification hors transaction d'écriture (WAL : aucun verrou)
+
+RETENTION_DAYS = 90
+BATCH_ROWS = 5000
+PAUSE_MS = 20
+
+ROLLUP_SQL = """
+INSERT INTO HistoriqueDaily (software_id, day, views, unique_users)
+SELECT software_id, date(viewed_at), COUNT(*), COUNT(DISTINCT user_id) FROM Historique
+WHERE software_id = ? AND viewed_at >= ? AND viewed_at < ?
+GROUP BY date(viewed_at)
+ON CONFLICT(software_id, day) DO UPDATE SET
+    views = views + excluded.views,
+    -- jour déjà compacté (lignes arrivées en retard) : borne haute, les utilisateurs ne sont plus connus
+    unique_users = unique_users + excluded.unique_users
+"""
+DELETE_SQL = "DELETE FROM Historique WHERE software_id = ? AND viewed_at >= ? AND viewed_at < ?"
+
+
+def next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def pending_ranges(conn, cutoff, batch):
+    """(software_id, jour début, jour fin exclu, nb lignes) à compacter
+    Parcours « loose index scan » de idx_historique_software_id_viewed_at : O(log n) par logiciel"""
+    software = -1
+    while True:
+        software = conn.execute("SELECT MIN(software_id) FROM Historique WHERE software_id > ?",
+                                (software,)).fetchone()[0]
+        if software is None:
+            return
+        days = conn.execute("SELECT date(viewed_at), COUNT(*) FROM Historique "
+                            "WHERE software_id = ? AND viewed_at < ? GROUP BY 1 ORDER BY 1",
+                            (software, cutoff)).fetchall()
+        start, rows = None, 0
+        for day, count in days:
+            # Un jour n'est jamais coupé en deux (unique_users exact) ; plage fermée à ~batch lignes
+            if start and rows + count > batch:
+                yield software, start, day, rows
+                start, rows = None, 0
+            start, rows = start or day, rows + count
+        if start:
+            yield software, start, next_day(days[-1][0]), rows
+
+
+def rollup(db_path=DB_PATH, retention_days=RETENTION_DAYS, batch=BATCH_ROWS, pause_ms=PAUSE_MS, dry_run=False):
+    """Compacte les consultations antérieures à aujourd'hui - retention_days ; renvoie le nb de lignes supprimées"""
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        cutoff = conn.execute("SELECT date('now', ?)", (f"-{int(retention_days)} days",)).fetchone()[0]
+        print(f"📆 Compactage Historique avant {cutoff} (rétention {retention_days} j, lots de {batch:,} lignes)")
+        t0 = time.perf_counter()
+        deleted = transactions = 0
+        longest = 0.0
+        pending, pending_rows = [], 0
+
+        def commit(units):
+            nonlocal deleted, transactions, longest
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for software, start, end, _ in units:
+                    conn.execute(ROLLUP_SQL, (software, start, end))
+                    deleted += conn.execute(DELETE_SQL, (software, start, end)).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            transactions += 1
+            longest = max(longest, time.perf_counter() - started)
+            time.sleep(pause_ms / 1000)
+
+        for unit in pending_ranges(conn, cutoff, batch):
+            if dry_run:
+                pending_rows += unit[3]
+                continue
+            # Plusieurs petits logiciels regroupés dans une même transaction
+            if pending and pending_rows + unit[3] > batch:
+                commit(pending)
+                pending, pending_rows = [], 0
+            pending.append(unit)
+            pending_rows += unit[3]
+        if dry_run:
+            print(f"   🔍 {pending_rows:,} ligne(s) à compacter")
+            return 0
+        if pending:
+            commit(pending)
+
+        elapsed = time.perf_counter() - t0
+        print(f"✅ {deleted:,} consultation(s) compactée(s) en {transactions} transaction(s), {elapsed:.1f}s "
+              f"(verrou d'écriture max {longest * 1000:.0f} ms)")
+        if deleted:
+            conn.execute("PRAGMA optimize")
+        return deleted
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compactage de Historique en HistoriqueDaily (agrégats par jour)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite")
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS,
+                        help=f"Jours de consultations détaillées conservés (défaut {RETENTION_DAYS})")
+    parser.add_argument('--batch', type=int, default=BATCH_ROWS, help="Lignes supprimées par transaction")
+    parser.add_argument('--pause-ms', type=int, default=PAUSE_MS, help="Pause entre deux transactions")
+    parser.add_argument('--dry-run', action='store_true', help="Compter les lignes à compacter sans rien modifier")
+    args = parser.parse_args()
+    rollup(args.db, args.retention_days, args.batch, args.pause_ms, args.dry_run)
@@ -0,0 +1,298 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+from generate_db import DB_PATH, SQL_SCHEMA
+
+CHUNK_SIZE = 5_000
+READ_SIZE = 1 << 16
+
+# Table de reprise : position (nb d'enregistrements source traités) par fichier importé
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_checkpoint (
+    source TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def check_values(table, column):
+    """Valeurs autorisées par le CHECK(column IN (...)) de SQL_SCHEMA"""
+    body = re.search(rf"CREATE TABLE IF NOT EXISTS {table} \((.*?)\n\);", SQL_SCHEMA, re.S).group(1)
+    values = re.search(rf"{column} TEXT CHECK\({column} IN \(([^)]*)\)\)", body).group(1)
+    return tuple(v.strip().strip("'") for v in values.split(','))
+
+
+def normalize(value):
+    """'Lycée ' → 'lycee' (minuscules, sans accents ni espaces superflus)"""
+    if value is None:
+        return ''
+    value = unicodedata.normalize('NFKD', str(value).strip().lower())
+    return ''.join(c for c in value if not unicodedata.combining(c))
+
+
+def normalize_header(name):
+    """"Identifiant de l'établissement" → 'identifiant_de_l_etablissement' (nom de colonne comparé aux alias)"""
+    return re.sub(r'[^a-z0-9]+', '_', normalize(name)).strip('_')
+
+
+def first_of(record, names):
+    """Première colonne non vide parmi les alias connus"""
+    for name in names:
+        value = record.get(name)
+        if value not in (None, ''):
+            return value.strip() if isinstance(value, str) else value
+    return None
+
+
+def to_float(value):
+    try:
+        return float(str(value).replace(',', '.')) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def to_int(value, default=0):
+    try:
+        return int(float(str(value).replace(',', '.'))) if value not in (None, '') else default
+    except ValueError:
+        return default
+
+
+# ── Lecture en flux ──
+
+def open_text(path):
+    """Ouvre un fichier texte, gzip compris (détecté à l'extension)"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def iter_csv(f):
+    """Lignes CSV en dict (séparateur ',' ou ';' détecté sur l'en-tête)"""
+    header = f.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    fields = next(csv.reader([header], delimiter=delimiter))
+    yield from csv.DictReader(f, fieldnames=[normalize_header(h) for h in fields], delimiter=delimiter)
+
+
+def iter_json(f):
+    """Objets d'un tableau JSON ou d'un fichier NDJSON, décodés un par un par blocs de READ_SIZE"""
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+    while True:
+        # Sauter espaces, '[' ',' ']' entre les objets
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        # Format data.gouv / OpenDataSoft : {"fields": {...}}
+        record = obj.get('fields', obj) if isinstance(obj, dict) else {}
+        yield {normalize_header(k): v for k, v in record.items()}
+
+
+def iter_records(path):
+    """Enregistrements source (CSV ou JSON, gzip accepté), sans charger le fichier en mémoire"""
+    name = Path(path).name.lower().removesuffix('.gz')
+    with open_text(path) as f:
+        if name.endswith(('.json', '.ndjson', '.jsonl')):
+            yield from iter_json(f)
+        else:
+            yield from iter_csv(f)
+
+
+# ── Mapping + validation par table cible ──
+
+PILOTE_TYPES = check_values('Pilote', 'type')
+DEMARCHE_TYPES = check_values('demarche_nird', 'type')
+
+# Libellés source → valeurs du schéma (annuaire de l'éducation, état d'ouverture...)
+TYPE_ALIASES = {
+    'ecole': 'ecole', 'ecole maternelle': 'ecole', 'ecole elementaire': 'ecole', 'ecole primaire': 'ecole',
+    'college': 'college', 'lycee': 'lycee', 'lycee professionnel': 'lycee', 'cite scolaire': 'lycee',
+    'etablissement': 'etablissement', 'collectivite': 'collectivite', 'commune': 'collectivite',
+    'departement': 'collectivite', 'region': 'collectivite',
+}
+STATUS_ALIASES = {
+    'actif': 'actif', 'ouvert': 'actif', 'a ouvrir': 'actif', '1': 'actif',
+    'inactif': 'inactif', 'ferme': 'inactif', 'a fermer': 'inactif', '0': 'inactif',
+}
+PILOTE_STATUSES = ('actif', 'inactif')
+
+
+def map_pilote(record):
+    code = first_of(record, ('code', 'uai', 'identifiant_de_l_etablissement', 'numero_uai'))
+    nom = first_of(record, ('nom', 'nom_etablissement', 'appellation_officielle', 'denomination'))
+    if not code:
+        raise ValueError('code manquant')
+    if not nom:
+        raise ValueError('nom manquant')
+    kind = TYPE_ALIASES.get(normalize(first_of(record, ('type', 'type_etablissement', 'nature'))))
+    if kind not in PILOTE_TYPES:
+        raise ValueError('type invalide')
+    status = STATUS_ALIASES.get(normalize(first_of(record, ('status', 'statut', 'etat')) or 'actif'))
+    if status not in PILOTE_STATUSES:
+        raise ValueError('status invalide')
+    return (nom, str(code).lower(),
+            first_of(record, ('ville', 'nom_commune', 'commune', 'libelle_commune')),
+            first_of(record, ('academie', 'libelle_academie')),
+            kind,
+            first_of(record, ('contact', 'telephone')),
+            first_of(record, ('email', 'mail', 'courriel')),
+            status,
+            to_float(first_of(record, ('latitude', 'lat', 'y'))),
+            to_float(first_of(record, ('longitude', 'lon', 'lng', 'x'))),
+            first_of(record, ('url', 'web', 'site_web')))
+
+
+def map_demarche(record):
+    nom = first_of(record, ('nom', 'nom_etablissement', 'libelle'))
+    if not nom:
+        raise ValueError('nom manquant')
+    kind = TYPE_ALIASES.get(normalize(first_of(record, ('type', 'type_structure'))))
+    if kind not in DEMARCHE_TYPES:
+        raise ValueError('type invalide')
+    return (nom, kind,
+            to_int(first_of(record, ('machines_reconditionnees', 'machines', 'nb_machines'))),
+            first_of(record, ('region', 'libelle_region')))
+
+
+TARGETS = {
+    'pilote': ('Pilote', map_pilote, """
+        INSERT INTO Pilote (nom, code, ville, academie, type, contact, email, status, latitude, longitude, url)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(code) DO UPDATE SET
+            nom = excluded.nom, ville = excluded.ville, academie = excluded.academie,
+            type = excluded.type, contact = COALESCE(excluded.contact, contact),
+            email = COALESCE(excluded.email, email), status = excluded.status,
+            latitude = COALESCE(excluded.latitude, latitude), longitude = COALESCE(excluded.longitude, longitude),
+            url = COALESCE(excluded.url, url), updated_at = CURRENT_TIMESTAMP
+    """),
+    # Pas de clé naturelle UNIQUE : ajout simple, la reprise par checkpoint évite les doublons
+    'demarche': ('demarche_nird', map_demarche, """
+        INSERT INTO demarche_nird (nom, type, machines_reconditionnees, region) VALUES (?, ?, ?, ?)
+    """),
+}
+
+
+# ── Import ──
+
+def fingerprint(path):
+    stat = Path(path).stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def load_checkpoint(conn, source, target, restart=False):
+    """Position de reprise (0 si nouveau fichier, fichier modifié ou --restart)"""
+    conn.executescript(CHECKPOINT_SCHEMA)
+    key = str(Path(source).resolve())
+    row = conn.execute("SELECT target, fingerprint, position, done FROM import_checkpoint WHERE source = ?",
+                       (key,)).fetchone()
+    fp = fingerprint(source)
+    if row and not restart and row[0] == target and row[1] == fp:
+        return key, row[2], bool(row[3])
+    if row and row[1] != fp:
+        print("   ⚠️ Fichier source modifié depuis le dernier import → reprise depuis le début")
+    with conn:
+        conn.execute("""INSERT INTO import_checkpoint (source, target, fingerprint, position, done)
+                        VALUES (?, ?, ?, 0, 0)
+                        ON CONFLICT(source) DO UPDATE SET target = excluded.target,
+                            fingerprint = excluded.fingerprint, position = 0, done = 0,
+                            updated_at = CURRENT_TIMESTAMP""", (key, target, fp))
+    return key, 0, False
+
+
+def import_file(source, target='pilote', db_path=DB_PATH, chunk_size=CHUNK_SIZE, restart=False):
+    """Importe source dans la table cible par transactions de chunk_size lignes, avec reprise"""
+    table, mapper, sql = TARGETS[target]
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        key, position, done = load_checkpoint(conn, source, target, restart)
+        if done:
+            print(f"✅ {Path(source).name} déjà importé entièrement (--restart pour recommencer)")
+            return {'imported': 0, 'rejected': 0}
+        if position:
+            print(f"⏩ Reprise après {position:,} enregistrements")
+
+        records = islice(iter_records(source), position, None)
+        imported, rejected = 0, Counter()
+        samples = []
+        t0 = time.perf_counter()
+
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rows = []
+            for offset, record in enumerate(chunk, start=position + 1):
+                try:
+                    rows.append(mapper(record))
+                except ValueError as e:
+                    rejected[str(e)] += 1
+                    if len(samples) < 5:
+                        samples.append(f"#{offset}: {e}")
+            position += len(chunk)
+            # Lignes + checkpoint dans la MÊME transaction → reprise exacte après interruption
+            with conn:
+                conn.executemany(sql, rows)
+                conn.execute("""UPDATE import_checkpoint SET position = ?, updated_at = CURRENT_TIMESTAMP
+                                WHERE source = ?""", (position, key))
+            imported += len(rows)
+            elapsed = time.perf_counter() - t0
+            print(f"   ✓ {position:,} lus, {imported:,} importés ({imported / max(elapsed, 1e-9):,.0f}/s)")
+
+        with conn:
+            conn.execute("UPDATE import_checkpoint SET done = 1, updated_at = CURRENT_TIMESTAMP WHERE source = ?",
+                         (key,))
+
+        print(f"\n🎉 {table}: {imported:,} lignes importées, {sum(rejected.values()):,} rejetées")
+        for reason, count in rejected.most_common():
+            print(f"   ❌ {reason}: {count:,}")
+        for sample in samples:
+            print(f"      {sample}")
+        return {'imported': imported, 'rejected': sum(rejected.values())}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import en flux de données ouvertes (CSV/JSON, gzip accepté)")
+    parser.add_argument('target', choices=TARGETS, help="Table cible")
+    parser.add_argument('source', type=Path, help="Fichier .csv, .json, .ndjson (éventuellement .gz)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite cible")
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help="Lignes par transaction")
+    parser.add_argument('--restart', action='store_true', help="Ignorer le checkpoint et tout réimporter")
+    args = parser.parse_args()
+
+    print(f"📥 Import {args.source} → {TARGETS[args.target][0]} ({args.db})")
+    import_file(args.source, args.target, args.db, args.chunk, args.restart)
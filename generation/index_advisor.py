@@ -0,0 +1,170 @@
+import argparse
+import json
+import re
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+from generate_db import DB_PATH
+from query_shapes import primary_key, query_shapes
+
+REPEAT = 5
+# ORDER BY ... LIMIT sans filtre : un SCAN ... USING INDEX lit dans l'ordre de l'index et s'arrête au LIMIT
+ORDERED_LIMIT_RE = re.compile(r"\bORDER\s+BY\b.*\bLIMIT\b", re.I | re.S)
+
+
+def explain(conn, sql, params):
+    """Lignes 'detail' de EXPLAIN QUERY PLAN"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def ordered_limit(sql):
+    """Requête sans WHERE (hors 'WHERE 1=1' de GenericController) qui trie puis coupe au LIMIT"""
+    sql = re.sub(r"\bWHERE\s+1\s*=\s*1\b", '', sql or '', flags=re.I)
+    return bool(ORDERED_LIMIT_RE.search(sql)) and not re.search(r"\bWHERE\b", sql, re.I)
+
+
+def plan_flags(details, sql=None):
+    """Étapes coûteuses : SCAN (parcours complet) et TEMP B-TREE (tri/regroupement temporaire)
+    (un SCAN de table virtuelle avec INDEX = recherche FTS5/R*Tree, pas un parcours complet ;
+    un SCAN ... USING INDEX pour un ORDER BY ... LIMIT sans tri temporaire = parcours ordonné borné)"""
+    ordered = ordered_limit(sql) and not any('TEMP B-TREE' in d for d in details)
+    return [d for d in details
+            if (d.startswith('SCAN') and 'VIRTUAL TABLE INDEX' not in d
+                and not (ordered and re.search(r"USING (COVERING )?INDEX", d)))
+            or 'TEMP B-TREE' in d]
+
+
+def time_query(conn, sql, params, repeat=REPEAT):
+    """Latence médiane (ms) en consommant toutes les lignes"""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def existing_indexes(conn, table):
+    """{nom_index: [colonnes]} d'une table (index explicites + autoindex UNIQUE/PK)"""
+    indexes = {}
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        info = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        indexes[index[1]] = [col[2] for col in sorted(info)]
+    return indexes
+
+
+def suggest_index(conn, shape):
+    """Index (égalités..., tri..., [colonnes sélectionnées si couvrant]) pour une forme de requête"""
+    table = shape['table']
+    cols = list(shape['eq']) + [o.split()[0] for o in shape['order']]
+    if not cols or cols == [primary_key(conn, table)]:
+        return None
+    select = shape['select']
+    if select not in ('*', 'COUNT(*)'):
+        # Index couvrant : la requête est servie sans relire la table
+        cols += [c.strip() for c in select.split(',') if c.strip() not in cols]
+    for index_cols in existing_indexes(conn, table).values():
+        if index_cols[:len(cols)] == cols:
+            return None
+    name = f"idx_{table.lower()}_{'_'.join(cols)}"
+    return name, table, cols
+
+
+def index_ddl(name, table, cols):
+    """Ligne au format de SQL_INDEXES"""
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(cols)});"
+
+
+def merge_suggestions(suggestions):
+    """Dédoublonne : un index dont les colonnes sont le préfixe d'un autre est inutile"""
+    unique = {}
+    for name, table, cols in suggestions:
+        unique[(table, tuple(cols))] = (name, table, cols)
+    kept = []
+    for (table, cols), suggestion in unique.items():
+        if not any(t == table and len(other) > len(cols) and other[:len(cols)] == cols
+                   for (t, other) in unique):
+            kept.append(suggestion)
+    return kept
+
+
+def analyse(conn, shapes):
+    """Plan + latence de chaque forme de requête"""
+    report = []
+    for shape in shapes:
+        details = explain(conn, shape['sql'], shape['params'])
+        report.append({'label': shape['label'], 'sql': shape['sql'], 'plan': details,
+                       'flags': plan_flags(details, shape['sql']),
+                       'ms': time_query(conn, shape['sql'], shape['params'])})
+    return report
+
+
+def print_report(before, after=None):
+    print(f"\n{'requête':<42} {'avant (ms)':>11} {'après (ms)':>11}  plan")
+    for i, b in enumerate(before):
+        a = after[i] if after else None
+        flag = '⚠️ ' if b['flags'] else '✅'
+        after_ms = f"{a['ms']:>11.3f}" if a else f"{'-':>11}"
+        print(f"{flag} {b['label']:<39} {b['ms']:>11.3f} {after_ms}  {' | '.join(b['plan'])}")
+        if a and a['plan'] != b['plan']:
+            print(f"{'':<3}{'':<39} {'':>11} {'':>11}  → {' | '.join(a['plan'])}")
+
+
+def advise(db_path=DB_PATH, apply=True, json_path=None):
+    """Analyse les formes de requêtes, crée les index manquants, ANALYZE + optimize, rapport avant/après"""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        shapes = query_shapes(conn)
+        print(f"🔍 {len(shapes)} forme(s) de requête analysée(s) sur {db_path}")
+        before = analyse(conn, shapes)
+
+        flagged = [(s, b) for s, b in zip(shapes, before) if b['flags']]
+        suggestions = merge_suggestions(filter(None, (suggest_index(conn, s) for s, _ in flagged)))
+        no_index = [b['label'] for s, b in flagged if not suggest_index(conn, s)]
+
+        print(f"\n⚠️  {len(flagged)} requête(s) avec SCAN / TEMP B-TREE")
+        if suggestions:
+            # Un index créé ici seulement serait perdu au prochain generate_db.py : le DDL va dans SQL_INDEXES
+            print("   ➕ À ajouter à SQL_INDEXES (generation/generate_db.py) :")
+            for name, table, cols in suggestions:
+                print(f"      {index_ddl(name, table, cols)}")
+        if no_index:
+            print(f"   ℹ️  Sans index utile (agrégat/parcours complet voulu): {', '.join(no_index)}")
+
+        after = None
+        if apply:
+            t0 = time.perf_counter()
+            with conn:
+                for name, table, cols in suggestions:
+                    conn.execute(index_ddl(name, table, cols))
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+            print(f"\n✅ {len(suggestions)} index créé(s) + ANALYZE en {time.perf_counter() - t0:.1f}s"
+                  f"{' (mesure : à reporter dans SQL_INDEXES)' if suggestions else ''}")
+            after = analyse(conn, shapes)
+
+        print_report(before, after)
+
+        if json_path:
+            Path(json_path).write_text(json.dumps({
+                'db': str(db_path),
+                'indexes': [{'name': n, 'table': t, 'columns': c, 'ddl': index_ddl(n, t, c)}
+                            for n, t, c in suggestions],
+                'queries': [{'label': b['label'], 'sql': b['sql'], 'before': b,
+                             'after': after[i] if after else None} for i, b in enumerate(before)],
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+            print(f"\n📝 Rapport JSON: {json_path}")
+        return suggestions
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index advisor : EXPLAIN QUERY PLAN des requêtes des models")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Base à analyser (idéalement --scale)")
+    parser.add_argument('--dry-run', action='store_true', help="Rapport seulement, sans créer d'index")
+    parser.add_argument('--json', type=Path, default=None, help="Écrire le rapport avant/après en JSON")
+    args = parser.parse_args()
+    advise(args.db, apply=not args.dry_run, json_path=args.json)
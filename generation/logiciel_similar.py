@@ -0,0 +1,273 @@
+import argparse
+import json
+import sqlite3
+import time
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+from generate_db import DB_PATH, SIMILAR_TOP_K
+
+# Voisins « ceux qui utilisent ce logiciel utilisent aussi... » → LogicielSimilar(software_id, similar_id, score)
+#   - matrice creuse utilisateur × logiciel (binaire) lue en flux depuis Favori + Historique
+#   - co-occurrences C[t, j] = nb d'utilisateurs communs, calculées par lots de logiciels cibles :
+#     développement vectorisé (cible → ses utilisateurs → leurs logiciels) puis np.bincount,
+#     lots dimensionnés pour borner la mémoire (PAIR_BUDGET paires, DENSE_BUDGET cellules)
+#   - score cosinus C / sqrt(n_t · n_j) (ou co-occurrence brute), top-K par logiciel
+#   - incrémental : seuls les logiciels de LogicielSimilarDirty (triggers Favori/Historique) sont recalculés,
+#     puis les listes des autres logiciels où leur score a changé (symétrie du score)
+
+INTERACTIONS_SQL = ("SELECT user_id, software_id FROM Favori",
+                    "SELECT user_id, software_id FROM Historique")
+CHUNK_ROWS = 1_000_000       # lignes lues par fetchmany
+PAIR_BUDGET = 20_000_000     # paires (cible, utilisateur, voisin) développées par lot
+DENSE_BUDGET = 4_000_000     # cellules de la matrice lot × logiciels
+MAX_USER_ITEMS = 1000        # utilisateurs au-delà (robots, comptes de test) ignorés
+MIN_COMMON = 2               # utilisateurs communs minimum pour qu'un voisin compte
+FULL_REBUILD_RATIO = 0.2     # au-delà de 20 % de logiciels modifiés, recalcul complet
+
+UPSERT_SQL = """
+INSERT INTO LogicielSimilar (software_id, similar_id, score) VALUES (?, ?, ?)
+ON CONFLICT(software_id, similar_id) DO UPDATE SET score = excluded.score
+"""
+
+# Garde les k meilleurs voisins des logiciels listés (json) après report symétrique
+TRIM_SQL = """
+DELETE FROM LogicielSimilar WHERE (software_id, similar_id) IN (
+    SELECT software_id, similar_id FROM (
+        SELECT software_id, similar_id,
+               ROW_NUMBER() OVER (PARTITION BY software_id ORDER BY score DESC, similar_id) AS rank
+        FROM LogicielSimilar WHERE software_id IN (SELECT value FROM json_each(?)))
+    WHERE rank > ?)
+"""
+
+
+def read_interactions(conn):
+    """Couples (utilisateur, logiciel) distincts, lus par blocs et dédoublonnés au fil de l'eau
+    → clés int64 triées (user_id << 32 | software_id)"""
+    merged = np.empty(0, dtype=np.int64)
+    pending, pending_rows = [], 0
+    for sql in INTERACTIONS_SQL:
+        cursor = conn.execute(sql)
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+            pending.append(np.unique((pairs[:, 0] << 32) | pairs[:, 1]))
+            pending_rows += len(rows)
+            # Compactage régulier : mémoire ~ nb de couples distincts, pas nb de lignes lues
+            if pending_rows >= 4 * CHUNK_ROWS:
+                merged = np.unique(np.concatenate([merged, *pending]))
+                pending, pending_rows = [], 0
+    return np.unique(np.concatenate([merged, *pending]))
+
+
+def build_matrix(keys, max_user_items=MAX_USER_ITEMS):
+    """Index CSR par utilisateur et par logiciel (indices denses) + nb d'utilisateurs par logiciel"""
+    users, items = keys >> 32, keys & 0xFFFFFFFF
+    item_ids, item_idx = np.unique(items, return_inverse=True)
+    _, user_idx = np.unique(users, return_inverse=True)
+    user_deg = np.bincount(user_idx)
+    # Utilisateurs hors norme exclus ; ceux à 1 seul logiciel ne créent aucune paire (mais comptent dans n_t)
+    active = user_deg[user_idx] <= max_user_items
+    user_idx, item_idx = user_idx[active], item_idx[active]
+    item_deg = np.bincount(item_idx, minlength=len(item_ids))
+    paired = user_deg[user_idx] >= 2
+    user_idx, item_idx = user_idx[paired], item_idx[paired]
+
+    n_users = len(user_deg)
+    user_ptr = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(np.bincount(user_idx, minlength=n_users), out=user_ptr[1:])
+    user_items = item_idx.astype(np.int32)  # déjà trié par utilisateur (clés triées)
+    order = np.argsort(item_idx, kind='stable')
+    item_ptr = np.zeros(len(item_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_idx, minlength=len(item_ids)), out=item_ptr[1:])
+    item_users = user_idx[order].astype(np.int32)
+    return {'ids': item_ids, 'deg': item_deg, 'user_ptr': user_ptr, 'user_items': user_items,
+            'item_ptr': item_ptr, 'item_users': item_users}
+
+
+def ragged(starts, lengths):
+    """Concaténation vectorisée de arange(starts[i], starts[i] + lengths[i])"""
+    total = int(lengths.sum())
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + np.arange(total) - offsets
+
+
+def target_batches(matrix, targets):
+    """Lots de logiciels cibles dont le développement tient dans PAIR_BUDGET et DENSE_BUDGET"""
+    user_deg = np.diff(matrix['user_ptr'])
+    item_ptr = matrix['item_ptr']
+    # Coût d'une cible = somme des nb de logiciels de ses utilisateurs
+    cost = np.add.reduceat(np.append(user_deg[matrix['item_users']], 0), item_ptr[:-1]) \
+        * (np.diff(item_ptr) > 0)
+    max_targets = max(1, DENSE_BUDGET // len(matrix['ids']))
+    batch, spent = [], 0
+    for t in targets.tolist():
+        if batch and (spent + cost[t] > PAIR_BUDGET or len(batch) >= max_targets):
+            yield np.array(batch)
+            batch, spent = [], 0
+        batch.append(t)
+        spent += cost[t]
+    if batch:
+        yield np.array(batch)
+
+
+def scores_for(matrix, batch, metric='cosine', min_common=MIN_COMMON):
+    """Matrice dense lot × logiciels des scores (0 = pas voisin)"""
+    n = len(matrix['ids'])
+    item_ptr, user_ptr = matrix['item_ptr'], matrix['user_ptr']
+    lengths = item_ptr[batch + 1] - item_ptr[batch]
+    users = matrix['item_users'][ragged(item_ptr[batch], lengths)]
+    rows = np.repeat(np.arange(len(batch)), lengths)
+    user_lengths = user_ptr[users + 1] - user_ptr[users]
+    neighbours = matrix['user_items'][ragged(user_ptr[users], user_lengths)]
+    rows = np.repeat(rows, user_lengths)
+    common = np.bincount(rows * n + neighbours, minlength=len(batch) * n).reshape(len(batch), n)
+    common[np.arange(len(batch)), batch] = 0
+    common[common < min_common] = 0
+    if metric == 'cooc':
+        return common.astype(np.float64)
+    deg = matrix['deg'].astype(np.float64)
+    return common / np.sqrt(np.outer(deg[batch], deg).clip(min=1))
+
+
+def top_k(scores, k):
+    """(lignes, colonnes, scores) des k meilleurs scores > 0 de chaque ligne, triés par ligne puis score"""
+    k = min(k, scores.shape[1])
+    cols = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+        np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    rows = np.repeat(np.arange(scores.shape[0]), cols.shape[1])
+    cols = cols.ravel()
+    values = scores[rows, cols]
+    keep = values > 0
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+    order = np.lexsort((-values, rows))
+    return rows[order], cols[order], values[order]
+
+
+def compute(matrix, targets, k, metric, min_common, kth=None):
+    """Voisins des cibles (indices denses) → [(software_id, similar_id, score)]
+    kth = score du k-ième voisin actuel de chaque logiciel (0 si liste incomplète) → en plus, les
+    (autre, cible, score) où la cible a sa place dans la liste d'un autre logiciel (symétrie du score)"""
+    ids = matrix['ids']
+    rows_out, mirrored = [], []
+    for batch in target_batches(matrix, targets):
+        scores = scores_for(matrix, batch, metric, min_common)
+        rows, cols, values = top_k(scores, k)
+        rows_out.extend(zip(ids[batch[rows]].tolist(), ids[cols].tolist(), np.round(values, 6).tolist()))
+        if kth is not None:
+            r, j = np.nonzero(scores > kth)
+            mirrored.extend(zip(ids[j].tolist(), ids[batch[r]].tolist(), np.round(scores[r, j], 6).tolist()))
+    return rows_out, mirrored
+
+
+def dirty_snapshot(conn):
+    return dict(conn.execute("SELECT software_id, version FROM LogicielSimilarDirty").fetchall())
+
+
+def clear_dirty(conn, snapshot):
+    """Retire les marques lues avant le calcul, sauf celles dont la version a bougé entre-temps"""
+    conn.executemany("DELETE FROM LogicielSimilarDirty WHERE software_id = ? AND version = ?", snapshot.items())
+
+
+def build_similar(conn, k=SIMILAR_TOP_K, metric='cosine', min_common=MIN_COMMON):
+    """Recalcul complet : lectures hors transaction, puis remplacement de la table en une transaction"""
+    t0 = time.perf_counter()
+    snapshot = dirty_snapshot(conn)
+    keys = read_interactions(conn)
+    if not len(keys):
+        with conn:
+            conn.execute("DELETE FROM LogicielSimilar")
+            clear_dirty(conn, snapshot)
+        return 0
+    matrix = build_matrix(keys)
+    read_s = time.perf_counter() - t0
+    rows, _ = compute(matrix, np.arange(len(matrix['ids'])), k, metric, min_common)
+    with conn:
+        conn.execute("DELETE FROM LogicielSimilar")
+        conn.executemany(UPSERT_SQL, rows)
+        clear_dirty(conn, snapshot)
+    print(f"   🤝 {len(rows):,} voisin(s) pour {len(matrix['ids']):,} logiciel(s) ({len(keys):,} interactions, "
+          f"{metric}, top {k}) en {time.perf_counter() - t0:.2f}s (lecture {read_s:.2f}s)")
+    return len(rows)
+
+
+def refresh_similar(conn, k=SIMILAR_TOP_K, metric='cosine', min_common=MIN_COMMON):
+    """Recalcule seulement les logiciels de LogicielSimilarDirty (ou tout si trop de changements)"""
+    if not conn.execute("SELECT 1 FROM LogicielSimilar LIMIT 1").fetchone():
+        # Jamais calculé (ex: table créée par migrate_db.py)
+        return build_similar(conn, k, metric, min_common)
+    snapshot = dirty_snapshot(conn)
+    if not snapshot:
+        print("   ⏭️  Aucune interaction nouvelle")
+        return 0
+    total = conn.execute("SELECT COUNT(*) FROM Logiciel").fetchone()[0]
+    if len(snapshot) > FULL_REBUILD_RATIO * max(total, 1):
+        print(f"   ♻️  {len(snapshot):,} logiciel(s) modifié(s) → recalcul complet")
+        return build_similar(conn, k, metric, min_common)
+
+    t0 = time.perf_counter()
+    matrix = build_matrix(read_interactions(conn))
+    ids = matrix['ids']
+    dense = lambda values: np.searchsorted(ids, values).clip(max=len(ids) - 1)
+
+    dirty = np.array(sorted(snapshot), dtype=np.int64)
+    position = dense(dirty)
+    targets = position[ids[position] == dirty]
+    # Score du k-ième voisin de chaque liste : un logiciel modifié y entre s'il fait mieux
+    kth = np.zeros(len(ids))
+    for software_id, score in conn.execute(
+            "SELECT software_id, MIN(score) FROM LogicielSimilar GROUP BY software_id HAVING COUNT(*) >= ?", (k,)):
+        j = dense(software_id)
+        if ids[j] == software_id:
+            kth[j] = score
+    rows, mirrored = compute(matrix, targets, k, metric, min_common, kth)
+
+    # Listes où un logiciel modifié a perdu du score (ou disparu) : le remplaçant peut venir d'au-delà
+    # du top-K gardé → ces listes sont recalculées entièrement (leurs propres interactions n'ont pas changé)
+    fresh = {(a, b): score for a, b, score in mirrored}
+    dirty_json = json.dumps(dirty.tolist())
+    weakened = sorted({software_id for software_id, similar_id, score in conn.execute(
+        "SELECT software_id, similar_id, score FROM LogicielSimilar WHERE similar_id IN (SELECT value FROM json_each(?))",
+        (dirty_json,)) if software_id not in snapshot and fresh.get((software_id, similar_id), 0) < score})
+    recomputed, _ = compute(matrix, dense(np.array(weakened, dtype=np.int64)), k, metric, min_common) \
+        if weakened else ([], [])
+
+    replaced = json.dumps(dirty.tolist() + weakened)
+    skip = set(snapshot) | set(weakened)
+    mirrored = [m for m in mirrored if m[0] not in skip]
+    touched = sorted({m[0] for m in mirrored})
+    with conn:
+        conn.execute("DELETE FROM LogicielSimilar WHERE software_id IN (SELECT value FROM json_each(?))", (replaced,))
+        conn.executemany(UPSERT_SQL, rows + recomputed + mirrored)
+        conn.execute(TRIM_SQL, (json.dumps(touched), k))
+        clear_dirty(conn, snapshot)
+    print(f"   🤝 {len(snapshot):,} logiciel(s) modifié(s) → {len(rows):,} voisin(s) ; "
+          f"{len(weakened):,} liste(s) recalculée(s), {len(touched):,} complétée(s) "
+          f"en {time.perf_counter() - t0:.2f}s")
+    return len(rows) + len(recomputed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logiciels similaires (co-occurrences Favori + Historique)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite")
+    parser.add_argument('--full', action='store_true', help="Tout recalculer (sinon logiciels modifiés seulement)")
+    parser.add_argument('--top', type=int, default=SIMILAR_TOP_K, help=f"Voisins par logiciel (défaut {SIMILAR_TOP_K})")
+    parser.add_argument('--metric', choices=('cosine', 'cooc'), default='cosine',
+                        help="Cosinus (défaut) ou nb brut d'utilisateurs communs")
+    parser.add_argument('--min-common', type=int, default=MIN_COMMON,
+                        help=f"Utilisateurs communs minimum (défaut {MIN_COMMON})")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(str(args.db), timeout=30)
+    try:
+        print(f"🤝 Logiciels similaires ({args.db})")
+        if args.full:
+            build_similar(conn, args.top, args.metric, args.min_common)
+        else:
+            refresh_similar(conn, args.top, args.metric, args.min_common)
+    finally:
+        conn.close()
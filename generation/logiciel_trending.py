@@ -0,0 +1,154 @@
+import argparse
+import math
+import sqlite3
+import time
+from pathlib import Path
+
+from generate_db import DB_PATH
+
+# Logiciels « tendance » → LogicielTrending(category_id, software_id, score), category_id = 0 : toutes catégories
+#   - score = Σ poids · 2^((t - epoch) / demi-vie) sur Historique (consultations), Favori (ajouts) et Avis (notes) :
+#     décroissance exponentielle sans recalcul, l'ordre des scores reste juste quand le temps passe
+#     (un score « à l'instant T » vaut score · 2^(-(T - epoch) / demi-vie), même facteur pour tous)
+#   - incrémental : seuls les id au-delà du dernier id traité (high-water mark par table) sont agrégés,
+#     par lots de --batch id, chaque lot + sa marque dans une transaction (relance sans double comptage)
+#   - epoch avancé (rebase) quand les poids deviennent trop grands ; scores négligeables supprimés
+#   - suppressions ignorées (un favori retiré garde son poids passé, qui décroît comme les autres)
+
+HALF_LIFE_DAYS = 7
+BATCH_IDS = 100_000          # id de la table source agrégés par transaction
+PAUSE_MS = 5                 # pause entre deux lots (écritures du serveur)
+REBASE_HALF_LIVES = 64       # epoch avancé au-delà de 64 demi-vies (poids 2^64)
+MIN_SCORE = 1e-6             # scores plus faibles supprimés au rebase (≈ 20 demi-vies)
+
+# table → (clé AUTOINCREMENT, horodatage, poids SQL)
+SOURCES = {
+    'Historique': ('history_id', 'viewed_at', '1.0'),
+    'Favori': ('favorite_id', 'added_at', '5.0'),
+    'Avis': ('review_id', 'created_at', '2.0 * COALESCE(note, 3)'),
+}
+
+# Horodatages epoch (jeu synthétique) ou texte 'YYYY-MM-DD HH:MM:SS' (écrits par le serveur)
+EPOCH_SQL = ("COALESCE(CASE WHEN typeof({col}) IN ('integer', 'real') THEN {col} "
+             "ELSE CAST(strftime('%s', {col}) AS INTEGER) END, :now)")
+
+BATCH_SQL = """
+INSERT INTO temp.trending_batch (software_id, score)
+SELECT software_id, SUM({weight} * pow(2.0, ({ts} - :epoch) / :half_life))
+FROM {table} WHERE {id_col} > :low AND {id_col} <= :high GROUP BY software_id
+"""
+
+# Ligne globale puis lignes par catégorie (mêmes scores)
+UPSERT_SQL = ("""
+INSERT INTO LogicielTrending (category_id, software_id, score)
+SELECT 0, software_id, score FROM temp.trending_batch WHERE true
+ON CONFLICT(category_id, software_id) DO UPDATE SET score = score + excluded.score
+""", """
+INSERT INTO LogicielTrending (category_id, software_id, score)
+SELECT lc.category_id, b.software_id, b.score
+FROM temp.trending_batch b JOIN LogicielCategorie lc ON lc.software_id = b.software_id WHERE true
+ON CONFLICT(category_id, software_id) DO UPDATE SET score = score + excluded.score
+""")
+
+
+def prepare(conn):
+    """Table de lot temporaire + pow() si SQLite est compilé sans fonctions mathématiques"""
+    try:
+        conn.execute("SELECT pow(2.0, 1)")
+    except sqlite3.OperationalError:
+        conn.create_function('pow', 2, math.pow, deterministic=True)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS trending_batch (software_id INTEGER PRIMARY KEY, score REAL)")
+
+
+def load_state(conn):
+    return dict(conn.execute("SELECT name, value FROM LogicielTrendingState"))
+
+
+def save_state(conn, **values):
+    conn.executemany("INSERT OR REPLACE INTO LogicielTrendingState (name, value) VALUES (?, ?)", values.items())
+
+
+def rebase(conn, state, now):
+    """Avance l'epoch à maintenant : scores multipliés par 2^(-Δ / demi-vie), les plus faibles supprimés"""
+    half_life = state['half_life']
+    if now - state['epoch'] < REBASE_HALF_LIVES * half_life:
+        return
+    factor = 2.0 ** (-(now - state['epoch']) / half_life)
+    with conn:
+        conn.execute("UPDATE LogicielTrending SET score = score * ?", (factor,))
+        removed = conn.execute("DELETE FROM LogicielTrending WHERE score < ?", (MIN_SCORE,)).rowcount
+        save_state(conn, epoch=now)
+    state['epoch'] = now
+    print(f"   ⏩ epoch avancé ({factor:.3g} ×), {removed:,} score(s) négligeable(s) supprimé(s)")
+
+
+def refresh_trending(conn, batch=BATCH_IDS, pause_ms=PAUSE_MS):
+    """Ajoute les événements au-delà des high-water marks ; renvoie le nombre de lignes sources lues"""
+    state = load_state(conn)
+    if 'epoch' not in state:
+        # Jamais calculé (ex: table créée par migrate_db.py)
+        return build_trending(conn, batch=batch, pause_ms=pause_ms)
+    prepare(conn)
+    now = int(time.time())
+    rebase(conn, state, now)
+
+    t0 = time.perf_counter()
+    total = 0
+    for table, (id_col, ts_col, weight) in SOURCES.items():
+        low = int(state.get(table, 0))
+        top = conn.execute(f"SELECT MAX({id_col}) FROM {table}").fetchone()[0] or 0
+        sql = BATCH_SQL.format(table=table, id_col=id_col, weight=weight, ts=EPOCH_SQL.format(col=ts_col))
+        rows = 0
+        while low < top:
+            high = min(low + batch, top)
+            with conn:
+                conn.execute("DELETE FROM temp.trending_batch")
+                conn.execute(sql, {'low': low, 'high': high, 'now': now,
+                                   'epoch': state['epoch'], 'half_life': state['half_life']})
+                for upsert in UPSERT_SQL:
+                    conn.execute(upsert)
+                save_state(conn, **{table: high})
+            rows += high - low
+            low = high
+            if low < top and pause_ms:
+                time.sleep(pause_ms / 1000)
+        if rows:
+            print(f"   📈 {table}: id ≤ {top:,} ({rows:,} id agrégé(s))")
+        total += rows
+    if not total:
+        print("   ⏭️  Aucun événement nouveau")
+    else:
+        count = conn.execute("SELECT COUNT(*) FROM LogicielTrending WHERE category_id = 0").fetchone()[0]
+        print(f"   📈 {count:,} logiciel(s) classé(s) en {time.perf_counter() - t0:.2f}s")
+    return total
+
+
+def build_trending(conn, half_life_days=HALF_LIFE_DAYS, batch=BATCH_IDS, pause_ms=PAUSE_MS):
+    """Recalcul complet : table vidée, epoch = maintenant, marques à zéro, puis refresh_trending()"""
+    with conn:
+        conn.execute("DELETE FROM LogicielTrending")
+        conn.execute("DELETE FROM LogicielTrendingState")
+        save_state(conn, epoch=int(time.time()), half_life=half_life_days * 86400,
+                   **{table: 0 for table in SOURCES})
+    return refresh_trending(conn, batch, pause_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logiciels tendance (décroissance exponentielle, incrémental)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite")
+    parser.add_argument('--full', action='store_true', help="Tout recalculer (obligatoire pour changer la demi-vie)")
+    parser.add_argument('--half-life-days', type=float, default=HALF_LIFE_DAYS,
+                        help=f"Demi-vie des événements avec --full (défaut {HALF_LIFE_DAYS} jours)")
+    parser.add_argument('--batch', type=int, default=BATCH_IDS, help=f"Id agrégés par transaction (défaut {BATCH_IDS:,})")
+    parser.add_argument('--pause-ms', type=int, default=PAUSE_MS, help="Pause entre deux lots")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(str(args.db), timeout=30)
+    try:
+        print(f"📈 Logiciels tendance ({args.db})")
+        if args.full:
+            build_trending(conn, args.half_life_days, args.batch, args.pause_ms)
+        else:
+            refresh_trending(conn, args.batch, args.pause_ms)
+    finally:
+        conn.close()
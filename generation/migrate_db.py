@@ -0,0 +1,265 @@
+import argparse
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+# Migration non destructive : on compare la DB en place (sqlite_master + PRAGMA table_info)
+# au schéma de référence (le DDL de generate_db exécuté dans une base :memory:) et on
+# n'applique que le DDL nécessaire, dans UNE transaction.
+#   - table absente            → CREATE
+#   - colonnes ajoutées en fin → ALTER TABLE ADD COLUMN (instantané, sans recopie)
+#   - tout autre changement    → reconstruction en 12 étapes (https://sqlite.org/lang_altertable.html)
+#   - index/trigger/vue absent ou différent → (DROP +) CREATE
+# Les objets présents uniquement dans la DB (tables d'import, index ajoutés à la main) sont conservés.
+
+TABLE_CONSTRAINTS = ('primary key', 'foreign key', 'unique', 'check', 'constraint')
+# Tables internes des tables virtuelles FTS5 et R*Tree
+VIRTUAL_SHADOWS = ('_data', '_idx', '_docsize', '_config', '_content', '_node', '_rowid', '_parent')
+
+
+def normalize_sql(sql):
+    """Compare deux DDL sans tenir compte des commentaires, espaces et de la casse"""
+    sql = re.sub(r'--[^\n]*', '', sql or '')
+    return re.sub(r'\s+', ' ', sql).strip().lower()
+
+
+def split_top_level(body):
+    """Découpe 'a INT, b TEXT CHECK(b IN (1, 2)), ...' sur les virgules hors parenthèses/quotes"""
+    parts, depth, quote, current = [], 0, None, ''
+    for char in body:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"`[":
+            quote = ']' if char == '[' else char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return [normalize_sql(p) for p in parts if p.strip()]
+
+
+def parse_table(sql):
+    """CREATE TABLE → ([(colonne, définition)], {contraintes de table})"""
+    sql = re.sub(r'--[^\n]*', '', sql)
+    body = sql[sql.index('(') + 1:sql.rindex(')')]
+    columns, constraints = [], set()
+    for item in split_top_level(body):
+        if item.startswith(TABLE_CONSTRAINTS):
+            constraints.add(item)
+        else:
+            columns.append((item.split()[0].strip('"`[]'), item))
+    return columns, constraints
+
+
+def can_add_column(definition):
+    """Restrictions de ALTER TABLE ADD COLUMN (sinon reconstruction)"""
+    if re.search(r'\b(primary key|unique|generated always)\b|\bas \(', definition):
+        return False
+    default = re.search(r'\bdefault\s+(\S+)', definition)
+    if default and (default.group(1).startswith(('(', 'current_'))):
+        return False
+    if 'not null' in definition and (not default or default.group(1) == 'null'):
+        return False
+    return not ('references' in definition and default and default.group(1) != 'null')
+
+
+def schema_objects(conn):
+    """{(type, nom): (table, sql)} hors objets internes sqlite_* et tables fantômes FTS5/R*Tree"""
+    rows = conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master "
+                        "WHERE name NOT LIKE 'sqlite_%' AND sql IS NOT NULL").fetchall()
+    virtual = {name for kind, name, _, sql in rows if kind == 'table' and sql.upper().startswith('CREATE VIRTUAL')}
+    return {(kind, name): (table, sql) for kind, name, table, sql in rows
+            if not any(name == v + suffix for v in virtual for suffix in VIRTUAL_SHADOWS)}
+
+
+def reference_objects(ddl):
+    """Objets du schéma cible : DDL exécuté dans une base vierge en mémoire"""
+    ref = sqlite3.connect(':memory:')
+    try:
+        ref.executescript(ddl)
+        return schema_objects(ref)
+    finally:
+        ref.close()
+
+
+def is_virtual(sql):
+    return sql.upper().startswith('CREATE VIRTUAL')
+
+
+def table_change(live_sql, ref_sql):
+    """None (identique à l'ordre des colonnes près), ('add', [définitions]) ou ('rebuild', raison)"""
+    live_cols, live_cons = parse_table(live_sql)
+    ref_cols, ref_cons = parse_table(ref_sql)
+    live_defs, ref_defs = dict(live_cols), dict(ref_cols)
+    if live_defs == ref_defs and live_cons == ref_cons:
+        return None
+    added = [d for c, d in ref_cols if c not in live_defs]
+    unchanged = all(ref_defs.get(c) == d for c, d in live_cols)
+    if live_cons == ref_cons and unchanged and all(can_add_column(d) for d in added):
+        return 'add', added
+    reasons = ([f"-{c}" for c in live_defs if c not in ref_defs] + [f"+{c}" for c in ref_defs if c not in live_defs]
+               + [f"~{c}" for c in live_defs if c in ref_defs and live_defs[c] != ref_defs[c]])
+    if live_cons != ref_cons:
+        reasons.append('contraintes de table')
+    return 'rebuild', ', '.join(reasons)
+
+
+def plan_migration(conn, ddl):
+    """Liste ordonnée des étapes (action, type, nom, sql, note) pour amener conn au schéma ddl"""
+    live = schema_objects(conn)
+    ref = reference_objects(ddl)
+    steps = []
+    rebuilt = set()
+
+    # 1. Tables (ordre du DDL : parents avant enfants)
+    for (kind, name), (_, sql) in ref.items():
+        if kind != 'table':
+            continue
+        if (kind, name) not in live:
+            steps.append(('create', kind, name, sql, ''))
+        elif is_virtual(sql):
+            if normalize_sql(live[(kind, name)][1]) != normalize_sql(sql):
+                steps.append(('recreate', kind, name, sql, ''))
+        else:
+            change = table_change(live[(kind, name)][1], sql)
+            if change and change[0] == 'add':
+                steps.extend(('add_column', kind, name, d, d) for d in change[1])
+            elif change:
+                steps.append(('rebuild', kind, name, sql, change[1]))
+                rebuilt.add(name)
+
+    # 2. Index, triggers, vues : absents, modifiés ou supprimés par une reconstruction
+    for (kind, name), (table, sql) in ref.items():
+        if kind == 'table':
+            continue
+        current = live.get((kind, name))
+        if current is None or table in rebuilt:
+            steps.append(('create', kind, name, sql, ''))
+        elif normalize_sql(current[1]) != normalize_sql(sql):
+            steps.append(('recreate', kind, name, sql, ''))
+
+    # 3. Objets propres à la DB (index du conseiller, tables d'import...) → conservés
+    extra = sorted(f"{kind} {name}" for (kind, name) in live if (kind, name) not in ref)
+    return steps, extra, ref
+
+
+def rebuild_table(conn, name, sql, live):
+    """Reconstruction en 12 étapes : new_X ← copie des colonnes communes, DROP X, RENAME new_X → X"""
+    tmp = f"_new_{name}"
+    common = [c[1] for c in conn.execute(f"PRAGMA table_info({name})")]
+    conn.execute(re.sub(rf'(CREATE TABLE\s+(IF NOT EXISTS\s+)?)"?{name}"?', rf'\g<1>"{tmp}"', sql, count=1))
+    target = {c[1] for c in conn.execute(f"PRAGMA table_info({tmp})")}
+    cols = ', '.join(c for c in common if c in target)
+    conn.execute(f'INSERT INTO "{tmp}" ({cols}) SELECT {cols} FROM "{name}"')
+    # Index/triggers hors référence attachés à la table (recréés après si encore valides)
+    own = [(kind, obj, s) for (kind, obj), (table, s) in live.items() if table == name and kind != 'table']
+    conn.execute(f'DROP TABLE "{name}"')
+    conn.execute(f'ALTER TABLE "{tmp}" RENAME TO "{name}"')
+    return own
+
+
+def statements(script):
+    """Découpe un script SQL en instructions (executescript validerait la transaction en cours)"""
+    current = ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            yield current.strip()
+            current = ''
+
+
+def migrate(db_path, ddl, version, dry_run=False, backfill=None):
+    """Applique le DDL manquant à db_path (une transaction) puis PRAGMA user_version = version
+    backfill : {table: script SQL} exécuté quand la migration (re)crée la table (tables dérivées)"""
+    backfill = backfill or {}
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        if current > version:
+            raise RuntimeError(f"Schéma de la DB (v{current}) plus récent que le code (v{version})")
+
+        steps, extra, ref = plan_migration(conn, ddl)
+        print(f"🧭 Schéma v{current} → v{version}: {len(steps)} étape(s)")
+        for action, kind, name, _, note in steps:
+            print(f"   • {action:<10} {kind:<7} {name} {note}")
+        if extra:
+            print(f"   ℹ️  Conservés (hors schéma): {', '.join(extra)}")
+        if dry_run or (not steps and current == version):
+            if not steps:
+                print("✅ Schéma à jour")
+            return steps
+
+        t0 = time.perf_counter()
+        live = schema_objects(conn)
+        fk = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+        # Étapes 1-2 : FK désactivées hors transaction ; RENAME sans réécriture des triggers des autres tables
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("PRAGMA legacy_alter_table=ON")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            orphans, fts_rebuild = [], set()
+            for action, kind, name, detail, _ in steps:
+                if action == 'add_column':
+                    conn.execute(f'ALTER TABLE "{name}" ADD COLUMN {detail}')
+                elif action == 'rebuild':
+                    orphans += rebuild_table(conn, name, detail, live)
+                    fts_rebuild.update(v for (k, v), (_, s) in ref.items()
+                                       if k == 'table' and is_virtual(s) and f"content='{name.lower()}'" in s.lower())
+                elif action == 'recreate':
+                    conn.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+                    conn.execute(detail)
+                else:
+                    conn.execute(detail)
+                if kind == 'table' and 'fts5' in detail.lower() and action in ('create', 'recreate'):
+                    fts_rebuild.add(name)
+
+            for kind, name, sql in orphans:
+                if (kind, name) in ref:
+                    continue
+                try:
+                    conn.execute(sql)
+                except sqlite3.OperationalError as e:
+                    print(f"   ⚠️ {kind} {name} non recréé: {e}")
+            for fts in fts_rebuild:
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            for action, kind, name, _, _ in steps:
+                if action in ('create', 'recreate') and kind == 'table' and name in backfill:
+                    for sql in statements(backfill[name]):
+                        conn.execute(sql)
+
+            # Étape 10 : contrôle des clés étrangères des seules tables reconstruites
+            rebuilt = [name for action, _, name, _, _ in steps if action == 'rebuild']
+            violations = [v for name in rebuilt for v in conn.execute(f'PRAGMA foreign_key_check("{name}")')]
+            if violations:
+                raise sqlite3.IntegrityError(f"{len(violations)} violation(s) de clé étrangère, ex: {violations[0]}")
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("PRAGMA legacy_alter_table=OFF")
+            conn.execute(f"PRAGMA foreign_keys={'ON' if fk else 'OFF'}")
+
+        conn.execute("PRAGMA optimize")
+        print(f"✅ Migration v{version} appliquée en {time.perf_counter() - t0:.2f}s")
+        return steps
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    from generate_db import BACKFILL_SQL, DB_PATH, SCHEMA_VERSION, schema_ddl
+
+    parser = argparse.ArgumentParser(description="Migration non destructive de la DB vers le schéma de generate_db.py")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite à migrer")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher les étapes sans rien modifier")
+    args = parser.parse_args()
+    migrate(args.db, schema_ddl(), SCHEMA_VERSION, args.dry_run, BACKFILL_SQL)
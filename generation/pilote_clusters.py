@@ -0,0 +1,209 @@
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+
+from generate_db import CLUSTER_CELL_BITS, CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, DB_PATH
+
+# Pyramide de clusters de la carte des pilotes :
+#   - niveau le plus fin (CLUSTER_MAX_ZOOM) binné depuis les points avec NumPy
+#   - chaque niveau plus grossier = fusion des 4 cellules filles (tile >> 1), sans relire les points
+#   - incrémental : seules les cellules des points de PiloteClusterDirty (triggers sur Pilote) sont recalculées
+
+MAX_LAT = 85.05112878  # limite Web Mercator
+FULL_REBUILD_RATIO = 0.2  # au-delà de 20 % de points modifiés, reconstruction complète
+
+UPSERT_SQL = """
+INSERT INTO PiloteCluster (zoom, tile_x, tile_y, nb, lat, lon, types, sample_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(zoom, tile_x, tile_y) DO UPDATE SET
+    nb = excluded.nb, lat = excluded.lat, lon = excluded.lon, types = excluded.types, sample_id = excluded.sample_id
+"""
+
+
+def mercator(lat, lon):
+    """Coordonnées Web Mercator normalisées x, y ∈ [0, 1) (y vers le sud)"""
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0
+    return x, y
+
+
+def cells(x, y, zoom):
+    """Indices de cellule (tile_x, tile_y) du niveau zoom"""
+    n = 1 << (zoom + CLUSTER_CELL_BITS)
+    return (np.clip(np.floor(x * n), 0, n - 1).astype(np.int64),
+            np.clip(np.floor(y * n), 0, n - 1).astype(np.int64))
+
+
+def cell_bounds(zoom, tile_x, tile_y):
+    """(min_lat, min_lon, max_lat, max_lon) d'une cellule"""
+    n = 1 << (zoom + CLUSTER_CELL_BITS)
+    lon = lambda tx: tx / n * 360.0 - 180.0
+    lat = lambda ty: float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ty / n)))))
+    return lat(tile_y + 1), lon(tile_x), lat(tile_y), lon(tile_x + 1)
+
+
+def read_points(conn, where='', params=()):
+    """ids, lat, lon, codes de type (+ libellés) des pilotes géolocalisés"""
+    rows = conn.execute(f"SELECT rowid, latitude, longitude, COALESCE(type, '') FROM Pilote "
+                        f"WHERE latitude IS NOT NULL AND longitude IS NOT NULL {where}", params).fetchall()
+    if not rows:
+        return None
+    ids, lat, lon, kinds = zip(*rows)
+    labels, codes = np.unique(np.array(kinds, dtype=object).astype(str), return_inverse=True)
+    return np.array(ids, dtype=np.int64), np.array(lat), np.array(lon), codes, list(labels)
+
+
+def aggregate(keys, nb, sum_lat, sum_lon, by_type, sample):
+    """Regroupe des cellules/points par clé : sommes + échantillon (id du seul point si nb == 1)"""
+    uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    size = len(uniq)
+    total = np.bincount(inverse, weights=nb, minlength=size)
+    return (uniq, total,
+            np.bincount(inverse, weights=sum_lat, minlength=size),
+            np.bincount(inverse, weights=sum_lon, minlength=size),
+            np.stack([np.bincount(inverse, weights=col, minlength=size) for col in by_type]),
+            np.where(total == 1, sample[first], -1))
+
+
+def cluster_rows(zoom, level, labels):
+    """Lignes PiloteCluster d'un niveau agrégé"""
+    keys, nb, sum_lat, sum_lon, by_type, sample = level
+    shift = zoom + CLUSTER_CELL_BITS
+    for i in range(len(keys)):
+        types = {labels[t]: int(by_type[t, i]) for t in range(len(labels)) if by_type[t, i] and labels[t]}
+        yield (zoom, int(keys[i] >> shift), int(keys[i] & ((1 << shift) - 1)), int(nb[i]),
+               sum_lat[i] / nb[i], sum_lon[i] / nb[i], json.dumps(types, sort_keys=True),
+               int(sample[i]) if sample[i] >= 0 else None)
+
+
+def pyramid_level(points, zoom):
+    """Niveau zoom agrégé directement depuis des points"""
+    ids, lat, lon, codes, labels = points
+    tx, ty = cells(*mercator(lat, lon), zoom)
+    one_hot = [(codes == t).astype(np.float64) for t in range(len(labels))]
+    return aggregate((tx << (zoom + CLUSTER_CELL_BITS)) | ty, np.ones(len(ids)), lat, lon, one_hot, ids)
+
+
+def pyramid(points):
+    """{zoom: niveau agrégé} du plus fin au plus grossier"""
+    level = pyramid_level(points, CLUSTER_MAX_ZOOM)
+    levels = {CLUSTER_MAX_ZOOM: level}
+    for zoom in range(CLUSTER_MAX_ZOOM - 1, CLUSTER_MIN_ZOOM - 1, -1):
+        keys, nb, sum_lat, sum_lon, by_type, sample = level
+        child_shift = zoom + 1 + CLUSTER_CELL_BITS
+        cx, cy = keys >> child_shift, keys & ((1 << child_shift) - 1)
+        parents = ((cx >> 1) << (child_shift - 1)) | (cy >> 1)
+        level = aggregate(parents, nb, sum_lat, sum_lon, by_type, sample)
+        levels[zoom] = level
+    return levels
+
+
+def build_clusters(conn):
+    """Reconstruction complète de la pyramide (dans la transaction de l'appelant)"""
+    t0 = time.perf_counter()
+    conn.execute("DELETE FROM PiloteCluster")
+    conn.execute("DELETE FROM PiloteClusterDirty")
+    points = read_points(conn)
+    if points is None:
+        return 0
+    total = 0
+    for zoom, level in pyramid(points).items():
+        conn.executemany(UPSERT_SQL, cluster_rows(zoom, level, points[4]))
+        total += len(level[0])
+    print(f"   📍 {total:,} cellules ({len(points[0]):,} points, zooms {CLUSTER_MIN_ZOOM}-{CLUSTER_MAX_ZOOM}) "
+          f"en {time.perf_counter() - t0:.2f}s")
+    return total
+
+
+def recompute_finest(conn, tiles, has_geo):
+    """Recalcule les cellules du niveau le plus fin depuis les points (R*Tree si disponible)"""
+    zoom = CLUSTER_MAX_ZOOM
+    for tile_x, tile_y in tiles:
+        min_lat, min_lon, max_lat, max_lon = cell_bounds(zoom, tile_x, tile_y)
+        if has_geo:
+            where = ("AND rowid IN (SELECT id FROM Pilote_geo WHERE max_lat >= ? AND min_lat <= ? "
+                     "AND max_lon >= ? AND min_lon <= ?)")
+        else:
+            where = "AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+        pad = 1e-6  # float32 du R*Tree / bords de cellule → filtre exact ci-dessous
+        points = read_points(conn, where, (min_lat - pad, max_lat + pad, min_lon - pad, max_lon + pad))
+        if points is not None:
+            ids, lat, lon, codes, labels = points
+            tx, ty = cells(*mercator(lat, lon), zoom)
+            keep = (tx == tile_x) & (ty == tile_y)
+            points = (ids[keep], lat[keep], lon[keep], codes[keep], labels) if keep.any() else None
+        if points is None:
+            conn.execute("DELETE FROM PiloteCluster WHERE zoom = ? AND tile_x = ? AND tile_y = ?",
+                         (zoom, tile_x, tile_y))
+            continue
+        conn.executemany(UPSERT_SQL, cluster_rows(zoom, pyramid_level(points, zoom), points[4]))
+
+
+def recompute_parent(conn, zoom, tile_x, tile_y):
+    """Cellule parente = fusion de ses 4 filles du niveau zoom + 1"""
+    children = conn.execute("""SELECT nb, lat, lon, types, sample_id FROM PiloteCluster
+                               WHERE zoom = ? AND tile_x BETWEEN ? AND ? AND tile_y BETWEEN ? AND ?""",
+                            (zoom + 1, 2 * tile_x, 2 * tile_x + 1, 2 * tile_y, 2 * tile_y + 1)).fetchall()
+    if not children:
+        conn.execute("DELETE FROM PiloteCluster WHERE zoom = ? AND tile_x = ? AND tile_y = ?", (zoom, tile_x, tile_y))
+        return
+    nb = sum(c[0] for c in children)
+    types = {}
+    for child in children:
+        for kind, count in json.loads(child[3]).items():
+            types[kind] = types.get(kind, 0) + count
+    conn.execute(UPSERT_SQL, (zoom, tile_x, tile_y, nb,
+                              sum(c[0] * c[1] for c in children) / nb, sum(c[0] * c[2] for c in children) / nb,
+                              json.dumps(types, sort_keys=True), children[0][4] if nb == 1 else None))
+
+
+def refresh_clusters(conn):
+    """Recalcule seulement les cellules touchées par PiloteClusterDirty (ou tout si trop de changements)"""
+    last, pending = conn.execute("SELECT MAX(dirty_id), COUNT(*) FROM PiloteClusterDirty").fetchone()
+    if not conn.execute("SELECT 1 FROM PiloteCluster LIMIT 1").fetchone():
+        # Pyramide jamais construite (ex: table créée par migrate_db.py)
+        return build_clusters(conn)
+    if not pending:
+        return 0
+    geolocated = conn.execute("SELECT COUNT(*) FROM Pilote WHERE latitude IS NOT NULL").fetchone()[0]
+    if pending > FULL_REBUILD_RATIO * max(geolocated, 1):
+        print(f"   ♻️  {pending:,} point(s) modifié(s) → reconstruction complète")
+        return build_clusters(conn)
+
+    t0 = time.perf_counter()
+    dirty = np.array(conn.execute("SELECT latitude, longitude FROM PiloteClusterDirty WHERE dirty_id <= ?",
+                                  (last,)).fetchall())
+    x, y = mercator(dirty[:, 0], dirty[:, 1])
+    has_geo = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'Pilote_geo'").fetchone() is not None
+    tx, ty = cells(x, y, CLUSTER_MAX_ZOOM)
+    tiles = sorted(set(zip(tx.tolist(), ty.tolist())))
+    recompute_finest(conn, tiles, has_geo)
+    touched = len(tiles)
+    for zoom in range(CLUSTER_MAX_ZOOM - 1, CLUSTER_MIN_ZOOM - 1, -1):
+        tiles = sorted({(tile_x >> 1, tile_y >> 1) for tile_x, tile_y in tiles})
+        for tile_x, tile_y in tiles:
+            recompute_parent(conn, zoom, tile_x, tile_y)
+        touched += len(tiles)
+    conn.execute("DELETE FROM PiloteClusterDirty WHERE dirty_id <= ?", (last,))
+    print(f"   📍 {pending:,} point(s) modifié(s) → {touched:,} cellule(s) recalculée(s) "
+          f"en {time.perf_counter() - t0:.3f}s")
+    return touched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pyramide de clusters de la carte des pilotes (PiloteCluster)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite")
+    parser.add_argument('--full', action='store_true', help="Reconstruire toute la pyramide")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(str(args.db), timeout=30)
+    try:
+        with conn:
+            print(f"🗺️  Clusters Pilote ({args.db})")
+            build_clusters(conn) if args.full else refresh_clusters(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,143 @@
+import sqlite3
+
+from generate_models import INTERNAL_TABLES, detect_fts, detect_geo, is_virtual_or_shadow, list_virtual_tables
+
+# Formes de requêtes émises par les models générés (generate_models.py) et GenericController.
+# Chaque forme : label, table, sql, params + colonnes filtrées par égalité (eq) et triées (order),
+# utilisées par l'index advisor pour proposer un index (eq..., order...).
+
+# Chemins chauds des controllers/vues : (table, colonnes en égalité, tri, select)
+HOT_PATHS = [
+    ('Avis', ('software_id',), ('created_at DESC',), '*'),
+    ('Avis', ('user_id',), ('created_at DESC',), '*'),
+    ('Favori', ('user_id',), ('added_at DESC',), '*'),
+    ('Favori', ('software_id',), (), 'COUNT(*)'),
+    ('Historique', ('user_id',), ('viewed_at DESC',), '*'),
+    ('Historique', ('software_id',), ('viewed_at DESC',), '*'),
+    ('LogicielTag', ('tag_id',), (), 'software_id'),
+    ('LogicielCategorie', ('category_id',), (), 'software_id'),
+    ('Pilote', ('type',), ('nom',), '*'),
+]
+
+
+def base_tables(conn):
+    """Tables applicatives (hors sqlite_*, FTS5 et tables techniques)"""
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    virtual = list_virtual_tables(conn.cursor())
+    return [n for n in names if n not in INTERNAL_TABLES and not is_virtual_or_shadow(n, virtual)]
+
+
+def table_columns(conn, table):
+    return [col[1] for col in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def primary_key(conn, table):
+    cols = [col for col in conn.execute(f"PRAGMA table_info({table})") if col[5]]
+    return cols[0][1] if len(cols) == 1 else 'rowid'
+
+
+def sample_value(conn, table, column):
+    """Valeur représentative (milieu de plage) pour lier les paramètres '?'"""
+    row = conn.execute(f"SELECT {column} FROM {table} WHERE rowid >= "
+                       f"(SELECT (MIN(rowid) + MAX(rowid)) / 2 FROM {table}) LIMIT 1").fetchone()
+    return row[0] if row else None
+
+
+def shape(label, table, sql, params=(), eq=(), order=(), select='*'):
+    return {'label': label, 'table': table, 'sql': sql, 'params': list(params),
+            'eq': tuple(eq), 'order': tuple(order), 'select': select}
+
+
+def model_shapes(conn, table, fts=None, deep_offset=100_000, counted=False):
+    """Requêtes d'un model généré + de GenericController sur une table (fts = (table_fts, colonnes),
+    counted = compteur table_stats disponible)"""
+    pk = primary_key(conn, table)
+    columns = table_columns(conn, table)
+    mid = sample_value(conn, table, pk)
+    shapes = [
+        shape(f"{table}.count", table, f"SELECT COUNT(*) as count FROM {table}", select='COUNT(*)')
+        if not counted else
+        shape(f"{table}.count(table_stats)", 'table_stats',
+              "SELECT row_count as count FROM table_stats WHERE table_name = ? AND bucket = '*'", (table,),
+              eq=('table_name', 'bucket'), select='row_count'),
+        shape(f"{table}.findAll", table, f"SELECT * FROM {table} LIMIT ? OFFSET ?", (50, 0)),
+        shape(f"{table}.findAll(offset={deep_offset:,})", table,
+              f"SELECT * FROM {table} LIMIT ? OFFSET ?", (50, deep_offset)),
+        shape(f"{table}.findById", table, f"SELECT * FROM {table} WHERE {pk} = ?", (mid,), eq=(pk,)),
+        shape(f"{table}.recent", table, f"SELECT * FROM {table} ORDER BY rowid DESC LIMIT ?", (5,)),
+    ]
+    if 'created_at' in columns:
+        shapes.append(shape(f"{table}.topByField(created_at)", table,
+                            f"SELECT * FROM {table} ORDER BY created_at DESC LIMIT ?", (10,),
+                            order=('created_at DESC',)))
+    if fts:
+        fts_table, fts_cols = fts
+        weights = ', '.join(['10.0'] + ['1.0'] * (len(fts_cols) - 1))
+        shapes.append(shape(f"{table}.search(FTS5)", table,
+                            f"SELECT t.* FROM {fts_table} JOIN {table} t ON t.{pk} = {fts_table}.rowid "
+                            f"WHERE {fts_table} MATCH ? ORDER BY bm25({fts_table}, {weights}) LIMIT ?",
+                            ('"lyc"*', 20)))
+    if 'nom' in columns:
+        like_cols = [c for c in ('nom', 'description') if c in columns]
+        where = ' OR '.join(f"{c} LIKE ?" for c in like_cols)
+        shapes.append(shape(f"{table}.search(LIKE)", table,
+                            f"SELECT * FROM {table} WHERE {where} LIMIT ?",
+                            ['%lyc%'] * len(like_cols) + [20]))
+        shapes.append(shape(f"{table}.getPaginated(sort=nom)", table,
+                            f"SELECT * FROM {table} WHERE 1=1 ORDER BY nom ASC LIMIT ? OFFSET ?", (20, 0),
+                            order=('nom ASC',)))
+    return shapes
+
+
+def hot_path_shapes(conn, tables):
+    shapes = []
+    for table, eq, order, select in HOT_PATHS:
+        if table not in tables:
+            continue
+        where = ' AND '.join(f"{c} = ?" for c in eq)
+        order_sql = f" ORDER BY {', '.join(order)}" if order else ''
+        limit = ' LIMIT 20' if select == '*' else ''
+        params = [sample_value(conn, table, c) for c in eq]
+        label = f"{table}[{', '.join(eq)}]" + (f" ↓{order[0].split()[0]}" if order else '')
+        shapes.append(shape(label, table, f"SELECT {select} FROM {table} WHERE {where}{order_sql}{limit}",
+                            params, eq=eq, order=order, select=select))
+    return shapes
+
+
+def geo_shapes(conn, tables):
+    """findInBBox() des models avec index R*Tree {table}_geo (zone ~ un département)"""
+    shapes = []
+    for table, geo in detect_geo(conn.cursor()).items():
+        if table not in tables:
+            continue
+        pk = primary_key(conn, table)
+        lat, lon = 45.76, 4.84
+        box = (lat - 0.5, lat + 0.5, lon - 0.7, lon + 0.7)
+        shapes.append(shape(f"{table}.findInBBox", table,
+                            f"SELECT t.* FROM {geo} g JOIN {table} t ON t.{pk} = g.id "
+                            f"WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ? "
+                            f"AND t.latitude BETWEEN ? AND ? AND t.longitude BETWEEN ? AND ? LIMIT ?",
+                            box + box + (500,)))
+    return shapes
+
+
+def query_shapes(conn, deep_offset=100_000):
+    """Toutes les formes de requêtes à analyser/rejouer pour la DB conn"""
+    tables = base_tables(conn)
+    fts = detect_fts(conn.cursor())
+    counted = {row[0][:-len('_stats_ai')] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE '%\\_stats\\_ai' ESCAPE '\\'")}
+    shapes = []
+    for table in tables:
+        shapes.extend(model_shapes(conn, table, fts.get(table), deep_offset, table in counted))
+    shapes.extend(hot_path_shapes(conn, tables))
+    shapes.extend(geo_shapes(conn, tables))
+    return shapes
+
+
+if __name__ == "__main__":
+    import sys
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else '../serveur/database.db')
+    for s in query_shapes(conn):
+        print(f"{s['label']:<40} {s['sql']}")
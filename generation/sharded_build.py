@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+from synthetic_data import (CHUNK_ROWS, LOADERS, UNIQUE_PAIR_TABLES, bulk_insert, chunk_count,
+                            plan_synthetic, rows_for, tune_bulk_load)
+
+
+def split_tasks(plans, seed, workers, shard_dir, schema_sql):
+    """Découpe chaque table en tâches alignées sur les blocs RNG (1 shard SQLite par tâche)"""
+    tasks = []
+    for plan in plans:
+        chunks = chunk_count(plan)
+        per_task = max(1, -(-chunks // workers))
+        for chunk_lo in range(0, chunks, per_task):
+            chunk_hi = min(chunk_lo + per_task, chunks)
+            shard = Path(shard_dir) / f"{plan['table']}_{chunk_lo:05d}.db"
+            tasks.append((plan, seed, chunk_lo, chunk_hi, str(shard), schema_sql))
+    # Les plus grosses tâches d'abord → meilleur équilibrage du pool
+    tasks.sort(key=lambda t: min((t[3] - t[2]) * CHUNK_ROWS, t[0]['total']), reverse=True)
+    return tasks
+
+
+def build_shard(task):
+    """Worker : génère une tranche de table dans son propre fichier shard"""
+    plan, seed, chunk_lo, chunk_hi, shard_path, schema_sql = task
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(shard_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    tune_bulk_load(conn)
+    conn.executescript(schema_sql)
+    rows = bulk_insert(conn, LOADERS[plan['table']][1], rows_for(plan, seed, chunk_lo, chunk_hi))
+    conn.close()
+    return plan['table'], chunk_lo, shard_path, rows, time.perf_counter() - t0
+
+
+def merge_shard(conn, table, shard_path):
+    """ATTACH + INSERT ... SELECT d'un shard dans la DB principale"""
+    columns = ', '.join(col[1] for col in conn.execute(f"PRAGMA table_info({table})"))
+    verb = 'INSERT OR IGNORE' if table in UNIQUE_PAIR_TABLES else 'INSERT'
+    conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+    try:
+        with conn:
+            conn.execute(f"{verb} INTO main.{table} ({columns}) SELECT {columns} FROM shard.{table}")
+    finally:
+        conn.execute("DETACH DATABASE shard")
+    os.remove(shard_path)
+
+
+def load_synthetic_sharded(conn, db_path, sizes, seed, workers, schema_sql):
+    """Génère les tables en parallèle (1 process par shard) puis fusionne dans conn"""
+    tune_bulk_load(conn)
+    plans = plan_synthetic(conn, sizes, seed)
+    order = [plan['table'] for plan in plans]
+
+    shard_dir = Path(db_path).parent / f".shards_{Path(db_path).stem}"
+    shard_dir.mkdir(exist_ok=True)
+    tasks = split_tasks(plans, seed, workers, shard_dir, schema_sql)
+    print(f"   🧩 {len(tasks)} shard(s) sur {workers} worker(s) → {shard_dir}")
+
+    t0 = time.perf_counter()
+    done = []
+    with Pool(workers) as pool:
+        for table, chunk_lo, shard_path, rows, elapsed in pool.imap_unordered(build_shard, tasks):
+            print(f"   ✓ shard {Path(shard_path).name}: {rows:,} lignes en {elapsed:.1f}s")
+            done.append((order.index(table), chunk_lo, table, shard_path))
+    generation = time.perf_counter() - t0
+
+    # Fusion dans l'ordre parents → enfants et ids croissants (ajouts en fin de b-tree)
+    t0 = time.perf_counter()
+    for _, _, table, shard_path in sorted(done):
+        merge_shard(conn, table, shard_path)
+    merge = time.perf_counter() - t0
+    shard_dir.rmdir()
+    print(f"   🔀 Fusion des shards: {merge:.1f}s")
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return {'generation': generation, 'merge': merge}
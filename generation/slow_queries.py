@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import json
+import random
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from generate_db import DB_PATH
+from index_advisor import explain, plan_flags
+
+# Analyse des journaux NDJSON écrits par connection.js (NIRD_QUERY_LOG=chemin node src/app.js)
+#   une ligne = { ts, table, sql, params, ms, rows, error? } ; les fichiers sont lus en flux (.gz accepté)
+# Regroupe par modèle de requête normalisé, classe par temps total et joint EXPLAIN QUERY PLAN.
+
+TOP = 20
+RESERVOIR = 1000  # échantillons de durée gardés par modèle pour les percentiles
+
+SORT_LABELS = {'total': 'temps cumulé', 'mean': 'durée moyenne', 'max': 'durée max', 'count': "nombre d'appels"}
+SORTS = {
+    'total': lambda g: g['total_ms'],
+    'mean': lambda g: g['total_ms'] / g['count'],
+    'max': lambda g: g['max_ms'],
+    'count': lambda g: g['count'],
+}
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+VALUES_RE = re.compile(r"(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+
+def normalize(sql):
+    """Modèle de requête : littéraux → ?, listes IN (?, ?, ...) et VALUES multi-lignes repliées
+    (createMany/deleteMany d'un lot de 10 ou de 500 lignes = même modèle)"""
+    sql = ' '.join(sql.split())
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (?, ...)', sql)
+    return VALUES_RE.sub(r'\1, ...', sql)
+
+
+def open_log(path):
+    if str(path) == '-':
+        return sys.stdin
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_events(paths):
+    """Événements des journaux, ligne par ligne (lignes tronquées ou invalides ignorées)"""
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(event, dict) and 'sql' in event and 'ms' in event:
+                    yield event
+
+
+def aggregate(events, since=None):
+    """{modèle: stats} en un passage ; durées échantillonnées (réservoir) pour p50/p95"""
+    rng = random.Random(0)
+    groups = {}
+    for event in events:
+        if since and event.get('ts', 0) < since:
+            continue
+        key = normalize(event['sql'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'template': key, 'sql': event['sql'], 'params': event.get('params', 0),
+                                   'tables': set(), 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                   'rows': 0, 'errors': 0, 'samples': []}
+        ms = float(event['ms'])
+        group['count'] += 1
+        group['total_ms'] += ms
+        group['max_ms'] = max(group['max_ms'], ms)
+        group['rows'] += event.get('rows') or 0
+        group['errors'] += 1 if event.get('error') else 0
+        if event.get('table'):
+            group['tables'].add(event['table'])
+        samples = group['samples']
+        if len(samples) < RESERVOIR:
+            samples.append(ms)
+        else:
+            slot = rng.randrange(group['count'])
+            if slot < RESERVOIR:
+                samples[slot] = ms
+    return groups
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))] if samples else 0.0
+
+
+def attach_plans(conn, groups):
+    """EXPLAIN QUERY PLAN de la requête d'origine (paramètres liés à NULL : seule la forme compte)"""
+    for group in groups:
+        try:
+            group['plan'] = explain(conn, group['sql'], [None] * group['params'])
+            # VALUES multi-lignes = « SCAN n CONSTANT ROWS » : pas un parcours de table
+            group['flags'] = [f for f in plan_flags(group['plan'], group['sql']) if 'CONSTANT ROWS' not in f]
+        except sqlite3.Error as e:
+            group['plan'], group['flags'] = [], [f"EXPLAIN impossible: {e}"]
+
+
+def report(groups, top=TOP, sort='total'):
+    ranked = sorted(groups.values(), key=SORTS[sort], reverse=True)[:top]
+    total = sum(g['total_ms'] for g in groups.values()) or 1.0
+    return [{
+        'template': g['template'], 'sql': g['sql'], 'tables': sorted(g['tables']),
+        'count': g['count'], 'total_ms': round(g['total_ms'], 3), 'share': round(g['total_ms'] / total, 4),
+        'mean_ms': round(g['total_ms'] / g['count'], 3), 'p50_ms': round(percentile(g['samples'], 50), 3),
+        'p95_ms': round(percentile(g['samples'], 95), 3), 'max_ms': round(g['max_ms'], 3),
+        'rows_per_call': round(g['rows'] / g['count'], 1), 'errors': g['errors'], 'params': g['params'],
+    } for g in ranked]
+
+
+def print_report(entries, events, templates, sort='total'):
+    print(f"🐢 {events:,} requête(s), {templates:,} modèle(s) — top {len(entries)} par {SORT_LABELS[sort]}\n")
+    for n, e in enumerate(entries, 1):
+        print(f"{n:>3}. {e['total_ms']:>10.1f} ms ({e['share']:.1%})  ×{e['count']:,}  "
+              f"moy {e['mean_ms']:.3f}  p95 {e['p95_ms']:.3f}  max {e['max_ms']:.3f} ms  "
+              f"{e['rows_per_call']} ligne(s)/appel  [{', '.join(e['tables'])}]"
+              + (f"  ❌ {e['errors']} erreur(s)" if e['errors'] else ''))
+        print(f"     {e['template']}")
+        for detail in e.get('plan', []):
+            mark = '⚠️ ' if detail in e.get('flags', []) else '   '
+            print(f"       {mark}{detail}")
+        for flag in e.get('flags', []):
+            if flag.startswith('EXPLAIN'):
+                print(f"       ⚠️ {flag}")
+        print()
+
+
+def analyse(paths, db_path=DB_PATH, top=TOP, sort='total', since=None, plans=True):
+    groups = aggregate(read_events(paths), since)
+    entries = report(groups, top, sort)
+    if plans and entries:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+        try:
+            attach_plans(conn, entries)
+        finally:
+            conn.close()
+    return entries, sum(g['count'] for g in groups.values()), len(groups)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requêtes les plus coûteuses d'un journal NIRD_QUERY_LOG (NDJSON)")
+    parser.add_argument('logs', nargs='+', type=Path, help="Fichiers NDJSON (.gz accepté, '-' = stdin)")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Base utilisée pour EXPLAIN QUERY PLAN")
+    parser.add_argument('--top', type=int, default=TOP, help=f"Nombre de modèles affichés (défaut {TOP})")
+    parser.add_argument('--sort', choices=tuple(SORTS), default='total', help="Critère de classement")
+    parser.add_argument('--since', type=int, help="Ignorer les requêtes antérieures (epoch ms, champ ts)")
+    parser.add_argument('--no-explain', action='store_true', help="Ne pas joindre les plans d'exécution")
+    parser.add_argument('--json', type=Path, help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    entries, events, templates = analyse(args.logs, args.db, args.top, args.sort, args.since, not args.no_explain)
+    print_report(entries, events, templates, args.sort)
+    if args.json:
+        args.json.write_text(json.dumps({'events': events, 'templates': templates, 'top': entries},
+                                        indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Rapport → {args.json}")
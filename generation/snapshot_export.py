@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+from generate_db import BASE_DIR, CHANGE_TRACKED_TABLES, DB_PATH
+
+try:
+    import brotli
+except ImportError:  # variantes .br optionnelles (pip install brotli)
+    brotli = None
+
+# Snapshots JSON pré-paginés des pages catalogue, servis sans SQLite par express (serveur/public/snapshots)
+#   {out}/{snapshot}/{lng}/{tri}/page-0001.json (+ .gz, .br) + manifest.json (ETag = hash du contenu)
+# Incrémental : table_changes (triggers) dit quelles tables ont changé depuis le dernier export,
+# puis seules les pages dont le contenu (hash) a changé sont réécrites et recompressées.
+
+OUT_DIR = BASE_DIR / "serveur" / "public" / "snapshots"
+LOCALES_DIR = BASE_DIR / "serveur" / "src" / "locales"
+PAGE_SIZE = 50
+FORMAT = 1  # à incrémenter si le format des pages change (→ export complet)
+
+# Page → (table, tris) ; '-col' = décroissant. /outils est une page statique : rien à exporter
+SNAPSHOTS = {
+    'applications': ('Logiciel', ('nom', '-created_at')),
+    'categories': ('Categorie', ('nom',)),
+    'pilotes': ('Pilote', ('nom', 'ville', '-created_at')),
+}
+
+# Libellés traduits ajoutés aux lignes ({colonne}_label)
+LABELS = {
+    'fr': {'type': {'ecole': 'École', 'college': 'Collège', 'lycee': 'Lycée'},
+           'status': {'actif': 'Actif', 'inactif': 'Inactif'}},
+    'en': {'type': {'ecole': 'Primary school', 'college': 'Middle school', 'lycee': 'High school'},
+           'status': {'actif': 'Active', 'inactif': 'Inactive'}},
+}
+
+
+def locales():
+    """Langues du site (serveur/src/locales/*.json)"""
+    return sorted(p.stem for p in LOCALES_DIR.glob('*.json')) or ['fr']
+
+
+def text_key(value):
+    """Tri sans casse ni accents pour le texte ('École' avec les 'e'), numérique sinon, NULL en dernier"""
+    if value is None:
+        return (1, '', '')
+    if isinstance(value, (int, float)):
+        return (0, value, '')
+    text = str(value)
+    folded = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c)).casefold()
+    return (0, folded, text)
+
+
+def sort_rows(rows, sort, key_col):
+    """Lignes triées par sort ('nom', '-created_at'), départagées par la clé (ordre stable)"""
+    desc = sort.startswith('-')
+    col = sort.lstrip('-')
+    rows = sorted(rows, key=lambda r: r[key_col])
+    # NULL en dernier dans les deux sens
+    present = [r for r in rows if r[col] is not None]
+    missing = [r for r in rows if r[col] is None]
+    return sorted(present, key=lambda r: text_key(r[col]), reverse=desc) + missing
+
+
+def localize(rows, lng):
+    labels = LABELS.get(lng, {})
+    if not labels:
+        return rows
+    return [{**row, **{f"{col}_label": names.get(row[col], row[col])
+                       for col, names in labels.items() if col in row}} for row in rows]
+
+
+def encode(payload):
+    """JSON canonique (clés triées, sans espaces) → octets + hash de contenu (ETag)"""
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return data, hashlib.sha256(data).hexdigest()[:20]
+
+
+def write_atomic(path, data):
+    """Écrit via un fichier temporaire + rename : le serveur ne lit jamais une page à moitié écrite"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def write_page(path, data):
+    """page.json + variantes précompressées (gzip mtime=0 → octets reproductibles)"""
+    write_atomic(path, data)
+    write_atomic(path.with_name(path.name + '.gz'), gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli:
+        write_atomic(path.with_name(path.name + '.br'), brotli.compress(data, quality=11))
+
+
+def read_json(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def export_sort(rows, directory, name, sort, lng, key_col, version, full):
+    """Pages d'un (snapshot, langue, tri) ; renvoie (pages réécrites, pages totales)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = None if full else read_json(directory / 'manifest.json')
+    old = {p['file']: p['hash'] for p in previous['pages']} if previous and previous.get('format') == FORMAT else {}
+
+    ordered = localize(sort_rows(rows, sort, key_col), lng)
+    count = max(1, -(-len(ordered) // PAGE_SIZE))
+    pages, written = [], 0
+    for n in range(count):
+        items = ordered[n * PAGE_SIZE:(n + 1) * PAGE_SIZE]
+        file = f"page-{n + 1:04d}.json"
+        data, digest = encode({'snapshot': name, 'lng': lng, 'sort': sort, 'page': n + 1, 'items': items})
+        if old.get(file) != digest or not (directory / file).exists():
+            write_page(directory / file, data)
+            written += 1
+        pages.append({'file': file, 'hash': digest, 'count': len(items)})
+
+    # Pages en trop (table qui a rétréci)
+    for file in set(old) - {p['file'] for p in pages}:
+        for suffix in ('', '.gz', '.br'):
+            (directory / f"{file}{suffix}").unlink(missing_ok=True)
+
+    write_atomic(directory / 'manifest.json', encode({
+        'format': FORMAT, 'snapshot': name, 'lng': lng, 'sort': sort, 'page_size': PAGE_SIZE,
+        'total': len(ordered), 'version': version, 'pages': pages,
+    })[0])
+    return written, count
+
+
+def export_snapshots(db_path=DB_PATH, out_dir=OUT_DIR, full=False):
+    """Exporte les snapshots des tables modifiées depuis le dernier export ; renvoie le nb de pages réécrites"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = None if full else read_json(out_dir / 'state.json')
+    if not state or state.get('format') != FORMAT:
+        state, full = {'format': FORMAT, 'versions': {}}, True
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    conn.row_factory = sqlite3.Row
+    t0 = time.perf_counter()
+    written = total = 0
+    try:
+        # Versions et lignes lues dans le même snapshot de lecture : une écriture concurrente
+        # sera vue (version plus récente) au prochain export
+        conn.execute("BEGIN")
+        versions = {name: version for name, version in conn.execute("SELECT table_name, version FROM table_changes")}
+        langs = locales()
+        print(f"🗂️  Snapshots → {out_dir} (langues: {', '.join(langs)}, {PAGE_SIZE} lignes/page"
+              f"{'' if brotli else ', sans brotli'})")
+        for name, (table, sorts) in SNAPSHOTS.items():
+            version = versions.get(table, 0)
+            tracked = table in CHANGE_TRACKED_TABLES
+            if not full and tracked and state['versions'].get(table) == version:
+                print(f"   ⏭️  {name}: {table} inchangée (v{version})")
+                continue
+            cols = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            key_col = next((c['name'] for c in cols if c['pk']), 'rowid')
+            rows = [dict(r) for r in conn.execute(f"SELECT * FROM {table}")]
+            rewritten = pages = 0
+            for lng in langs:
+                for sort in sorts:
+                    directory = out_dir / name / lng / sort.replace('-', 'desc-')
+                    w, n = export_sort(rows, directory, name, sort, lng, key_col, version, full)
+                    rewritten, pages = rewritten + w, pages + n
+            print(f"   📄 {name}: {len(rows):,} ligne(s), {rewritten}/{pages} page(s) réécrite(s)")
+            written, total = written + rewritten, total + pages
+            state['versions'][table] = version
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    write_atomic(out_dir / 'state.json', json.dumps(state, indent=2).encode('utf-8'))
+    print(f"✅ {written} page(s) réécrite(s) sur {total} examinée(s) en {time.perf_counter() - t0:.2f}s")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshots JSON pré-paginés (gzip/brotli + ETag) des pages catalogue")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite")
+    parser.add_argument('--out', type=Path, default=OUT_DIR, help="Dossier servi en /snapshots")
+    parser.add_argument('--full', action='store_true', help="Tout réexporter (ignore state.json)")
+    args = parser.parse_args()
+    export_snapshots(args.db, args.out, args.full)
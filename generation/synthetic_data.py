@@ -0,0 +1,316 @@
+import random
+import time
+from itertools import islice
+from math import gcd
+
+# 🔢 Clés acceptées par --scale → table cible (ordre = ordre de chargement, parents d'abord)
+SCALE_TABLES = {
+    'users': 'Utilisateur',
+    'categories': 'Categorie',
+    'tags': 'Tag',
+    'logiciels': 'Logiciel',
+    'logiciel_tags': 'LogicielTag',
+    'logiciel_categories': 'LogicielCategorie',
+    'avis': 'Avis',
+    'favoris': 'Favori',
+    'historique': 'Historique',
+    'pilotes': 'Pilote',
+    'demarches': 'demarche_nird',
+}
+
+# Clé primaire utilisée pour la numérotation explicite des lignes
+PK_COLUMNS = {
+    'Utilisateur': 'user_id',
+    'Categorie': 'category_id',
+    'Tag': 'tag_id',
+    'Logiciel': 'software_id',
+    'Avis': 'review_id',
+    'Favori': 'favorite_id',
+    'Historique': 'history_id',
+    'Pilote': 'rowid',
+    'demarche_nird': 'rowid',
+}
+
+# Tables à contrainte UNIQUE sur un couple de clés étrangères
+UNIQUE_PAIR_TABLES = {'LogicielTag', 'LogicielCategorie', 'Favori'}
+
+BATCH_SIZE = 50_000
+COMMIT_EVERY = 1_000_000
+CHUNK_ROWS = 1_000_000
+
+# Période couverte par les dates générées (epoch secondes)
+START_TS = 1_640_995_200  # 2022-01-01
+END_TS = 1_764_547_200    # 2025-12-01
+
+MOTS = ['libre', 'éducation', 'réseau', 'sécurité', 'bureautique', 'graphisme', 'vidéo',
+        'navigateur', 'messagerie', 'élève', 'collège', 'lycée', 'numérique', 'données',
+        'développement', 'école', 'carte', 'géographie', 'musique', 'mathématiques']
+LICENCES = ['Open Source', 'GPL', 'MIT', 'Apache', 'Public Domain', 'Propriétaire']
+PLATEFORMES = ['Desktop', 'Web', 'Web/Server', 'Mobile', 'Mobile/Desktop', 'Linux']
+ACADEMIES = ['Toulouse', 'Rennes', 'Lille', 'Nancy-Metz', 'Grenoble', 'Lyon', 'Strasbourg',
+             'Versailles', 'Créteil', 'Orléans-Tours', 'Bordeaux', 'Montpellier', 'Nantes']
+REGIONS = ['Occitanie', 'Bretagne', 'Hauts-de-France', 'Grand Est', 'Auvergne-Rhône-Alpes',
+           'Île-de-France', 'Centre-Val de Loire', 'Nouvelle-Aquitaine', 'Pays de la Loire']
+TYPES_PILOTE = ['ecole', 'college', 'lycee']
+TYPES_DEMARCHE = ['etablissement', 'collectivite']
+
+
+def parse_scale(spec):
+    """Parse 'users=1e6,avis=5e6' → {'users': 1000000, 'avis': 5000000}"""
+    sizes = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        key, _, value = part.partition('=')
+        key = key.strip()
+        if key not in SCALE_TABLES:
+            raise ValueError(f"Clé --scale inconnue: '{key}' (attendu: {', '.join(SCALE_TABLES)})")
+        try:
+            sizes[key] = int(float(value))
+        except ValueError:
+            raise ValueError(f"Taille invalide pour '{key}': '{value}'")
+        if sizes[key] < 0:
+            raise ValueError(f"Taille négative pour '{key}'")
+    return sizes
+
+
+def chunk_rng(seed, table, chunk_no):
+    """RNG déterministe par (table, bloc de CHUNK_ROWS lignes) → même seed = mêmes lignes,
+    quel que soit le nombre de workers qui se partagent la table"""
+    return random.Random(f"{seed}:{table}:{chunk_no}")
+
+
+def _skewed(r, n, power=2.5):
+    """Id dans 1..n biaisé vers les petits ids (popularité type loi de puissance)"""
+    return 1 + int(n * r() ** power)
+
+
+def _coprime_step(r, m):
+    """Pas aléatoire premier avec m → k ↦ (a·k + c) mod m est une permutation de 0..m-1"""
+    a = r.randrange(1, m) | 1 if m > 2 else 1
+    while gcd(a, m) != 1:
+        a += 1
+    return a
+
+
+def _unique_pairs(plan, lo, hi):
+    """Couples (1..left, 1..right) distincts pour les indices lo..hi-1, sans ensemble en mémoire"""
+    a, c, right = plan['pair']
+    m = plan['pair_space']
+    for k in range(lo, hi):
+        p = (a * k + c) % m
+        yield p // right + 1, p % right + 1
+
+
+def _ts(r):
+    return r.randint(START_TS, END_TS)
+
+
+# ── Générateurs de lignes : gen(r, lo, hi, plan) → un tuple par id de lo à hi-1 ──
+
+def gen_utilisateurs(r, lo, hi, plan):
+    rnd = r.random
+    for uid in range(lo, hi):
+        role = 'admin' if rnd() < 0.001 else 'user'
+        yield (uid, f"user_{uid}", f"user_{uid}@synth.nird.fr", '$2b$10$synthetic', role, _ts(r))
+
+
+def gen_categories(r, lo, hi, plan):
+    for cid in range(lo, hi):
+        yield (cid, f"Catégorie {cid}", f"Logiciels de {r.choice(MOTS)} et {r.choice(MOTS)}")
+
+
+def gen_tags(r, lo, hi, plan):
+    for tid in range(lo, hi):
+        yield (tid, f"{r.choice(MOTS)}-{tid}")
+
+
+def gen_logiciels(r, lo, hi, plan):
+    users = plan['ctx']['Utilisateur']
+    for sid in range(lo, hi):
+        mots = r.sample(MOTS, 4)
+        yield (sid, f"{mots[0].capitalize()} {sid}", f"{r.randint(0, 20)}.{r.randint(0, 99)}",
+               f"Logiciel de {mots[1]} pour la {mots[2]} et le {mots[3]}",
+               f"https://logiciel-{sid}.example.org", r.choice(LICENCES), r.choice(PLATEFORMES),
+               r.randint(1, users) if users else None, _ts(r))
+
+
+def gen_pairs(r, lo, hi, plan):
+    yield from _unique_pairs(plan, lo, hi)
+
+
+def gen_avis(r, lo, hi, plan):
+    users, softs, rnd = plan['ctx']['Utilisateur'], plan['ctx']['Logiciel'], r.random
+    for rid in range(lo, hi):
+        note = min(5, 1 + int(rnd() * 5.6))
+        yield (rid, 1 + int(rnd() * users), _skewed(rnd, softs), note,
+               f"Avis {rid}", f"Très {r.choice(MOTS)}, je recommande", _ts(r))
+
+
+def gen_favoris(r, lo, hi, plan):
+    # favorite_id et indice de couple avancent ensemble
+    for fid, (user_id, software_id) in zip(range(lo, hi), _unique_pairs(plan, lo, hi)):
+        yield (fid, user_id, software_id, _ts(r))
+
+
+def gen_historique(r, lo, hi, plan):
+    users, softs, rnd = plan['ctx']['Utilisateur'], plan['ctx']['Logiciel'], r.random
+    # Dates croissantes avec l'id (comme un vrai journal de consultations)
+    first, step = plan['first'], (END_TS - START_TS) / max(plan['total'], 1)
+    for hid in range(lo, hi):
+        yield (hid, 1 + int(rnd() * users), _skewed(rnd, softs), START_TS + int((hid - first) * step))
+
+
+def gen_pilotes(r, lo, hi, plan):
+    rnd = r.random
+    for pid in range(lo, hi):
+        kind = TYPES_PILOTE[int(rnd() * 3)]
+        yield (pid, f"{kind.capitalize()} {r.choice(MOTS)} {pid}", f"S{pid:07d}",
+               f"Ville {int(rnd() * 5000)}", r.choice(ACADEMIES), kind,
+               'actif' if rnd() < 0.9 else 'inactif',
+               round(41.3 + rnd() * 9.8, 5), round(-5.1 + rnd() * 14.7, 5), _ts(r))
+
+
+def gen_demarches(r, lo, hi, plan):
+    for did in range(lo, hi):
+        kind = r.choice(TYPES_DEMARCHE)
+        yield (did, f"Démarche {kind} {did}", kind, r.randint(0, 500), r.choice(REGIONS), _ts(r))
+
+
+# table → (générateur, INSERT paramétré, tables référencées)
+LOADERS = {
+    'Utilisateur': (gen_utilisateurs,
+                    "INSERT INTO Utilisateur (user_id, username, email, password_hash, role, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, datetime(?, 'unixepoch'))", ()),
+    'Categorie': (gen_categories,
+                  "INSERT INTO Categorie (category_id, nom, description) VALUES (?, ?, ?)", ()),
+    'Tag': (gen_tags, "INSERT INTO Tag (tag_id, nom) VALUES (?, ?)", ()),
+    'Logiciel': (gen_logiciels,
+                 "INSERT INTO Logiciel (software_id, nom, version, description, website_url, license_type, "
+                 "platform, submitted_by, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'))",
+                 ('Utilisateur',)),
+    'LogicielTag': (gen_pairs,
+                    "INSERT OR IGNORE INTO LogicielTag (software_id, tag_id) VALUES (?, ?)",
+                    ('Logiciel', 'Tag')),
+    'LogicielCategorie': (gen_pairs,
+                          "INSERT OR IGNORE INTO LogicielCategorie (software_id, category_id) VALUES (?, ?)",
+                          ('Logiciel', 'Categorie')),
+    'Avis': (gen_avis,
+             "INSERT INTO Avis (review_id, user_id, software_id, note, titre, commentaire, created_at) "
+             "VALUES (?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'))", ('Utilisateur', 'Logiciel')),
+    'Favori': (gen_favoris,
+               "INSERT OR IGNORE INTO Favori (favorite_id, user_id, software_id, added_at) "
+               "VALUES (?, ?, ?, datetime(?, 'unixepoch'))", ('Utilisateur', 'Logiciel')),
+    'Historique': (gen_historique,
+                   "INSERT INTO Historique (history_id, user_id, software_id, viewed_at) "
+                   "VALUES (?, ?, ?, datetime(?, 'unixepoch'))", ('Utilisateur', 'Logiciel')),
+    'Pilote': (gen_pilotes,
+               "INSERT INTO Pilote (rowid, nom, code, ville, academie, type, status, latitude, longitude, "
+               "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'))", ()),
+    'demarche_nird': (gen_demarches,
+                      "INSERT INTO demarche_nird (rowid, nom, type, machines_reconditionnees, region, created_at) "
+                      "VALUES (?, ?, ?, ?, ?, datetime(?, 'unixepoch'))", ()),
+}
+
+
+def table_size(conn, table):
+    """Nombre de lignes d'une table parent, en vérifiant que ses ids sont contigus (1..n)"""
+    pk = PK_COLUMNS[table]
+    count, max_id = conn.execute(f"SELECT COUNT(*), COALESCE(MAX({pk}), 0) FROM {table}").fetchone()
+    if count != max_id:
+        raise ValueError(f"{table}: ids non contigus ({count} lignes, max {max_id}), "
+                         "impossible de générer des clés étrangères valides")
+    return count
+
+
+def bulk_insert(conn, sql, rows, batch_size=BATCH_SIZE, commit_every=COMMIT_EVERY):
+    """executemany par lots, COMMIT toutes les commit_every lignes → renvoie le nb de lignes envoyées"""
+    total = since_commit = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        conn.executemany(sql, batch)
+        total += len(batch)
+        since_commit += len(batch)
+        if since_commit >= commit_every:
+            conn.commit()
+            since_commit = 0
+    conn.commit()
+    return total
+
+
+def plan_synthetic(conn, sizes, seed=42):
+    """Planifie le chargement : pour chaque table, premier id, nb de lignes et tailles des parents"""
+    # Taille courante des tables parents (TEST_DATA déjà chargées)
+    ctx = {t: table_size(conn, t) for t in ('Utilisateur', 'Categorie', 'Tag', 'Logiciel')}
+    plans = []
+
+    for key, table in SCALE_TABLES.items():
+        n = sizes.get(key, 0)
+        if not n:
+            continue
+        refs = LOADERS[table][2]
+        missing = [ref for ref in refs if not ctx[ref]]
+        if missing:
+            raise ValueError(f"{table}: tables référencées vides {missing}")
+
+        if table in PK_COLUMNS:
+            pk = PK_COLUMNS[table]
+            first = conn.execute(f"SELECT COALESCE(MAX({pk}), 0) + 1 FROM {table}").fetchone()[0]
+        else:
+            first = 0
+        plan = {'table': table, 'first': first, 'total': n, 'ctx': dict(ctx), 'pair': None}
+
+        if table in UNIQUE_PAIR_TABLES:
+            right = ctx[refs[1]]
+            capacity = ctx[refs[0]] * right
+            if n > capacity:
+                print(f"   ⚠️ {table}: {n:,} demandés > {capacity:,} couples possibles, plafonné")
+                plan['total'] = capacity
+            r = chunk_rng(seed, table, 'pairs')
+            plan['pair'] = (_coprime_step(r, capacity), r.randrange(capacity), right)
+            plan['pair_space'] = capacity
+
+        plans.append(plan)
+        if table in ctx:
+            ctx[table] += plan['total']
+
+    return plans
+
+
+def chunk_count(plan):
+    return -(-plan['total'] // CHUNK_ROWS)
+
+
+def rows_for(plan, seed, chunk_lo=0, chunk_hi=None):
+    """Lignes des blocs chunk_lo..chunk_hi-1 d'une table planifiée (tous les blocs par défaut)"""
+    table, first = plan['table'], plan['first']
+    end = first + plan['total']
+    generator = LOADERS[table][0]
+    for chunk_no in range(chunk_lo, chunk_count(plan) if chunk_hi is None else chunk_hi):
+        lo = first + chunk_no * CHUNK_ROWS
+        yield from generator(chunk_rng(seed, table, chunk_no), lo, min(lo + CHUNK_ROWS, end), plan)
+
+
+def tune_bulk_load(conn):
+    """PRAGMAs de chargement massif (pas de fsync, tri en mémoire, gros cache)"""
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+
+
+def load_synthetic(conn, sizes, seed=42):
+    """Charge le jeu synthétique demandé (dict clé --scale → nb lignes) dans conn"""
+    tune_bulk_load(conn)
+    stats = {}
+
+    for plan in plan_synthetic(conn, sizes, seed):
+        table, n = plan['table'], plan['total']
+        print(f"   ⏳ {table}: {n:,} lignes...")
+        t0 = time.perf_counter()
+        bulk_insert(conn, LOADERS[table][1], rows_for(plan, seed))
+        elapsed = time.perf_counter() - t0
+        stats[table] = (n, elapsed)
+        print(f"   ✓ {table}: {n:,} lignes en {elapsed:.1f}s ({n / max(elapsed, 1e-9):,.0f} lignes/s)")
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return stats
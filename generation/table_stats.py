@@ -0,0 +1,59 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+from generate_db import COUNTED_TYPES, DB_PATH, STATS_TABLES, stats_rebuild_sql
+from migrate_db import statements
+
+
+def actual_counts(conn):
+    """{(table, bucket): nb} recalculés par COUNT(*) (parcours complet, réservé au contrôle)"""
+    counts = {}
+    for table in STATS_TABLES:
+        counts[(table, '*')] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if table in COUNTED_TYPES:
+            column = COUNTED_TYPES[table]
+            for bucket, count in conn.execute(f"SELECT COALESCE({column}, ''), COUNT(*) FROM {table} GROUP BY 1"):
+                counts[(table, bucket)] = count
+    return counts
+
+
+def check_counters(db_path=DB_PATH, fix=False):
+    """Compare table_stats aux vrais COUNT(*) ; fix=True → recalcul complet en une transaction"""
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        t0 = time.perf_counter()
+        # Compteurs et COUNT(*) lus dans le même snapshot : une écriture du serveur entre les deux
+        # lectures serait prise pour une dérive
+        conn.execute("BEGIN")
+        try:
+            stored = {(t, b): n for t, b, n in conn.execute("SELECT table_name, bucket, row_count FROM table_stats")}
+            actual = actual_counts(conn)
+        finally:
+            conn.execute("COMMIT")
+        drift = [(key, stored.get(key, 0), actual.get(key, 0))
+                 for key in sorted(set(stored) | set(actual)) if stored.get(key, 0) != actual.get(key, 0)]
+        print(f"🔢 {len(actual)} compteur(s) contrôlé(s) en {time.perf_counter() - t0:.2f}s")
+        for (table, bucket), got, expected in drift:
+            print(f"   ❌ {table}[{bucket}]: {got:,} stocké, {expected:,} réel")
+        if not drift:
+            print("✅ Compteurs cohérents")
+        elif fix:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql in statements(stats_rebuild_sql()):
+                conn.execute(sql)
+            conn.execute("COMMIT")
+            print(f"🔧 {len(drift)} compteur(s) recalculé(s)")
+        return drift
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contrôle de cohérence des compteurs table_stats")
+    parser.add_argument('--db', type=Path, default=DB_PATH, help="Fichier SQLite à contrôler")
+    parser.add_argument('--fix', action='store_true', help="Recalculer les compteurs en cas de dérive")
+    args = parser.parse_args()
+    drift = check_counters(args.db, args.fix)
+    exit(1 if drift and not args.fix else 0)
@@ -0,0 +1,98 @@
+// scripts/bench-models.js - Débit findById / count sous requêtes concurrentes
+// Avant : 1 sqlite3.Database par model + re-prepare à chaque appel (ancien code généré)
+// Après : connexions partagées (src/models/connection.js) + statements préparés en cache
+// Usage : node scripts/bench-models.js [chemin/database.db] [concurrence] [durée ms]
+// Mesure (node 22.20, module sqlite3 remplacé par un shim node:sqlite synchrone, base 504 logiciels /
+// 18 pilotes, concurrence 32, 5000 ms) : findById 33 098 → 91 814 req/s (x2.77),
+// count 108 864 → 128 651 req/s (x1.18) ; à refaire avec le module natif (pool de threads libuv)
+const path = require('path');
+const sqlite3 = require('sqlite3').verbose();
+const connection = require('../src/models/connection');
+const LogicielModel = require('../src/models/Logiciel');
+const PiloteModel = require('../src/models/Pilote');
+
+const dbPath = path.resolve(process.argv[2] || connection.DEFAULT_DB_PATH);
+const CONCURRENCY = parseInt(process.argv[3]) || 32;
+const DURATION_MS = parseInt(process.argv[4]) || 5000;
+
+// Même SQL des deux côtés : seule la couche connexion/statements change
+// (model.count() lit table_stats depuis les compteurs par triggers, ce ne serait plus la même requête)
+const SQL = {
+  findById: (tableName, pk) => `SELECT * FROM ${tableName} WHERE ${pk} = ?`,
+  count: tableName => `SELECT COUNT(*) as count FROM ${tableName}`
+};
+
+// Ancien comportement : un handle par model, db.get non préparé
+function legacyModel(tableName, pk) {
+  const db = new sqlite3.Database(dbPath);
+  const get = (sql, params) => new Promise((resolve, reject) => {
+    db.get(sql, params, (err, row) => (err ? reject(err) : resolve(row)));
+  });
+  return {
+    findById: id => get(SQL.findById(tableName, pk), [id]),
+    count: () => get(SQL.count(tableName), []).then(row => row?.count || 0),
+    close: () => db.close()
+  };
+}
+
+// Nouveau comportement : mêmes requêtes via queryRow() du model (lecteurs partagés + statements en cache)
+function sharedModel(Model, pk) {
+  const model = new Model(dbPath);
+  return {
+    findById: id => model.queryRow(SQL.findById(model.tableName, pk), [id]),
+    count: () => model.queryRow(SQL.count(model.tableName)).then(row => row?.count || 0),
+    close: () => model.close()
+  };
+}
+
+async function run(label, fn) {
+  let ops = 0;
+  const end = Date.now() + DURATION_MS;
+  const worker = async () => {
+    while (Date.now() < end) {
+      await fn(ops);
+      ops++;
+    }
+  };
+  const start = process.hrtime.bigint();
+  await Promise.all(Array.from({ length: CONCURRENCY }, worker));
+  const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+  const rate = Math.round(ops / seconds);
+  console.log(`   ${label.padEnd(28)} ${String(rate).padStart(9)} req/s`);
+  return rate;
+}
+
+(async () => {
+  console.log(`📊 Bench models: ${dbPath} (concurrence ${CONCURRENCY}, ${DURATION_MS} ms/mesure)`);
+  if (process.env.NIRD_DB_CACHE === '1') {
+    console.log('⚠️  NIRD_DB_CACHE=1 : le cache de lectures fausse la comparaison (lancer sans)');
+  }
+  const [softs, pilots] = [legacyModel('Logiciel', 'software_id'), legacyModel('Pilote', 'rowid')];
+  const maxSoft = Math.max(1, await softs.count());
+  const maxPilot = Math.max(1, await pilots.count());
+
+  console.log('⏮️  Avant (handle par model, sans cache de statements)');
+  const before = {
+    findById: await run('Logiciel.findById', i => softs.findById(1 + (i % maxSoft))),
+    count: await run('Pilote.count', () => pilots.count())
+  };
+  softs.close();
+  pilots.close();
+
+  console.log('⏭️  Après (connexions partagées + statements préparés)');
+  const [logiciels, pilotes] = [sharedModel(LogicielModel, 'software_id'), sharedModel(PiloteModel, 'rowid')];
+  const after = {
+    findById: await run('Logiciel.findById', i => logiciels.findById(1 + (i % maxSoft))),
+    count: await run('Pilote.count', () => pilotes.count())
+  };
+  logiciels.close();
+  pilotes.close();
+  connection.closeAll();
+
+  for (const op of Object.keys(before)) {
+    console.log(`📈 ${op}: x${(after[op] / before[op]).toFixed(2)}`);
+  }
+})().catch(err => {
+  console.error('❌ Bench:', err);
+  process.exit(1);
+});
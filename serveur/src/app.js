@@ -8,6 +8,8 @@ const i18nextBackend = require('i18next-fs-backend');
 const i18nextMiddleware = require('i18next-http-middleware');
 const indexRouter = require('./routes/index');
 const fs = require('fs');
+const connection = require('./models/connection');
+const HistoriqueModel = require('./models/Historique');
 
 const i18next = require('i18next');
 const i18nextBackend = require('i18next-fs-backend');
@@ -136,6 +138,45 @@ app.use((req, res, next) => {
 // 🔥 4. STATIC FILES
 console.log('📁 [BOOT] Static /public');
 const publicPath = path.join(__dirname, '..', 'public');
+
+// 🗂️ Snapshots catalogue (generation/snapshot_export.py) : variante .br/.gz précompressée selon
+// Accept-Encoding, ETag = hash du contenu lu dans manifest.json → 304 sans relire la page ni SQLite
+const snapshotsPath = path.join(publicPath, 'snapshots');
+const snapshotManifests = new Map(); // dossier → { mtimeMs, etags }
+function snapshotEtag(file) {
+  const manifestPath = path.join(path.dirname(file), 'manifest.json');
+  let stat;
+  try {
+    stat = fs.statSync(manifestPath);
+  } catch (e) {
+    return null;
+  }
+  let manifest = snapshotManifests.get(manifestPath);
+  if (!manifest || manifest.mtimeMs !== stat.mtimeMs) {
+    const pages = JSON.parse(fs.readFileSync(manifestPath, 'utf8')).pages || [];
+    manifest = { mtimeMs: stat.mtimeMs, etags: new Map(pages.map(p => [p.file, p.hash])) };
+    snapshotManifests.set(manifestPath, manifest);
+  }
+  return manifest.etags.get(path.basename(file)) || null;
+}
+app.use('/snapshots', (req, res, next) => {
+  const file = path.join(snapshotsPath, path.normalize(req.path));
+  if (!file.endsWith('.json') || !file.startsWith(snapshotsPath + path.sep)) return next();
+  const etag = snapshotEtag(file);
+  if (!etag) return next();
+  // ETag faible : même contenu quel que soit l'encodage (identity/gzip/br)
+  res.set({ 'ETag': `W/"${etag}"`, 'Vary': 'Accept-Encoding', 'Cache-Control': 'public, max-age=60' });
+  if (req.fresh) return res.status(304).end();
+  res.type('application/json');
+  const accept = req.get('Accept-Encoding') || '';
+  for (const [encoding, ext] of [['br', '.br'], ['gzip', '.gz']]) {
+    if (accept.includes(encoding) && fs.existsSync(file + ext)) {
+      res.set('Content-Encoding', encoding);
+      return res.sendFile(file + ext);
+    }
+  }
+  res.sendFile(file);
+});
 app.use(express.static(publicPath));
 console.log('📂 [BOOT] Public path:', publicPath);
 
@@ -223,15 +264,24 @@ setInterval(() => {
     console.log(`💓 [ALIVE] ${time} - Serveur actif`);
 }, 60000); // Toutes les minutes
 
-// 🔄 GRACEFUL SHUTDOWN
-process.on('SIGINT', () => {
-    console.log('\n\n🛑 [SHUTDOWN] Arrêt gracieux du serveur...');
-    process.exit(0);
-});
+// 🔄 GRACEFUL SHUTDOWN : tampon Historique (createBuffered) écrit, connexions SQLite fermées, puis sortie
+let shuttingDown = false;
+function shutdown(message) {
+    if (shuttingDown) return;
+    shuttingDown = true;
+    console.log(message);
+    // Garde-fou : sortie forcée si le flush reste bloqué (base verrouillée)
+    setTimeout(() => process.exit(1), 10000).unref();
+    new HistoriqueModel().close()
+        .then(() => console.log('💾 [SHUTDOWN] Tampon Historique écrit'))
+        .catch(err => console.error('❌ [SHUTDOWN] Flush Historique:', err.message))
+        .finally(() => {
+            connection.closeAll();
+            process.exit(0);
+        });
+}
 
-process.on('SIGTERM', () => {
-    console.log('\n\n🛑 [SHUTDOWN] Signal SIGTERM reçu...');
-    process.exit(0);
-});
+process.on('SIGINT', () => shutdown('\n\n🛑 [SHUTDOWN] Arrêt gracieux du serveur...'));
+process.on('SIGTERM', () => shutdown('\n\n🛑 [SHUTDOWN] Signal SIGTERM reçu...'));
 
 module.exports = app;
@@ -2,7 +2,7 @@ import AvisModel from '@models/Avis.js';
 
 export default class AvisController extends GenericController {
   constructor() {
-    super('Avis', '../database.db');
+    super('Avis');
     this.Model = AvisModel;
   }
 }
@@ -14,7 +14,7 @@ import AvisModel from '@models/Avis.js';
 
 export default class AvisController extends GenericController {
   constructor() {
-    super('Avis', '../database.db');
+    super('Avis');
     this.Model = AvisModel;
   }
 }
@@ -2,7 +2,7 @@ const GenericController = require('./genericController.cjs');
 
 class CategorieController extends GenericController {
   constructor() {
-    super('Categorie', '../database.db');
+    super('Categorie');
     console.log('🏷️ Catégorie Controller étendu initialisé');
   }
 
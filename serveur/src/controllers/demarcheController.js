@@ -4,7 +4,7 @@ const GenericController = require('./genericController.cjs');
 
 class DemarcheController extends GenericController {
   constructor() {
-    super('demarche_jalons', '../database.db');
+    super('demarche_jalons');
     console.log('🚸 [BOOT] DémarcheController chargé (3 jalons)');
   }
 
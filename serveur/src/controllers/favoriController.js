@@ -2,7 +2,7 @@ import FavoriModel from '@models/Favori.js';
 
 export default class FavoriController extends GenericController {
   constructor() {
-    super('Favori', '../database.db');
+    super('Favori');
     this.Model = FavoriModel;
   }
 }
@@ -1,37 +1,42 @@
 // src/controllers/genericController.cjs - VERSION ROBUSTE ✅ (FIX VUES + DB + PAGINATION)
-const sqlite3 = require('sqlite3').verbose();
+const connection = require('../models/connection');
+
+// 🔎 "logi édu" → "logi"* "édu"* (syntaxe MATCH FTS5 : tous les mots, en préfixe)
+function toFtsQuery(query) {
+  const terms = String(query || '').match(/[\p{L}\p{N}]+/gu) || [];
+  return terms.map(t => `"${t}"*`).join(' ');
+}
 
 class GenericController {
   constructor(tableName, dbPath) {
     this.tableName = tableName;
-    this.dbPath = dbPath || '../database.db';
+    // Base unique : serveur/database.db (ou NIRD_DB_PATH), quel que soit le dossier de lancement
+    this.dbPath = dbPath || connection.DEFAULT_DB_PATH;
     this.db = null;
+    this.statements = new Map();
     this.initDb().catch(console.error);
     console.log(`🗄️ ${tableName} Controller initialisé`);
   }
 
+  // ♻️ Connexions partagées avec les models (1 writer + pool read-only par fichier)
   async initDb() {
-    this.db = new sqlite3.Database(this.dbPath, (err) => {
-      if (err) {
-        console.error(`❌ Erreur DB ${this.tableName}:`, err.message);
-      } else {
-        console.log(`✅ DB ${this.tableName} connectée: ${this.dbPath}`);
-      }
-    });
+    this.db = connection.writer(this.dbPath);
+    console.log(`✅ DB ${this.tableName} connectée: ${this.dbPath}`);
   }
 
   closeDb() {
-    if (this.db) {
-      this.db.close((err) => {
-        if (err) console.error('Erreur fermeture DB:', err);
-      });
-      this.db = null;
-    }
+    for (const stmt of this.statements.values()) stmt.finalize();
+    this.statements.clear();
+    this.db = null;
   }
 
-  // 🔢 COMPTEUR SÉCURISÉ
+  // 🔢 COMPTEUR SÉCURISÉ : table_stats (maintenue par triggers) sinon COUNT(*)
   count() {
-    return this.queryRow(`SELECT COUNT(*) as count FROM ${this.tableName}`).catch(() => ({ count: 0 }));
+    return this.queryRow(
+      `SELECT row_count as count FROM table_stats WHERE table_name = ? AND bucket = '*'`, [this.tableName]
+    ).catch(() => null)
+      .then(row => row || this.queryRow(`SELECT COUNT(*) as count FROM ${this.tableName}`))
+      .catch(() => ({ count: 0 }));
   }
 
   // 🆕 RÉCENTS SÉCURISÉS
@@ -182,12 +187,27 @@ class GenericController {
     }
   }
 
+  // 🔎 Index FTS5 {table}_fts disponible ? (créé par generation/generate_db.py)
+  hasFts() {
+    if (this._hasFts === undefined) {
+      this._hasFts = this.queryRow(
+        `SELECT 1 as ok FROM sqlite_master WHERE type = 'table' AND name = ?`, [`${this.tableName}_fts`]
+      ).then(row => !!row).catch(() => false);
+    }
+    return this._hasFts;
+  }
+
   // Pagination sécurisée
   async getPaginated({ search, limit, offset, sort, order }) {
     let whereClause = '1=1';
     let params = [];
 
-    if (search) {
+    const match = search ? toFtsQuery(search) : '';
+    if (match && await this.hasFts()) {
+      // ✅ MATCH sur l'index plein texte au lieu d'un LIKE '%q%' (scan complet)
+      whereClause += ` AND rowid IN (SELECT rowid FROM ${this.tableName}_fts WHERE ${this.tableName}_fts MATCH ?)`;
+      params = [match];
+    } else if (search) {
       whereClause += ' AND (nom LIKE ? OR description LIKE ?)';
       params = [`%${search}%`, `%${search}%`];
     }
@@ -196,7 +216,8 @@ class GenericController {
     const listQuery = `SELECT * FROM ${this.tableName} WHERE ${whereClause} ORDER BY ${sort} ${order} LIMIT ? OFFSET ?`;
 
     const [countRow, rows] = await Promise.all([
-      this.queryRow(countQuery, params),
+      // Sans filtre → compteur table_stats, pas de COUNT(*) à chaque page
+      params.length ? this.queryRow(countQuery, params) : this.count(),
       this.queryAll(listQuery, [...params, limit, offset])
     ]);
 
@@ -213,24 +234,49 @@ class GenericController {
   }
 
   // 🛠️ Helpers DB - SÉCURISÉS
-  queryRow(sql, params = []) {
-    return new Promise((resolve, reject) => {
-      if (!this.db) return resolve(null);
-      this.db.get(sql, params, (err, row) => {
-        if (err) reject(err);
-        else resolve(row);
+  // Statement préparé mis en cache par (connexion, SQL), LRU borné
+  prepare(handle, sql) {
+    const key = `${handle.poolKey}|${sql}`;
+    let stmt = this.statements.get(key);
+    if (stmt) {
+      this.statements.delete(key);
+    } else {
+      stmt = handle.prepare(sql, (err) => {
+        if (err) this.statements.delete(key);
       });
-    });
+      if (this.statements.size >= connection.MAX_STATEMENTS) {
+        const [oldKey, oldStmt] = this.statements.entries().next().value;
+        this.statements.delete(oldKey);
+        oldStmt.finalize();
+      }
+    }
+    this.statements.set(key, stmt);
+    return stmt;
+  }
+
+  // Lectures via le cache partagé avec les models (connection.js, NIRD_DB_CACHE=1), mesurées par connection.traced
+  queryRow(sql, params = []) {
+    if (!this.db) return Promise.resolve(null);
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {
+        const stmt = this.prepare(connection.reader(this.dbPath), sql);
+        stmt.get(params, (err, row) => {
+          if (err) reject(err);
+          else resolve(row);
+        });
+        stmt.reset();
+      })));
   }
 
   queryAll(sql, params = []) {
-    return new Promise((resolve, reject) => {
-      if (!this.db) return resolve([]);
-      this.db.all(sql, params, (err, rows) => {
-        if (err) reject(err);
-        else resolve(rows || []);
-      });
-    });
+    if (!this.db) return Promise.resolve([]);
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {
+        this.prepare(connection.reader(this.dbPath), sql).all(params, (err, rows) => {
+          if (err) reject(err);
+          else resolve(rows || []);
+        });
+      })));
   }
 
   // 💾 API JSON - SÉCURISÉES
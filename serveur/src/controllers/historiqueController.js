@@ -2,7 +2,7 @@ import HistoriqueModel from '@models/Historique.js';
 
 export default class HistoriqueController extends GenericController {
   constructor() {
-    super('Historique', '../database.db');
+    super('Historique');
     this.Model = HistoriqueModel;
   }
 }
@@ -4,7 +4,7 @@ const GenericController = require('./genericController.cjs');
 
 class LinuxController extends GenericController {
   constructor() {
-    super('linux_distributions', '../database.db');
+    super('linux_distributions');
     console.log('🐧 LinuxController initialisé');
   }
 
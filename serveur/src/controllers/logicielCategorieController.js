@@ -2,7 +2,7 @@ import LogicielCategorieModel from '@models/LogicielCategorie.js';
 
 export default class LogicielCategorieController extends GenericController {
   constructor() {
-    super('LogicielCategorie', '../database.db');
+    super('LogicielCategorie');
     this.Model = LogicielCategorieModel;
   }
 }
@@ -2,7 +2,7 @@ import LogicielModel from '@models/Logiciel';
 
 class LogicielController extends GenericController {
   constructor() {
-    super('Logiciel', '../database.db');
+    super('Logiciel');
     this.Model = LogicielModel;
   }
 }
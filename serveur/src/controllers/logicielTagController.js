@@ -2,7 +2,7 @@ import LogicielTagModel from '../models/LogicielTag.js';
 
 export default class LogicielTagController extends GenericController {
   constructor() {
-    super('LogicielTag', '../database.db');
+    super('LogicielTag');
     this.Model = LogicielTagModel;
   }
 }
@@ -2,11 +2,12 @@
 const sqlite3 = require('sqlite3').verbose();
 const path = require('path');
 const GenericController = require('./genericController.cjs');
+const connection = require('../models/connection');
 
 class PilotesController extends GenericController {
   constructor() {
-    // Chemin absolu vers la DB
-    const dbPath = path.join(__dirname, '..', 'database.db');
+    // Chemin absolu vers la DB (partagée avec les models)
+    const dbPath = connection.DEFAULT_DB_PATH;
     super('pilotes', dbPath);
     
     console.log('🏫 [BOOT] PilotesController chargé');
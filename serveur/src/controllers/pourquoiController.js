@@ -4,7 +4,7 @@ const GenericController = require('./genericController.cjs');
 
 class PourquoiController extends GenericController {
     constructor() {
-        super('pourquoi_nird', '../database.db');
+        super('pourquoi_nird');
     }
 
     // 📖 POURQUOI NIRD - Page principale avec stats
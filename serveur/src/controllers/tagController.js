@@ -2,7 +2,7 @@ import TagModel from '@models/Tag.js';
 
 export default class TagController extends GenericController {
   constructor() {
-    super('Tag', '../database.db');
+    super('Tag');
     this.Model = TagModel;
   }
 }
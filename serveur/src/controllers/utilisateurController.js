@@ -3,7 +3,7 @@ import UtilisateurModel from '@models/Utilisateur.js';
 
 export default class UtilisateurController extends GenericController {
   constructor() {
-    super('Utilisateur', '../database.db');
+    super('Utilisateur');
     this.Model = UtilisateurModel;
   }
 }
@@ -1,106 +1,376 @@
 // Model Favori (auto-généré depuis DB)
 // ✅ Compatible TypeScript/VSCode - Utilisez @aliases dans CONTROLLERS seulement
 
-const sqlite3 = require('sqlite3').verbose();
+const connection = require('./connection');
+
+// Colonnes en tête d'un index (col, clé) → seules autorisées pour findPage() ; nullables : segment NULL en plus
+const SORTABLE_COLUMNS = ['favorite_id', 'software_id'];
+const NULLABLE_SORT_COLUMNS = [];
+// Colonnes acceptées par les écritures en lot, cibles ON CONFLICT de upsertMany() (contraintes UNIQUE)
+const COLUMNS = ['favorite_id', 'user_id', 'software_id', 'added_at'];
+const UNIQUE_KEYS = [['user_id', 'software_id'], ['favorite_id']];
+// Tables modifiées par une écriture du model (triggers et FK en cascade compris) → invalidation du cache
+const WRITTEN_TABLES = ['Favori', 'table_stats', 'LogicielStats', 'LogicielSimilarDirty'];
+
+// Relations chargeables en lot par loadRelations() (déduites des clés étrangères)
+const RELATIONS = {
+  logiciel: { type: 'belongsTo', table: 'Logiciel', key: 'software_id', local: 'software_id' },
+  utilisateur: { type: 'belongsTo', table: 'Utilisateur', key: 'user_id', local: 'user_id' },
+};
 
 class FavoriModel {
-  constructor(dbPath = 'C:/Users/maxim/Desktop/NDI/SITE/serveur/database.db') {
+  constructor(dbPath = connection.DEFAULT_DB_PATH) {
     this.tableName = 'Favori';
-    this.db = new sqlite3.Database(dbPath);
+    // ♻️ Connexions partagées (1 writer + pool read-only), pas de handle par model
+    this.dbPath = dbPath;
+    this.db = connection.writer(dbPath);
+    this.statements = new Map();
     console.log(`🗄️ ${this.tableName} DB connectée`);
   }
 
-  // 🔢 Compter
+  // 🔢 Compter : compteur maintenu par triggers (table_stats) au lieu d'un COUNT(*) complet
   count() {
-    return new Promise((resolve, reject) => {
-      this.db.get(`SELECT COUNT(*) as count FROM ${this.tableName}`, (err, row) => {
-        if (err) reject(err);
-        else resolve(row?.count || 0);
-      });
-    });
+    return this.queryRow(
+      `SELECT row_count as count FROM table_stats WHERE table_name = ? AND bucket = '*'`, [this.tableName]
+    ).then(row => row || this.queryRow(`SELECT COUNT(*) as count FROM ${this.tableName}`))
+      .then(row => row?.count || 0);
   }
 
   // 📋 Liste paginée
   findAll(limit = 50, offset = 0) {
-    return new Promise((resolve, reject) => {
-      this.db.all(`SELECT * FROM ${this.tableName} LIMIT ? OFFSET ?`, [limit, offset], (err, rows) => {
-        if (err) reject(err);
-        else resolve(rows || []);
-      });
-    });
+    return this.queryAll(`SELECT * FROM ${this.tableName} LIMIT ? OFFSET ?`, [limit, offset]);
   }
 
   // 🔍 Par ID
   findById(id) {
-    return new Promise((resolve, reject) => {
-      this.db.get(`SELECT * FROM ${this.tableName} WHERE favorite_id = ?`, [id], (err, row) => {
-        if (err) reject(err);
-        else resolve(row);
-      });
+    return this.queryRow(`SELECT * FROM ${this.tableName} WHERE favorite_id = ?`, [id]);
+  }
+
+  // 📄 Page suivante par curseur (keyset) : coût O(limit) quelle que soit la profondeur
+  // sort = colonne indexée ('nom') ou '-nom' pour l'ordre décroissant ; after = nextCursor précédent
+  findPage({ after = null, sort = 'favorite_id', limit = 50 } = {}) {
+    const desc = sort.startsWith('-');
+    const col = desc ? sort.slice(1) : sort;
+    if (!SORTABLE_COLUMNS.includes(col)) {
+      return Promise.reject(new Error(`Tri non indexé: ${col} (autorisés: ${SORTABLE_COLUMNS.join(', ')})`));
+    }
+    limit = Math.min(Math.max(parseInt(limit) || 50, 1), 500);
+
+    const dir = desc ? 'DESC' : 'ASC';
+    const orderBy = col === 'favorite_id' ? `favorite_id ${dir}` : `${col} ${dir}, favorite_id ${dir}`;
+    // Segments lus dans l'ordre du tri, chacun par une recherche d'index (SEARCH) : pas de OR,
+    // qui ferait parcourir l'index depuis le début ; le segment suivant n'est lu que si la page n'est pas pleine
+    const segments = [];
+    if (!after) {
+      segments.push(['', []]);
+    } else {
+      let value, key;
+      try {
+        [value, key] = JSON.parse(Buffer.from(after, 'base64url').toString('utf8'));
+      } catch (e) {
+        return Promise.reject(new Error('Curseur invalide'));
+      }
+      const op = desc ? '<' : '>';
+      if (col === 'favorite_id') {
+        segments.push([`WHERE favorite_id ${op} ?`, [key]]);
+      } else if (value === null) {
+        // NULL trié en premier (ASC) / en dernier (DESC) ; jamais pour une colonne NOT NULL
+        segments.push([`WHERE ${col} IS NULL AND favorite_id ${op} ?`, [key]]);
+        if (!desc) segments.push([`WHERE ${col} IS NOT NULL`, []]);
+      } else {
+        segments.push([`WHERE (${col}, favorite_id) ${op} (?, ?)`, [value, key]]);
+        if (desc && NULLABLE_SORT_COLUMNS.includes(col)) segments.push([`WHERE ${col} IS NULL`, []]);
+      }
+    }
+
+    const read = (i, items) => i === segments.length || items.length > limit
+      ? Promise.resolve(items)
+      : this.queryAll(
+          `SELECT * FROM ${this.tableName} ${segments[i][0]} ORDER BY ${orderBy} LIMIT ?`,
+          [...segments[i][1], limit + 1 - items.length]
+        ).then(rows => read(i + 1, items.concat(rows)));
+    return read(0, []).then(items => {
+      const hasMore = items.length > limit;
+      if (hasMore) items.pop();
+      const last = items[items.length - 1];
+      const nextCursor = hasMore
+        ? Buffer.from(JSON.stringify([last[col] ?? null, last.favorite_id])).toString('base64url')
+        : null;
+      return { items, nextCursor };
     });
   }
 
-  // 🔎 Recherche
+  // 🔎 Recherche (aucune colonne texte)
   search(query, limit = 20) {
-    return new Promise((resolve, reject) => {
-      this.db.all(`SELECT * FROM ${this.tableName} WHERE nom LIKE ? OR description LIKE ? LIMIT ?`, 
-        [`%${query}%`, `%${query}%`, limit], (err, rows) => {
-        if (err) reject(err);
-        else resolve(rows || []);
+    return Promise.resolve([]);
+  }
+
+  // 🔗 Relations (PRAGMA foreign_key_list) : logiciel, utilisateur
+  // 1 requête pour la page + 1 requête groupée par relation incluse, quel que soit le nombre de lignes
+  findAllWithRelations({ include = [], limit = 50, offset = 0 } = {}) {
+    return this.findAll(limit, offset).then(rows => this.loadRelations(rows, include));
+  }
+
+  findByIdWithRelations(id, include = []) {
+    return this.findById(id).then(row => row ? this.loadRelations([row], include).then(rows => rows[0]) : row);
+  }
+
+  // Attache les relations demandées à des lignes déjà chargées (clés passées en 1 seul paramètre JSON)
+  loadRelations(rows, include = []) {
+    const unknown = include.filter(name => !RELATIONS[name]);
+    if (unknown.length) {
+      return Promise.reject(new Error(`Relation inconnue: ${unknown.join(', ')} (disponibles: ${Object.keys(RELATIONS).join(', ')})`));
+    }
+    if (!rows.length || !include.length) return Promise.resolve(rows);
+
+    return Promise.all(include.map(name => {
+      const rel = RELATIONS[name];
+      const keys = JSON.stringify([...new Set(rows.map(row => row[rel.local]).filter(k => k !== null && k !== undefined))]);
+      let sql, groupBy;
+      if (rel.type === 'belongsTo') {
+        sql = `SELECT * FROM ${rel.table} WHERE ${rel.key} IN (SELECT value FROM json_each(?))`;
+        groupBy = rel.key;
+      } else if (rel.type === 'hasMany') {
+        sql = `SELECT * FROM ${rel.table} WHERE ${rel.foreign} IN (SELECT value FROM json_each(?))`;
+        groupBy = rel.foreign;
+      } else {
+        sql = `SELECT j.${rel.throughLocal} AS _owner_, t.* FROM ${rel.through} j
+               JOIN ${rel.table} t ON t.${rel.key} = j.${rel.throughForeign}
+               WHERE j.${rel.throughLocal} IN (SELECT value FROM json_each(?))`;
+        groupBy = '_owner_';
+      }
+      return this.queryAll(sql, [keys]).then(related => {
+        const byKey = new Map();
+        for (const item of related) {
+          const key = item[groupBy];
+          if (groupBy === '_owner_') delete item._owner_;
+          if (!byKey.has(key)) byKey.set(key, []);
+          byKey.get(key).push(item);
+        }
+        for (const row of rows) {
+          const found = byKey.get(row[rel.local]) || [];
+          row[name] = rel.type === 'belongsTo' ? (found[0] || null) : found;
+        }
       });
-    });
+    })).then(() => rows);
   }
 
   // ➕ Créer
   create(data) {
-    return new Promise((resolve, reject) => {
-      const columns = Object.keys(data);
-      const placeholders = columns.map(() => '?').join(', ');
-      const values = columns.map(col => data[col]);
-      
-      this.db.run(
-        `INSERT INTO ${this.tableName} (${columns.join(', ')}) VALUES (${placeholders})`,
-        values,
-        function(err) {
-          if (err) reject(err);
-          else resolve({ success: true, id: this.lastID });
-        }
-      );
-    });
+    const columns = Object.keys(data);
+    const placeholders = columns.map(() => '?').join(', ');
+    const values = columns.map(col => data[col]);
+
+    return this.execute(
+      `INSERT INTO ${this.tableName} (${columns.join(', ')}) VALUES (${placeholders})`,
+      values
+    ).then(res => ({ success: true, id: res.lastID }));
   }
 
   // ✏️ Update
   update(id, data) {
-    return new Promise((resolve, reject) => {
-      const setClause = Object.keys(data).map(k => `${k} = ?`).join(', ');
-      const values = Object.values(data).concat(id);
-      
-      this.db.run(
-        `UPDATE ${this.tableName} SET ${setClause} WHERE rowid = ?`,
-        values,
-        function(err) {
-          if (err) reject(err);
-          else resolve({ success: true, changes: this.changes });
-        }
-      );
-    });
+    const setClause = Object.keys(data).map(k => `${k} = ?`).join(', ');
+    const values = Object.values(data).concat(id);
+
+    return this.execute(`UPDATE ${this.tableName} SET ${setClause} WHERE rowid = ?`, values)
+      .then(res => ({ success: true, changes: res.changes }));
   }
 
   // 🗑️ Delete
   delete(id) {
-    return new Promise((resolve, reject) => {
-      this.db.run(`DELETE FROM ${this.tableName} WHERE rowid = ?`, [id], function(err) {
+    return this.execute(`DELETE FROM ${this.tableName} WHERE rowid = ?`, [id])
+      .then(res => ({ success: true, changes: res.changes }));
+  }
+
+  // 📦 Insertion en lot : 1 transaction (1 seul fsync), INSERT multi-lignes par paquets
+  createMany(rows) {
+    return this.writeMany(rows, () => '').then(count => ({ success: true, count }));
+  }
+
+  // 📦 Insertion ou mise à jour en lot sur une contrainte UNIQUE (par défaut {UNIQUE_KEYS[0]})
+  upsertMany(rows, conflictCols = UNIQUE_KEYS[0]) {
+    const target = (conflictCols || []).join(', ');
+    if (!UNIQUE_KEYS.some(key => key.join(', ') === target)) {
+      return Promise.reject(new Error(`Pas de contrainte UNIQUE sur (${target}) (disponibles: ${UNIQUE_KEYS.map(k => `(${k.join(', ')})`).join(', ') || 'aucune'})`));
+    }
+    return this.writeMany(rows, columns => {
+      const missing = conflictCols.filter(col => !columns.includes(col));
+      if (missing.length) throw new Error(`Colonne(s) de conflit absente(s) des lignes: ${missing.join(', ')}`);
+      const updates = columns.filter(col => !conflictCols.includes(col) && col !== 'favorite_id');
+      return ` ON CONFLICT(${target}) DO ` +
+        (updates.length ? `UPDATE SET ${updates.map(col => `${col} = excluded.${col}`).join(', ')}` : 'NOTHING');
+    }).then(count => ({ success: true, count }));
+  }
+
+  // ✏️ Mise à jour en lot : rows = [{ favorite_id, ...colonnes }], 1 UPDATE préparé par jeu de colonnes
+  updateMany(rows) {
+    if (!rows.length) return Promise.resolve({ success: true, changes: 0 });
+    return this.transaction(async handle => {
+      let changes = 0;
+      for (const { columns, rows: group } of this.groupByColumns(rows, ['favorite_id'])) {
+        const sets = columns.filter(col => col !== 'favorite_id');
+        if (!sets.length) continue;
+        const sql = `UPDATE ${this.tableName} SET ${sets.map(col => `${col} = ?`).join(', ')} WHERE favorite_id = ?`;
+        for (const row of group) {
+          changes += (await this.run(handle, sql, [...sets.map(col => row[col]), row.favorite_id])).changes;
+        }
+      }
+      return { success: true, changes };
+    });
+  }
+
+  // 🗑️ Suppression en lot : ids passés en 1 paramètre JSON par paquet (texte SQL constant)
+  deleteMany(ids) {
+    if (!ids.length) return Promise.resolve({ success: true, changes: 0 });
+    return this.transaction(async handle => {
+      let changes = 0;
+      for (let i = 0; i < ids.length; i += connection.MAX_VARIABLES) {
+        changes += (await this.run(handle,
+          `DELETE FROM ${this.tableName} WHERE favorite_id IN (SELECT value FROM json_each(?))`,
+          [JSON.stringify(ids.slice(i, i + connection.MAX_VARIABLES))])).changes;
+      }
+      return { success: true, changes };
+    });
+  }
+
+  // INSERT multi-lignes par jeu de colonnes ; conflict(columns) → clause ON CONFLICT éventuelle
+  writeMany(rows, conflict) {
+    if (!rows.length) return Promise.resolve(0);
+    return this.transaction(async handle => {
+      let count = 0;
+      for (const { columns, rows: group } of this.groupByColumns(rows)) {
+        const suffix = conflict(columns);
+        const tuple = `(${columns.map(() => '?').join(', ')})`;
+        const perChunk = Math.max(1, Math.floor(connection.MAX_VARIABLES / columns.length));
+        for (let i = 0; i < group.length; i += perChunk) {
+          const chunk = group.slice(i, i + perChunk);
+          const sql = `INSERT INTO ${this.tableName} (${columns.join(', ')}) ` +
+            `VALUES ${Array(chunk.length).fill(tuple).join(', ')}${suffix}`;
+          count += (await this.run(handle, sql, chunk.flatMap(row => columns.map(col => row[col])))).changes;
+        }
+      }
+      return count;
+    });
+  }
+
+  // Regroupe les lignes par jeu de colonnes (les DEFAULT des colonnes absentes restent appliqués)
+  groupByColumns(rows, required = []) {
+    const groups = new Map();
+    for (const row of rows) {
+      const columns = Object.keys(row).sort();
+      const unknown = columns.filter(col => !COLUMNS.includes(col) && !required.includes(col));
+      if (unknown.length) throw new Error(`Colonne(s) inconnue(s) dans ${this.tableName}: ${unknown.join(', ')}`);
+      const missing = required.filter(col => !columns.includes(col));
+      if (missing.length) throw new Error(`Colonne(s) requise(s) absente(s): ${missing.join(', ')}`);
+      const signature = columns.join(',');
+      if (!groups.has(signature)) groups.set(signature, { columns, rows: [] });
+      groups.get(signature).rows.push(row);
+    }
+    return groups.values();
+  }
+
+  // 🛠️ Statement préparé, mis en cache par (connexion, texte SQL) → plus de re-prepare par appel
+  prepare(handle, sql) {
+    const key = `${handle.poolKey}|${sql}`;
+    let stmt = this.statements.get(key);
+    if (stmt) {
+      // LRU : remis en fin de Map
+      this.statements.delete(key);
+    } else {
+      stmt = handle.prepare(sql, (err) => {
+        if (err) this.statements.delete(key);
+      });
+      if (this.statements.size >= connection.MAX_STATEMENTS) {
+        const [oldKey, oldStmt] = this.statements.entries().next().value;
+        this.statements.delete(oldKey);
+        oldStmt.finalize();
+      }
+    }
+    this.statements.set(key, stmt);
+    return stmt;
+  }
+
+  // Lecture 1 ligne (lecteur read-only du pool, via le cache de connection.js s'il est activé)
+  queryRow(sql, params = []) {
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {
+        const stmt = this.prepare(connection.reader(this.dbPath), sql);
+        stmt.get(params, (err, row) => {
+          if (err) reject(err);
+          else resolve(row);
+        });
+        // reset → libère le snapshot de lecture (sinon le checkpoint WAL est bloqué)
+        stmt.reset();
+      })));
+  }
+
+  // Lecture n lignes (lecteur read-only du pool, via le cache de connection.js s'il est activé)
+  queryAll(sql, params = []) {
+    return connection.cached(this.dbPath, sql, params, () => connection.traced(this.tableName, sql, params, () =>
+      new Promise((resolve, reject) => {
+        this.prepare(connection.reader(this.dbPath), sql).all(params, (err, rows) => {
+          if (err) reject(err);
+          else resolve(rows || []);
+        });
+      })));
+  }
+
+  // 📚 Requête de reporting lourde sur la réplique lecture seule (base principale si absente), hors cache :
+  // les lecteurs du pool restent libres pour les pages ; statement non gardé (la réplique peut être remplacée)
+  report(sql, params = []) {
+    return connection.traced(this.tableName, sql, params, () => new Promise((resolve, reject) => {
+      connection.replica(this.dbPath).all(sql, params, (err, rows) => {
         if (err) reject(err);
-        else resolve({ success: true, changes: this.changes });
+        else resolve(rows || []);
       });
-    });
+    }));
   }
 
+  // 🔬 Dernières requêtes exécutées (tous models/controllers) : { ts, table, sql, params, ms, rows }
+  recentQueries(limit) {
+    return connection.recentQueries(limit);
+  }
+
+  // 📈 Succès/échecs/évictions du cache de lectures (partagé par fichier DB)
+  cacheStats() {
+    return connection.cacheStats(this.dbPath);
+  }
+
+  // Écriture (connexion writer unique, file d'attente partagée avec les transactions)
+  execute(sql, params = []) {
+    return connection.withWriter(this.dbPath, handle => this.run(handle, sql, params), WRITTEN_TABLES);
+  }
+
+  // 🔒 work(handle) dans une transaction : COMMIT si la promesse aboutit, ROLLBACK sinon
+  transaction(work) {
+    return connection.withWriter(this.dbPath, async handle => {
+      await this.run(handle, 'BEGIN IMMEDIATE');
+      try {
+        const result = await work(handle);
+        await this.run(handle, 'COMMIT');
+        return result;
+      } catch (err) {
+        await this.run(handle, 'ROLLBACK').catch(() => {});
+        throw err;
+      }
+    }, WRITTEN_TABLES);
+  }
+
+  // Statement préparé exécuté sur handle (writer déjà acquis par execute()/transaction())
+  run(handle, sql, params = []) {
+    return connection.traced(this.tableName, sql, params, () => new Promise((resolve, reject) => {
+      this.prepare(handle, sql).run(params, function(err) {
+        if (err) reject(err);
+        else resolve({ lastID: this.lastID, changes: this.changes });
+      });
+    }));
+  }
+
+  // Finalise les statements du model (les connexions partagées restent ouvertes → connection.closeAll())
   close() {
-    if (this.db) {
-      this.db.close();
-      this.db = null;
-    }
+    for (const stmt of this.statements.values()) stmt.finalize();
+    this.statements.clear();
+    this.db = null;
   }
 };
 
@@ -0,0 +1,324 @@
+// Connexions SQLite partagées (auto-généré par generation/generate_models.py)
+// 1 connexion writer + un petit pool de connexions read-only par fichier, pour tous les models/controllers
+
+const fs = require('fs');
+const path = require('path');
+const sqlite3 = require('sqlite3').verbose();
+
+// Base unique du serveur (NIRD_DB_PATH : artefact produit par generation/finalize_db.py)
+const DEFAULT_DB_PATH = process.env.NIRD_DB_PATH
+  ? path.resolve(process.env.NIRD_DB_PATH)
+  : path.join(__dirname, '..', '..', 'database.db');
+const READERS = parseInt(process.env.NIRD_DB_READERS) || 4;
+const BUSY_TIMEOUT_MS = 5000;
+// Statements préparés gardés par model (LRU)
+const MAX_STATEMENTS = 64;
+// Paramètres par statement des écritures en lot (SQLITE_MAX_VARIABLE_NUMBER avant 3.32, 32766 ensuite)
+const MAX_VARIABLES = 999;
+
+// 🧠 Cache de lectures optionnel (NIRD_DB_CACHE=1) : LRU borné en entrées et en octets, avec TTL
+const CACHE_ENABLED = process.env.NIRD_DB_CACHE === '1';
+const CACHE_MAX_ENTRIES = parseInt(process.env.NIRD_CACHE_ENTRIES) || 1000;
+const CACHE_MAX_BYTES = parseInt(process.env.NIRD_CACHE_BYTES) || 16 * 1024 * 1024;
+const CACHE_TTL_MS = parseInt(process.env.NIRD_CACHE_TTL_MS) || 30000;
+// Écritures des autres process (scripts generation/) détectées par PRAGMA data_version
+const DATA_VERSION_POLL_MS = parseInt(process.env.NIRD_CACHE_POLL_MS) || 500;
+
+// 🔬 Instrumentation : chaque requête exécutée → ring buffer en mémoire (toujours actif, 1 objet par requête)
+// + journal NDJSON optionnel (NIRD_QUERY_LOG=chemin, requêtes ≥ NIRD_QUERY_LOG_MIN_MS) → generation/slow_queries.py
+const TRACE_SIZE = parseInt(process.env.NIRD_TRACE_SIZE) || 1000;
+const QUERY_LOG = process.env.NIRD_QUERY_LOG || null;
+const QUERY_LOG_MIN_MS = parseFloat(process.env.NIRD_QUERY_LOG_MIN_MS) || 0;
+// Journal en retard de plus de ~1 Mo (disque lent) : événements abandonnés plutôt que de bloquer les requêtes
+const QUERY_LOG_MAX_PENDING = 1024 * 1024;
+
+// 📚 Réplique lecture seule pour le reporting lourd (generation/backup_db.py --replica) :
+// NIRD_DB_REPLICA, sinon database.replica.db à côté de la base ; absente → lecteur du pool
+const REPLICA_PATH = process.env.NIRD_DB_REPLICA || null;
+
+// 🗺️ Lecteurs (pool + réplique) en I/O mappée : NIRD_DB_MMAP_SIZE octets (0 = désactivé, défaut 256 Mo)
+// NIRD_DB_CACHE_KB = cache de pages par connexion (défaut SQLite sinon) ; profils : generation/finalize_db.py
+const MMAP_SIZE = process.env.NIRD_DB_MMAP_SIZE !== undefined
+  ? parseInt(process.env.NIRD_DB_MMAP_SIZE) || 0
+  : 256 * 1024 * 1024;
+const CACHE_KB = parseInt(process.env.NIRD_DB_CACHE_KB) || 0;
+
+const registry = new Map(); // chemin absolu → { writer, readers, next, queue, cache }
+const trace = { ring: new Array(TRACE_SIZE), next: 0, total: 0, dropped: 0, hooks: new Set(), log: null };
+
+function entry(dbPath = DEFAULT_DB_PATH) {
+  const key = path.resolve(dbPath);
+  let db = registry.get(key);
+  if (!db) {
+    const writer = new sqlite3.Database(key, (err) => {
+      if (err) console.error(`❌ Erreur DB ${key}:`, err.message);
+    });
+    writer.configure('busyTimeout', BUSY_TIMEOUT_MS);
+    writer.run('PRAGMA journal_mode=WAL');
+    writer.poolKey = 'w';
+    db = { key, writer, readers: [], next: 0, queue: Promise.resolve(), cache: newCache(), replica: null };
+    registry.set(key, db);
+    if (CACHE_ENABLED) watchDataVersion(db);
+    console.log(`✅ DB partagée ouverte: ${key}`);
+  }
+  return db;
+}
+
+// ✏️ Connexion d'écriture (unique par fichier)
+function writer(dbPath) {
+  return entry(dbPath).writer;
+}
+
+// 🔒 Écritures sérialisées sur le writer : une transaction en lot (BEGIN ... COMMIT) n'est jamais
+// entrelacée avec l'écriture d'un autre model ; work(handle) → Promise
+// tables = tables modifiées (triggers compris) → entrées du cache à invalider (toutes si absent)
+function withWriter(dbPath, work, tables = null) {
+  const db = entry(dbPath);
+  const result = db.queue.then(() => work(db.writer)).finally(() => invalidate(db, tables));
+  db.queue = result.catch(() => {});
+  return result;
+}
+
+// Réglages de connexion des lecteurs (non persistés dans le fichier)
+function tune(handle) {
+  handle.run(`PRAGMA mmap_size=${MMAP_SIZE}`);
+  if (CACHE_KB) handle.run(`PRAGMA cache_size=-${CACHE_KB}`);
+}
+
+// 👓 Connexion read-only du pool (créées à la demande, puis round-robin)
+function reader(dbPath) {
+  const db = entry(dbPath);
+  if (db.readers.length < READERS) {
+    const handle = new sqlite3.Database(db.key, sqlite3.OPEN_READONLY, (err) => {
+      if (err) console.error(`❌ Lecteur DB ${db.key}:`, err.message);
+    });
+    handle.configure('busyTimeout', BUSY_TIMEOUT_MS);
+    tune(handle);
+    handle.poolKey = `r${db.readers.length}`;
+    db.readers.push(handle);
+    return handle;
+  }
+  const handle = db.readers[db.next];
+  db.next = (db.next + 1) % db.readers.length;
+  return handle;
+}
+
+// 📚 Connexion read-only sur la réplique (rouverte quand backup_db.py la remplace par rename)
+function replica(dbPath) {
+  const db = entry(dbPath);
+  const file = REPLICA_PATH ? path.resolve(REPLICA_PATH) : db.key.replace(/\.db$/, '') + '.replica.db';
+  let stat;
+  try {
+    stat = fs.statSync(file);
+  } catch (e) {
+    return reader(dbPath);
+  }
+  if (db.replica && db.replica.ino === stat.ino) return db.replica.handle;
+  // Nouvelle copie : l'ancienne connexion se ferme une fois ses requêtes en cours terminées
+  if (db.replica) db.replica.handle.close();
+  const handle = new sqlite3.Database(file, sqlite3.OPEN_READONLY, (err) => {
+    if (err) console.error(`❌ Réplique DB ${file}:`, err.message);
+  });
+  handle.configure('busyTimeout', BUSY_TIMEOUT_MS);
+  tune(handle);
+  handle.poolKey = 'replica';
+  db.replica = { ino: stat.ino, handle };
+  console.log(`📚 Réplique ouverte: ${file}`);
+  return handle;
+}
+
+function newCache() {
+  return {
+    entries: new Map(),   // clé → { value, tags, bytes, expires } (ordre d'insertion = LRU)
+    pending: new Map(),   // clé → Promise : lectures identiques simultanées → 1 seule requête
+    versions: new Map(),  // table → n° d'invalidation (une lecture commencée avant une écriture n'est pas gardée)
+    epoch: 0,
+    bytes: 0,
+    dataVersion: null,
+    timer: null,
+    stats: { hits: 0, misses: 0, evictions: 0, invalidations: 0, expired: 0 },
+  };
+}
+
+// Tables lues par une requête (FROM/JOIN) : étiquettes d'invalidation
+function readTables(sql) {
+  return [...new Set([...sql.matchAll(/\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)/gi)].map(m => m[1].toLowerCase()))];
+}
+
+// Copie superficielle : les appelants peuvent enrichir les lignes (loadRelations) sans polluer le cache
+function copy(value) {
+  if (Array.isArray(value)) return value.map(row => (row && typeof row === 'object' ? { ...row } : row));
+  return value && typeof value === 'object' ? { ...value } : value;
+}
+
+function drop(cache, key, item) {
+  cache.entries.delete(key);
+  cache.bytes -= item.bytes;
+}
+
+function snapshot(cache, tags) {
+  return `${cache.epoch}:${tags.map(t => cache.versions.get(t) || 0).join(',')}`;
+}
+
+function store(cache, key, tags, value) {
+  const bytes = Buffer.byteLength(JSON.stringify(value) ?? '');
+  if (bytes > CACHE_MAX_BYTES / 4) return;  // résultat trop gros : jamais gardé
+  const old = cache.entries.get(key);
+  if (old) drop(cache, key, old);
+  while (cache.entries.size && (cache.entries.size >= CACHE_MAX_ENTRIES || cache.bytes + bytes > CACHE_MAX_BYTES)) {
+    const [oldKey, oldItem] = cache.entries.entries().next().value;
+    drop(cache, oldKey, oldItem);
+    cache.stats.evictions++;
+  }
+  cache.entries.set(key, { value, tags, bytes, expires: Date.now() + CACHE_TTL_MS });
+  cache.bytes += bytes;
+}
+
+// 🧠 Lecture via le cache : load() n'est appelé qu'en cas d'absence (ou d'expiration)
+function cached(dbPath, sql, params, load) {
+  if (!CACHE_ENABLED) return load();
+  const cache = entry(dbPath).cache;
+  const key = JSON.stringify([sql, params]);
+  const item = cache.entries.get(key);
+  if (item && item.expires > Date.now()) {
+    cache.entries.delete(key);
+    cache.entries.set(key, item);
+    cache.stats.hits++;
+    return Promise.resolve(copy(item.value));
+  }
+  if (item) {
+    drop(cache, key, item);
+    cache.stats.expired++;
+  }
+  cache.stats.misses++;
+  let pending = cache.pending.get(key);
+  if (!pending) {
+    const tags = readTables(sql);
+    const before = snapshot(cache, tags);
+    pending = load().then(value => {
+      if (snapshot(cache, tags) === before) store(cache, key, tags, value);
+      return value;
+    }).finally(() => {
+      if (cache.pending.get(key) === pending) cache.pending.delete(key);
+    });
+    pending.tags = tags;
+    cache.pending.set(key, pending);
+  }
+  return pending.then(copy);
+}
+
+// Vide les entrées qui lisent l'une des tables (toutes si tables est null)
+function invalidate(db, tables = null) {
+  const cache = db.cache;
+  const names = tables && tables.map(t => t.toLowerCase());
+  const hit = tags => !names || tags.some(t => names.includes(t));
+  if (names) names.forEach(t => cache.versions.set(t, (cache.versions.get(t) || 0) + 1));
+  else cache.epoch++;
+  for (const [key, item] of cache.entries) {
+    if (hit(item.tags)) drop(cache, key, item);
+  }
+  for (const [key, pending] of cache.pending) {
+    if (hit(pending.tags)) cache.pending.delete(key);
+  }
+  cache.stats.invalidations++;
+}
+
+// data_version du writer ne change qu'aux COMMIT des AUTRES connexions (scripts Python, autres process)
+function watchDataVersion(db) {
+  const check = () => db.writer.get('PRAGMA data_version', (err, row) => {
+    if (err || !row) return;
+    if (db.cache.dataVersion !== null && row.data_version !== db.cache.dataVersion) invalidate(db);
+    db.cache.dataVersion = row.data_version;
+  });
+  check();  // référence prise dès l'ouverture, avant toute mise en cache
+  db.cache.timer = setInterval(check, DATA_VERSION_POLL_MS);
+  db.cache.timer.unref();
+}
+
+// ⏱️ Exécute work() → Promise en mesurant la requête sql (les lectures servies par le cache ne passent pas ici)
+function traced(table, sql, params, work) {
+  const started = process.hrtime.bigint();
+  return work().then(result => {
+    record(table, sql, params, started, result, null);
+    return result;
+  }, err => {
+    record(table, sql, params, started, undefined, err);
+    throw err;
+  });
+}
+
+function record(table, sql, params, started, result, err) {
+  const ms = Number(process.hrtime.bigint() - started) / 1e6;
+  // Lignes renvoyées (all/get) ou modifiées (run)
+  const rows = Array.isArray(result) ? result.length
+    : result && typeof result.changes === 'number' ? result.changes : result ? 1 : 0;
+  const event = { ts: Date.now(), table, sql, params: params ? params.length : 0, ms, rows };
+  if (err) event.error = err.message;
+  trace.ring[trace.next] = event;
+  trace.next = (trace.next + 1) % TRACE_SIZE;
+  trace.total++;
+  for (const hook of trace.hooks) {
+    try {
+      hook(event);
+    } catch (e) {
+      console.error('❌ Hook requête:', e.message);
+    }
+  }
+  if (QUERY_LOG && ms >= QUERY_LOG_MIN_MS) writeLog(event);
+}
+
+function writeLog(event) {
+  if (!trace.log) {
+    trace.log = fs.createWriteStream(QUERY_LOG, { flags: 'a' });
+    trace.log.on('error', err => console.error(`❌ Journal requêtes ${QUERY_LOG}:`, err.message));
+  }
+  if (trace.log.writableLength > QUERY_LOG_MAX_PENDING) {
+    trace.dropped++;
+    return;
+  }
+  trace.log.write(JSON.stringify(event) + '\n');
+}
+
+// 🪝 hook(event) appelé après chaque requête ({ ts, table, sql, params, ms, rows, error? }) → fonction de retrait
+function onQuery(hook) {
+  trace.hooks.add(hook);
+  return () => trace.hooks.delete(hook);
+}
+
+// 🔬 Dernières requêtes exécutées (plus récente en premier)
+function recentQueries(limit = TRACE_SIZE) {
+  const events = [];
+  for (let i = 1; i <= Math.min(limit, TRACE_SIZE, trace.total); i++) {
+    events.push(trace.ring[(trace.next - i + TRACE_SIZE) % TRACE_SIZE]);
+  }
+  return events;
+}
+
+function traceStats() {
+  return { size: TRACE_SIZE, total: trace.total, dropped: trace.dropped, log: QUERY_LOG };
+}
+
+// 📈 Compteurs du cache (par fichier DB)
+function cacheStats(dbPath) {
+  const cache = entry(dbPath).cache;
+  return { enabled: CACHE_ENABLED, entries: cache.entries.size, bytes: cache.bytes, ...cache.stats };
+}
+
+function closeAll() {
+  for (const db of registry.values()) {
+    clearInterval(db.cache.timer);
+    for (const handle of [db.writer, ...db.readers]) handle.close();
+    if (db.replica) db.replica.handle.close();
+  }
+  registry.clear();
+  if (trace.log) {
+    trace.log.end();
+    trace.log = null;
+  }
+}
+
+module.exports = {
+  DEFAULT_DB_PATH, MAX_STATEMENTS, MAX_VARIABLES,
+  writer, withWriter, reader, replica, cached, cacheStats, closeAll,
+  traced, onQuery, recentQueries, traceStats,
+};
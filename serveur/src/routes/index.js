@@ -7,10 +7,9 @@ const fs = require('fs');
 const sqlite3 = require('sqlite3').verbose();
 const GenericController = require('../controllers/genericController.cjs');
 
-// 🗄️ Base de données partagée
-const dbPath = '../database.db';
-const utilisateursCtrl = new GenericController('utilisateurs', dbPath);
-const logicielsCtrl = new GenericController('logiciels', dbPath);
+// 🗄️ Base de données partagée (connection.DEFAULT_DB_PATH)
+const utilisateursCtrl = new GenericController('utilisateurs');
+const logicielsCtrl = new GenericController('logiciels');
 const pilotesCtrl = require('../controllers/pilotesController.js');
 const linuxCtrl = require('../controllers/linuxController.js');
 